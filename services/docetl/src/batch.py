@@ -0,0 +1,210 @@
+"""
+Batch mode: process a directory, glob or file list once and exit
+
+    python batch.py /archive/2023 '/archive/2024/**/*.pdf' @backfill.txt
+
+Files go through the same worker pool, cache, output writer and manifest
+as the watcher. Outputs mirror the inputs' paths below the deepest
+directory holding every source, so same-named files in different
+directories don't overwrite each other. The manifest doubles as the
+checkpoint: files it records as done with their current size and mtime
+are skipped, so an interrupted backfill resumes where it stopped when run
+again.
+"""
+import os
+import sys
+import glob
+import time
+import signal
+import argparse
+import threading
+from collections import Counter
+from loguru import logger # type: ignore
+from etl import extract_data, load_config
+from main import DocETLHandler, setup_logging
+
+GLOB_CHARS = ('*', '?', '[')
+
+
+def iter_inputs(sources, recursive=False):
+    """
+    Yield file paths from directories, glob patterns and @file lists
+
+    A list file holds one path per line; `@-` reads the list from stdin.
+    Hidden files found in directories are skipped.
+    """
+    for source in sources:
+        if source.startswith('@'):
+            lines = sys.stdin if source == '@-' else open(source[1:], 'r', encoding='utf-8')
+            with lines:
+                for line in lines:
+                    path = line.strip()
+                    if path:
+                        yield path
+        elif any(char in source for char in GLOB_CHARS):
+            for path in glob.iglob(source, recursive=True):
+                if os.path.isfile(path):
+                    yield path
+        elif os.path.isdir(source):
+            for root, dirs, files in os.walk(source):
+                dirs[:] = sorted(d for d in dirs if not d.startswith('.')) if recursive else []
+                for name in sorted(files):
+                    if not name.startswith('.'):
+                        yield os.path.join(root, name)
+        else:
+            yield source
+
+
+def source_root(sources):
+    """
+    Deepest directory holding every source, which the output tree mirrors
+
+    A glob's root is the directory before its first wildcard. A list file's
+    entries could be anywhere, so any @list makes the root `/`.
+    """
+    roots = []
+    for source in sources:
+        if source.startswith('@'):
+            roots.append(os.sep)
+        elif any(char in source for char in GLOB_CHARS):
+            prefix = source[:min(source.index(char) for char in GLOB_CHARS if char in source)]
+            roots.append(os.path.dirname(prefix) or os.curdir)
+        elif os.path.isdir(source):
+            roots.append(source)
+        else:
+            roots.append(os.path.dirname(source) or os.curdir)
+    return os.path.commonpath([os.path.abspath(root) for root in roots])
+
+
+class BatchHandler(DocETLHandler):
+    """DocETLHandler that tallies outcomes and bytes for progress reporting"""
+
+    def __init__(self, config):
+        self.results = Counter()
+        self.bytes_done = 0
+        self._sizes = {}
+        self._results_lock = threading.Lock()
+        super().__init__(config)
+
+    def track(self, file_path, size):
+        with self._results_lock:
+            self._sizes[file_path] = size
+
+    def process_file(self, file_path, extract=extract_data):
+        status = super().process_file(file_path, extract)
+        with self._results_lock:
+            self.results[status] += 1
+            self.bytes_done += self._sizes.pop(file_path, 0)
+        return status
+
+    def snapshot(self):
+        with self._results_lock:
+            return Counter(self.results), self.bytes_done
+
+
+def progress_line(results, bytes_done, skipped, elapsed):
+    done = sum(results.values())
+    rate = done / elapsed if elapsed else 0.0
+    throughput = bytes_done / elapsed / (1024 * 1024) if elapsed else 0.0
+    outcomes = ', '.join(f"{count} {status}" for status, count in sorted(results.items()))
+    return (f"{done} processed ({rate:.1f} files/s, {throughput:.1f} MB/s), "
+            f"{skipped} already done{', ' + outcomes if outcomes else ''}")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Process files once with DocETL and exit")
+    parser.add_argument('sources', nargs='+',
+                        help="Directories, glob patterns (quote them) or @file lists ('@-' for stdin)")
+    parser.add_argument('--config', default='config.yaml', help="Config file (default: config.yaml)")
+    parser.add_argument('--output', help="Output directory, overriding the config")
+    parser.add_argument('--checkpoint', help="Manifest used to skip finished files (default: the service manifest)")
+    parser.add_argument('--recursive', action='store_true', help="Descend into subdirectories of directory sources")
+    parser.add_argument('--progress-interval', type=float, default=10.0, help="Seconds between progress lines")
+    parser.add_argument('--max-pending', type=int, default=0,
+                        help="Files queued ahead of the workers (default: 4 per worker thread)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.makedirs("logs", exist_ok=True)
+    setup_logging()
+
+    config = load_config(args.config)
+    if args.output:
+        config['output_directory'] = args.output
+    if args.checkpoint:
+        config['manifest_path'] = args.checkpoint
+    config['source_root'] = source_root(args.sources)
+    os.makedirs(config['output_directory'], exist_ok=True)
+    file_types = {ext.lower() for ext in config.get('file_types') or []}
+
+    handler = BatchHandler(config)
+    max_pending = args.max_pending or 4 * max(1, sum(handler.pool.concurrency.values()))
+
+    stopping = threading.Event()
+
+    def stop(signum, frame):
+        logger.warning(f"Received signal {signum}, finishing files in progress; rerun to resume")
+        stopping.set()
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    started = last_report = time.monotonic()
+    queued = skipped = ignored = 0
+    try:
+        for file_path in iter_inputs(args.sources, args.recursive):
+            if stopping.is_set():
+                break
+            if file_types and os.path.splitext(file_path)[1].lower() not in file_types:
+                ignored += 1
+                continue
+            try:
+                stat = os.stat(file_path)
+            except OSError as e:
+                logger.warning(f"Skipping {file_path}: {e}")
+                ignored += 1
+                continue
+            if handler.manifest.is_current(file_path, stat):
+                skipped += 1
+                continue
+
+            # Bounded queue: listing millions of files must not outrun the workers
+            while handler.pool.pending >= max_pending and not stopping.is_set():
+                time.sleep(0.05)
+            handler.track(file_path, stat.st_size)
+            if handler.pool.submit(file_path):
+                queued += 1
+
+            now = time.monotonic()
+            if now - last_report >= args.progress_interval:
+                last_report = now
+                handler.output.roll_if_due()
+                results, bytes_done = handler.snapshot()
+                logger.info(f"{queued} queued, " + progress_line(results, bytes_done, skipped, now - started))
+
+        while handler.pool.pending and not stopping.is_set():
+            time.sleep(0.2)
+            handler.output.roll_if_due()
+            now = time.monotonic()
+            if now - last_report >= args.progress_interval:
+                last_report = now
+                results, bytes_done = handler.snapshot()
+                logger.info(f"{handler.pool.pending} remaining, " + progress_line(results, bytes_done, skipped, now - started))
+    finally:
+        handler.events.stop()
+        handler.pool.shutdown()
+        handler.output.close()
+
+    results, bytes_done = handler.snapshot()
+    elapsed = time.monotonic() - started
+    logger.info(f"Batch {'interrupted' if stopping.is_set() else 'finished'} in {elapsed:.1f}s: "
+                + progress_line(results, bytes_done, skipped, elapsed)
+                + (f", {ignored} ignored" if ignored else ""))
+    if stopping.is_set():
+        return 130
+    return 1 if results['error'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
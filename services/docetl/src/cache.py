@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from loguru import logger # type: ignore
+from prometheus_client import Counter, Gauge # type: ignore
+from etl import EXTRACTOR_VERSION, DEFAULT_PDF, INCOMPLETE
+
+# Metrics
+CACHE_LOOKUPS = Counter('extraction_cache_lookups_total', 'Extraction cache lookups', ['result'])
+CACHE_EVICTIONS = Counter('extraction_cache_evictions_total', 'Extraction cache entries evicted to stay under max_bytes')
+CACHE_BYTES = Gauge('extraction_cache_bytes', 'Size of the extraction cache')
+
+DEFAULT_CACHE = {
+    'enabled': True,
+    'directory': '',                   # '' = .docetl_cache in the output directory
+    'max_bytes': 1024 * 1024 * 1024,   # least recently used entries are evicted past this
+}
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def cache_key(file_path, content_hash, pdf=None):
+    """
+    Cache key for a file's extracted text
+
+    Covers the content hash, the extractor version, the file type (which
+    picks the extractor) and, for PDFs, the settings that change output.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    settings = {}
+    if ext == '.pdf':
+        pdf = {**DEFAULT_PDF, **(pdf or {})}
+        settings = {name: pdf[name] for name in ('max_pages', 'backends', 'ocr_url', 'ocr_engine', 'ocr_dpi')}
+    material = json.dumps([content_hash, EXTRACTOR_VERSION, ext, settings], sort_keys=True)
+    return hashlib.blake2b(material.encode(), digest_size=20).hexdigest()
+
+
+class ExtractionCache:
+    """
+    Content-addressed store of extracted text
+
+    The same attachment arriving under another name, or in another
+    directory, is materialized from the cache instead of being extracted
+    again. Entries are files named by cache_key under the cache directory,
+    indexed in SQLite with their size and last use; once the total passes
+    `max_bytes` the least recently used entries are evicted. PDF text is
+    stored with its form feeds, so cached PDFs still stream page by page.
+    """
+
+    def __init__(self, config):
+        """
+        Args:
+            config: Service config; reads the optional `cache` section and
+                    `pdf` (part of the key)
+        """
+        settings = {**DEFAULT_CACHE, **(config.get('cache') or {})}
+        self.enabled = bool(settings['enabled'])
+        self.directory = settings['directory'] or os.path.join(config['output_directory'], '.docetl_cache')
+        self.max_bytes = int(settings['max_bytes'])
+        self.pdf = config.get('pdf')
+        if not self.enabled:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(self.directory, 'index.sqlite3'), timeout=10,
+                                     check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, size INTEGER, detail TEXT, last_used REAL)'
+        )
+        CACHE_BYTES.set(self._total())
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _total(self):
+        with self._lock:
+            return self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def key(self, file_path, content_hash):
+        return cache_key(file_path, content_hash, self.pdf)
+
+    def get(self, file_path, key):
+        """
+        Cached content for a key, as extract_data would return it
+
+        Returns:
+            An iterator of text chunks, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            row = self._conn.execute('SELECT detail FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                self._conn.execute('UPDATE entries SET last_used = ? WHERE key = ?', (time.time(), key))
+        path = self._path(key)
+        if row is None or not os.path.exists(path):
+            CACHE_LOOKUPS.labels(result='miss').inc()
+            return None
+        CACHE_LOOKUPS.labels(result='hit').inc()
+        return self._read(path, row[0], pages=file_path.lower().endswith('.pdf'))
+
+    def _read(self, path, detail, pages):
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            if pages:
+                # One chunk per page, as iter_pdf_text yields them
+                buffer = ''
+                for block in iter(lambda: f.read(READ_CHUNK_SIZE), ''):
+                    buffer += block
+                    *done, buffer = buffer.split('\f')
+                    for page in done:
+                        yield page + '\f'
+                if buffer:
+                    yield buffer
+            else:
+                yield from iter(lambda: f.read(READ_CHUNK_SIZE), '')
+        return detail
+
+    def store(self, key, content):
+        """
+        Pass content through, saving it under key once fully consumed
+
+        Content that is only partly consumed (the write failed), or that
+        the extractor reports as INCOMPLETE (e.g. a PDF whose OCR failed), is
+        not cached. The extractor's return value is kept with the entry.
+        """
+        if not self.enabled:
+            return content
+        return self._store(key, content)
+
+    def _store(self, key, content):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.', suffix='.tmp')
+        committed = False
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+                if isinstance(content, str):
+                    f.write(content)
+                    yield content
+                    detail = None
+                else:
+                    chunks = iter(content)
+                    while True:
+                        try:
+                            chunk = next(chunks)
+                        except StopIteration as stop:
+                            detail = stop.value
+                            break
+                        f.write(chunk)
+                        yield chunk
+            if detail and detail.endswith(INCOMPLETE):
+                logger.debug(f"Not caching incomplete extraction {key}")
+                return detail
+            os.replace(temp_path, path)
+            committed = True
+            self._add(key, os.path.getsize(path), detail)
+        finally:
+            if not committed and os.path.exists(temp_path):
+                os.remove(temp_path)
+        return detail
+
+    def _add(self, key, size, detail):
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO entries (key, size, detail, last_used) VALUES (?, ?, ?, ?)',
+                               (key, size, detail, time.time()))
+            total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            if total > self.max_bytes:
+                for old_key, old_size in self._conn.execute(
+                    'SELECT key, size FROM entries WHERE key != ? ORDER BY last_used', (key,)
+                ).fetchall():
+                    try:
+                        os.remove(self._path(old_key))
+                    except FileNotFoundError:
+                        pass
+                    self._conn.execute('DELETE FROM entries WHERE key = ?', (old_key,))
+                    CACHE_EVICTIONS.inc()
+                    total -= old_size
+                    if total <= self.max_bytes:
+                        break
+        CACHE_BYTES.set(total)
+        logger.debug(f"Cached extraction {key} ({size} bytes)")
@@ -1,40 +1,341 @@
+import io
 import os
-import pandas as pd # type: ignore
+import csv
+import re
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import TimeoutError as FuturesTimeout
 from loguru import logger # type: ignore
-from pdfminer.high_level import extract_text # type: ignore
-from docx import Document # type: ignore
+from openpyxl import load_workbook # type: ignore
 import yaml # type: ignore
+from pdf_backends import extract_pages, pdf_page_count, record_extraction
+
+# Bump when an extractor's output changes, so cached extractions are redone
+EXTRACTOR_VERSION = 2
+
+# Suffix of an extractor's return value when its text was cut short by
+# something that may not happen again (a failed OCR request)
+INCOMPLETE = ' (incomplete)'
+
+DEFAULT_PDF = {
+    'max_pages': 0,        # 0 = no limit
+    'timeout': 0,          # seconds per file, 0 = no limit; the file is quarantined past it
+    'pages_per_task': 8,   # pages per process pool task
+    'backends': ['pdfium', 'pdfminer'],  # tried in order, see pdf_backends
+    'ocr_url': '',         # OCR service for pages without a text layer, '' = skip them
+    'ocr_engine': 'tesseract',
+    'ocr_dpi': 200,
+    'ocr_timeout': 120,
+}
+
+# Rows buffered before a CSV chunk is yielded
+XLSX_ROWS_PER_CHUNK = 1000
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+MC = '{http://schemas.openxmlformats.org/markup-compatibility/2006}'
+DOCX_HEADER_PART = re.compile(r'word/header(\d*)\.xml$')
+DOCX_FOOTER_PART = re.compile(r'word/footer(\d*)\.xml$')
+
+class ExtractionLimitExceeded(Exception):
+    """An extraction ran past its time or memory budget, or killed its process"""
+
+    def __init__(self, file_path, reason, detail=''):
+        super().__init__(f"{file_path}: {reason}{f' ({detail})' if detail else ''}")
+        self.reason = reason
+        self.detail = detail
 
 def load_config(path="config.yaml"):
     with open(path, 'r') as f:
         return yaml.safe_load(f)
 
-def extract_text_from_pdf(file_path):
-    return extract_text(file_path)
+def extract_pdf_pages(file_path, start, stop, pdf=None):
+    """Extract pages [start, stop) (see pdf_backends.extract_pages); a picklable unit of work for process pools"""
+    return extract_pages(file_path, start, stop, {**DEFAULT_PDF, **(pdf or {})})
+
+def _pdf_ranges(file_path, ranges, settings, executor, window, deadline):
+    """Yield (start, extract_pages result) for each page range, in order, until the deadline"""
+    if executor is None:
+        for start, stop in ranges:
+            if deadline is not None and time.monotonic() > deadline:
+                raise FuturesTimeout()
+            yield start, extract_pages(file_path, start, stop, settings)
+        return
+
+    ranges = iter(ranges)
+    pending = deque()
+
+    def submit_next():
+        for start, stop in ranges:
+            pending.append((start, executor.submit(extract_pdf_pages, file_path, start, stop, settings)))
+            return
+
+    for _ in range(max(1, window)):
+        submit_next()
+    try:
+        while pending:
+            start, future = pending[0]
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            result = future.result(timeout=remaining)
+            pending.popleft()
+            submit_next()
+            yield start, result
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+def iter_pdf_text(file_path, pdf=None, executor=None, window=4):
+    """
+    Stream a PDF's text page by page, within a page and time budget
+
+    Page ranges go through the backends in `backends` (see pdf_backends),
+    falling back to the next one when a backend fails. With an executor,
+    ranges are fanned out across its processes and yielded back in order,
+    with at most `window` ranges in flight. Pages past `max_pages` are
+    skipped with a warning. `timeout` is checked as each range completes,
+    so it cannot interrupt a range that hangs; isolation's hard limits
+    cover that. The backends used and scanned pages found are recorded
+    once the file is done, and the backend names are the generator's
+    return value, suffixed with INCOMPLETE if an OCR request failed.
+
+    Args:
+        file_path: PDF path
+        pdf: Settings overriding DEFAULT_PDF
+        executor: Optional process pool for page-range tasks
+        window: Page-range tasks submitted ahead of the one being yielded
+
+    Raises:
+        ExtractionLimitExceeded: `timeout` expired before the last page
+    """
+    settings = {**DEFAULT_PDF, **(pdf or {})}
+    deadline = time.monotonic() + settings['timeout'] if settings['timeout'] else None
+    page_count = pdf_page_count(file_path)
+    limit = min(page_count, settings['max_pages']) if settings['max_pages'] else page_count
+    if limit < page_count:
+        logger.warning(f"{file_path}: extracting {limit} of {page_count} pages (max_pages)")
+    pages_per_task = max(1, settings['pages_per_task'])
+    ranges = [(start, min(start + pages_per_task, limit)) for start in range(0, limit, pages_per_task)]
+    if executor is not None and len(ranges) < 2:
+        executor = None
+
+    backends, failed, scanned, ocr = set(), [], 0, 0
+    done = 0
+    incomplete = False
+    try:
+        for start, result in _pdf_ranges(file_path, ranges, settings, executor, window, deadline):
+            done = start + len(result['pages'])
+            backends.add(result['backend'])
+            failed.extend(result['failed'])
+            scanned += result['scanned']
+            ocr += result['ocr']
+            incomplete = incomplete or result['ocr_failed'] > 0
+            yield from result['pages']
+    except FuturesTimeout:
+        # Truncated text would be recorded as a success; the file is quarantined instead
+        raise ExtractionLimitExceeded(file_path, 'timeout', f"pdf.timeout {settings['timeout']:g}s after {done} of {limit} pages")
+    finally:
+        if scanned > ocr:
+            logger.info(f"{file_path}: {scanned - ocr} scanned page(s) without a text layer were not OCR'd")
+        record_extraction(backends, failed, scanned, ocr)
+    # Surfaces as StopIteration.value for callers that want the backend names
+    return '+'.join(sorted(backends)) + (INCOMPLETE if incomplete else '')
+
+def extract_text_from_pdf(file_path, pdf=None):
+    return ''.join(iter_pdf_text(file_path, pdf=pdf))
+
+def _paragraph_text(parts):
+    """Join a paragraph's runs; text box paragraphs, held as 1-tuples, are set off by spaces"""
+    text = ''
+    boxed = False
+    for part in parts:
+        is_box = isinstance(part, tuple)
+        part = part[0] if is_box else part
+        if not part:
+            continue
+        if text and (is_box or boxed) and not text[-1].isspace() and not part[0].isspace():
+            text += ' '
+        text += part
+        boxed = is_box
+    return text
+
+def iter_docx_part(part, skip_empty=False):
+    """
+    Yield the lines of one WordprocessingML part, parsed incrementally
+
+    Paragraphs become one line each; a table row becomes one line with its
+    cells separated by tabs (a cell's paragraphs joined with spaces). Rows
+    of nested tables are folded into their enclosing cell, and text box
+    paragraphs into their anchor paragraph. Of an mc:AlternateContent only
+    the mc:Choice is read, since mc:Fallback repeats it (as VML) for older
+    readers. Elements are cleared once read, so memory stays flat however
+    long the document is.
+    """
+    paragraphs = []   # text runs of the paragraphs being read (text boxes nest)
+    rows = []         # cells of the table rows being read
+    cells = []        # paragraphs of the table cells being read
+    runs = 0
+    alternates = []   # per open mc:AlternateContent, whether it had an mc:Choice
+    skipped = 0       # depth inside an mc:Fallback being skipped
+    container = None  # w:body, or the w:hdr / w:ftr root
+    for event, elem in ET.iterparse(part, events=('start', 'end')):
+        tag = elem.tag
+        if skipped:
+            skipped += 1 if event == 'start' else -1
+            continue
+        if event == 'start':
+            if container is None or tag == W + 'body':
+                container = elem
+            if tag == MC + 'AlternateContent':
+                alternates.append(False)
+            elif tag == MC + 'Choice' and alternates:
+                alternates[-1] = True
+            elif tag == MC + 'Fallback' and alternates and alternates[-1]:
+                skipped = 1
+            elif tag == W + 'p':
+                paragraphs.append([])
+            elif tag == W + 'r':
+                runs += 1
+            elif tag == W + 'tr':
+                rows.append([])
+            elif tag == W + 'tc':
+                cells.append([])
+            continue
+
+        if tag == MC + 'AlternateContent':
+            alternates.pop()
+            continue
+        if tag == W + 'r':
+            runs -= 1
+        elif paragraphs and runs:
+            # Tabs and breaks also appear in paragraph properties; only
+            # those inside a run are content
+            if tag == W + 't' and elem.text:
+                paragraphs[-1].append(elem.text)
+            elif tag == W + 'tab':
+                paragraphs[-1].append('\t')
+            elif tag in (W + 'br', W + 'cr'):
+                paragraphs[-1].append('\n')
+        if tag == W + 'p':
+            text = _paragraph_text(paragraphs.pop())
+            if paragraphs:
+                # A text box paragraph continues its anchor paragraph
+                paragraphs[-1].append((text,))
+            elif cells:
+                cells[-1].append(text)
+            elif text or not skip_empty:
+                yield text
+        elif tag == W + 'tc':
+            rows[-1].append(' '.join(text for text in cells.pop() if text))
+        elif tag == W + 'tr':
+            line = '\t'.join(rows.pop())
+            if cells:
+                cells[-1].append(line)
+            elif line.strip() or not skip_empty:
+                yield line
+        else:
+            continue
+        if not paragraphs and not cells:
+            # Back at block level: drop everything parsed so far
+            elem.clear()
+            container.clear()
+
+def iter_docx_text(file_path, headers=True):
+    """
+    Stream a DOCX's text: headers, then the body in document order, then footers
+
+    Reads word/document.xml (and the header and footer parts) straight
+    from the zip with an incremental parser instead of building a
+    python-docx object tree. Body paragraphs and tables are yielded a line
+    at a time; empty header and footer lines are dropped.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        names = archive.namelist()
+
+        def parts(pattern):
+            # header1.xml, header2.xml, ... in numeric order
+            matches = [(int(match.group(1) or 0), name) for name, match in
+                       ((name, pattern.match(name)) for name in names) if match]
+            return [name for _, name in sorted(matches)]
+
+        def lines(name, skip_empty=False):
+            with archive.open(name) as part:
+                for line in iter_docx_part(part, skip_empty=skip_empty):
+                    yield line + '\n'
+
+        if headers:
+            for name in parts(DOCX_HEADER_PART):
+                yield from lines(name, skip_empty=True)
+        yield from lines('word/document.xml')
+        if headers:
+            for name in parts(DOCX_FOOTER_PART):
+                yield from lines(name, skip_empty=True)
 
 def extract_text_from_docx(file_path):
-    doc = Document(file_path)
-    return "\n".join([para.text for para in doc.paragraphs])
+    return ''.join(iter_docx_text(file_path))
 
 def extract_text_from_txt(file_path):
     with open(file_path, 'r', encoding='utf-8') as f:
         return f.read()
 
-def extract_data(file_path):
+def iter_xlsx_csv(file_path, rows_per_chunk=XLSX_ROWS_PER_CHUNK):
+    """
+    Stream every sheet of a workbook as CSV, a chunk of rows at a time
+
+    The workbook is opened read-only, so openpyxl parses rows lazily from
+    the sheet XML instead of loading the whole workbook. Empty rows are
+    skipped. When there is more than one sheet, each one starts with a
+    `# sheet: <name>` line and sheets are separated by a blank line.
+    """
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        multiple = len(workbook.sheetnames) > 1
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        for index, sheet in enumerate(workbook.worksheets):
+            if multiple:
+                if index:
+                    buffer.write('\n')
+                buffer.write(f'# sheet: {sheet.title}\n')
+            rows = 0
+            for row in sheet.iter_rows(values_only=True):
+                if all(value is None for value in row):
+                    continue
+                writer.writerow(row)
+                rows += 1
+                if rows % rows_per_chunk == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    finally:
+        workbook.close()
+
+def extract_data(file_path, pdf=None, executor=None, window=4):
+    """
+    Extract a file's text
+
+    PDFs, DOCX files and workbooks are returned as iterators of text
+    chunks (see iter_pdf_text, iter_docx_text, iter_xlsx_csv), other
+    formats as one string; output.OutputWriter accepts either. PDF chunks
+    are whole pages.
+    """
     ext = os.path.splitext(file_path)[1].lower()
     if ext == ".pdf":
-        return extract_text_from_pdf(file_path)
+        return iter_pdf_text(file_path, pdf=pdf, executor=executor, window=window)
     elif ext == ".docx":
-        return extract_text_from_docx(file_path)
+        return iter_docx_text(file_path)
     elif ext == ".txt":
         return extract_text_from_txt(file_path)
     elif ext == ".xlsx":
-        df = pd.read_excel(file_path)
-        return df.to_csv(index=False)
+        return iter_xlsx_csv(file_path)
     else:
         return ""
 
-def save_output(output_path, content):
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(content)
-    logger.info(f"Saved processed file to {output_path}")
+def extract_text(file_path, pdf=None):
+    """Extract a file's full text as one string; picklable for process pools"""
+    content = extract_data(file_path, pdf=pdf)
+    return content if isinstance(content, str) else ''.join(content)
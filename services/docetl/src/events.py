@@ -0,0 +1,123 @@
+import os
+import time
+import threading
+from prometheus_client import Counter, Gauge # type: ignore
+
+# Metrics
+FILE_EVENTS = Counter('file_events_total', 'Filesystem events received', ['type'])
+FILES_SETTLING = Gauge('files_settling', 'Files waiting for writes to finish before processing')
+
+DEFAULT_EVENTS = {
+    'quiet_period': 2.0,  # seconds without events before a file's size/mtime is checked
+    'ignore_suffixes': ['.tmp', '.part', '.partial', '.crdownload', '.swp', '~'],
+}
+
+
+class EventCoalescer:
+    """
+    Turn bursts of filesystem events into one dispatch per finished file
+
+    Every event for a path pushes its deadline out by `quiet_period`. When
+    the deadline passes, the file's size and mtime are compared with the
+    previous check; only a file that stayed the same across a full quiet
+    period is dispatched, so files still being copied in are left alone.
+    A close-after-write event (inotify IN_CLOSE_WRITE) skips the wait:
+    the file is dispatched once its stat is unchanged since the close.
+    Hidden and temporary names are ignored, which means atomic
+    write-then-rename drops are picked up at their final name only.
+    """
+
+    def __init__(self, config, dispatch):
+        """
+        Args:
+            config: Service config; reads the optional `events` section
+            dispatch: Callable taking a settled path, returning False when
+                      it could not be accepted yet (e.g. still in flight)
+        """
+        settings = {**DEFAULT_EVENTS, **(config.get('events') or {})}
+        self.quiet_period = float(settings['quiet_period'])
+        self.ignore_suffixes = tuple(s.lower() for s in settings['ignore_suffixes'])
+        self.dispatch = dispatch
+        # path -> [deadline, (size, mtime_ns) at the last check or close]
+        self._pending = {}
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='docetl-events', daemon=True)
+        self._thread.start()
+
+    def ignored(self, path):
+        name = os.path.basename(path)
+        return name.startswith('.') or name.lower().endswith(self.ignore_suffixes)
+
+    def touch(self, path, event_type='modified'):
+        """Note activity on a path, restarting its quiet period"""
+        FILE_EVENTS.labels(type=event_type).inc()
+        if self.ignored(path):
+            return
+        with self._condition:
+            entry = self._pending.setdefault(path, [0.0, None])
+            entry[0] = time.monotonic() + self.quiet_period
+            FILES_SETTLING.set(len(self._pending))
+            self._condition.notify()
+
+    def closed(self, path):
+        """Note that a writer closed the path; check it right away"""
+        FILE_EVENTS.labels(type='closed').inc()
+        if self.ignored(path):
+            return
+        snapshot = self._snapshot(path)
+        if snapshot is None:
+            return
+        with self._condition:
+            self._pending[path] = [time.monotonic(), snapshot]
+            FILES_SETTLING.set(len(self._pending))
+            self._condition.notify()
+
+    def discard(self, path, event_type='deleted'):
+        """Forget a path that was deleted or renamed away"""
+        FILE_EVENTS.labels(type=event_type).inc()
+        with self._condition:
+            self._pending.pop(path, None)
+            FILES_SETTLING.set(len(self._pending))
+
+    def _snapshot(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def _due(self):
+        """Pop the paths whose deadline passed, or wait for the next one"""
+        with self._condition:
+            while not self._stopped:
+                now = time.monotonic()
+                due = [(path, entry) for path, entry in self._pending.items() if entry[0] <= now]
+                if due:
+                    for path, _ in due:
+                        del self._pending[path]
+                    return due
+                next_deadline = min((entry[0] for entry in self._pending.values()), default=None)
+                self._condition.wait(None if next_deadline is None else next_deadline - now)
+            return []
+
+    def _run(self):
+        while not self._stopped:
+            for path, (_, previous) in self._due():
+                snapshot = self._snapshot(path)
+                if snapshot is None:
+                    continue
+                if snapshot == previous and self.dispatch(path):
+                    continue
+                # Still changing, or not accepted yet: check again after another quiet period
+                with self._condition:
+                    if path not in self._pending:
+                        self._pending[path] = [time.monotonic() + self.quiet_period, snapshot]
+            with self._condition:
+                FILES_SETTLING.set(len(self._pending))
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join()
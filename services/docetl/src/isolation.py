@@ -0,0 +1,136 @@
+import os
+import time
+import shutil
+import resource
+import multiprocessing
+from loguru import logger # type: ignore
+import etl
+import pdf_backends
+from etl import ExtractionLimitExceeded
+
+# Seconds a child may take to start (spawn, imports) before the file's own timeout begins
+STARTUP_TIMEOUT = 60
+
+DEFAULT_LIMITS = {
+    'timeout': 0,            # wall-clock seconds per file, 0 = no limit
+    'max_memory_mb': 0,      # address space of the extracting process, 0 = no limit
+    'types': ['.pdf', '.docx', '.xlsx'],  # file types extracted in a limited child process
+    'quarantine_directory': '',  # '' = "quarantine" next to the input directory
+}
+
+
+def limits_settings(config):
+    settings = {**DEFAULT_LIMITS, **(config.get('limits') or {})}
+    if not settings['quarantine_directory']:
+        input_dir = os.path.abspath(config['input_directory'])
+        settings['quarantine_directory'] = os.path.join(os.path.dirname(input_dir), 'quarantine')
+    return settings
+
+
+def _extract_child(conn, file_path, pdf, max_memory_mb):
+    """Child process: extract under an address-space limit, streaming chunks to conn"""
+    if max_memory_mb:
+        limit = int(max_memory_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    # PDF metrics are counted by the parent, which is the process that is scraped
+    recorded = []
+    etl.record_extraction = lambda *args: recorded.append(args)
+    conn.send(('ready', None))
+    try:
+        content = etl.extract_data(file_path, pdf=pdf)
+        if isinstance(content, str):
+            if content:
+                conn.send(('chunk', content))
+            detail = None
+        else:
+            chunks = iter(content)
+            while True:
+                try:
+                    conn.send(('chunk', next(chunks)))
+                except StopIteration as stop:
+                    detail = stop.value
+                    break
+        conn.send(('done', (detail, recorded)))
+    except MemoryError:
+        conn.send(('memory', None))
+    except ExtractionLimitExceeded as e:
+        conn.send(('limit', (e.reason, e.detail)))
+    except Exception as e:
+        conn.send(('error', f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def extract_isolated(file_path, pdf=None, timeout=0, max_memory_mb=0):
+    """
+    Extract a file in its own process, under a time and memory budget
+
+    Chunks stream back as the child produces them, like extract_data's.
+    The child runs with RLIMIT_AS set to `max_memory_mb` and is killed
+    `timeout` seconds after it is ready to extract, so a malformed file
+    can neither stall a worker nor grow the service's memory. PDFs are
+    extracted serially in the child rather than fanned out across the
+    process pool.
+
+    Raises:
+        ExtractionLimitExceeded: timeout (this one or pdf.timeout), memory
+            limit, or the child died
+        RuntimeError: the extractor failed normally (e.g. a corrupt file)
+    """
+    context = multiprocessing.get_context('spawn')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_extract_child, args=(sender, file_path, pdf, max_memory_mb),
+                              name='docetl-extract', daemon=True)
+    process.start()
+    sender.close()
+    deadline = None
+    try:
+        if not receiver.poll(STARTUP_TIMEOUT):
+            raise RuntimeError(f"Extraction process for {file_path} did not start")
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not receiver.poll(remaining):
+                raise ExtractionLimitExceeded(file_path, 'timeout', f"{timeout}s")
+            try:
+                kind, value = receiver.recv()
+            except EOFError:
+                process.join()
+                raise ExtractionLimitExceeded(file_path, 'crashed', f"exit code {process.exitcode}")
+            if kind == 'ready':
+                deadline = time.monotonic() + timeout if timeout else None
+            elif kind == 'chunk':
+                yield value
+            elif kind == 'done':
+                detail, recorded = value
+                for args in recorded:
+                    pdf_backends.record_extraction(*args)
+                return detail
+            elif kind == 'memory':
+                raise ExtractionLimitExceeded(file_path, 'memory', f"{max_memory_mb} MB")
+            elif kind == 'limit':
+                raise ExtractionLimitExceeded(file_path, *value)
+            else:
+                raise RuntimeError(value)
+    finally:
+        receiver.close()
+        if process.is_alive():
+            process.kill()
+        process.join()
+
+
+def quarantine(file_path, directory):
+    """
+    Move a file into the quarantine directory
+
+    Returns:
+        The quarantined path; an existing file of the same name is kept
+        by suffixing the new one with a timestamp
+    """
+    os.makedirs(directory, exist_ok=True)
+    destination = os.path.join(directory, os.path.basename(file_path))
+    if os.path.exists(destination):
+        stem, ext = os.path.splitext(destination)
+        destination = f"{stem}.{time.strftime('%Y%m%dT%H%M%S')}{ext}"
+    shutil.move(file_path, destination)
+    logger.warning(f"Quarantined {file_path} to {destination}")
+    return destination
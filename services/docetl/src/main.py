@@ -2,49 +2,130 @@ import os
 import sys
 import signal
 import time
-from pathlib import Path
 from loguru import logger
 from prometheus_client import Counter, Histogram, start_http_server
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-from etl import extract_data, save_output, load_config
+from etl import extract_data, load_config
+from output import OutputWriter
+from cache import ExtractionCache
+from isolation import ExtractionLimitExceeded, limits_settings, quarantine
+from workers import WorkerPool
+from events import EventCoalescer
+from manifest import Manifest, manifest_path, file_digest, scan_directory
 
 # Metrics
 FILES_PROCESSED = Counter('files_processed_total', 'Total files processed', ['status'])
 PROCESSING_TIME = Histogram('file_processing_seconds', 'Time spent processing files')
+FILES_QUARANTINED = Counter('files_quarantined_total', 'Files moved to quarantine', ['reason'])
 
 class DocETLHandler(FileSystemEventHandler):
     def __init__(self, config):
         self.config = config
-        self.processing = set()
+        self.manifest = Manifest(manifest_path(config))
+        self.output = OutputWriter(config)
+        self.cache = ExtractionCache(config)
+        self.quarantine_directory = limits_settings(config)['quarantine_directory']
+        self.pool = WorkerPool(config, self.process_file)
+        # Events only reach the pool once a file has stopped changing
+        self.events = EventCoalescer(config, self.pool.submit)
 
     def on_created(self, event):
-        if not event.is_directory and event.src_path not in self.processing:
-            self.process_file(event.src_path)
+        if not event.is_directory:
+            self.events.touch(event.src_path, 'created')
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.events.touch(event.src_path, 'modified')
+
+    def on_closed(self, event):
+        # inotify close-after-write: the writer is done with the file
+        if not event.is_directory:
+            self.events.closed(event.src_path)
+
+    def on_moved(self, event):
+        # Atomic drops write a temporary name and rename it into place
+        if not event.is_directory:
+            self.events.discard(event.src_path, 'moved')
+            if os.path.dirname(event.dest_path) == os.path.dirname(event.src_path):
+                self.events.touch(event.dest_path, 'moved')
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self.events.discard(event.src_path)
 
     @PROCESSING_TIME.time()
-    def process_file(self, file_path):
-        self.processing.add(file_path)
+    def process_file(self, file_path, extract=extract_data):
+        """
+        Extract one file and write its output
+
+        Returns:
+            The outcome: success, no_content, unchanged, quarantined or error
+        """
+        stat = content_hash = None
         try:
+            stat = os.stat(file_path)
+            content_hash = file_digest(file_path)
+            previous = self.manifest.quarantine_reason(content_hash)
+            if previous is not None:
+                # Poison files are never retried, whatever name they come back under
+                return self.quarantine_file(file_path, stat, content_hash, 'repeat', f"previously quarantined: {previous}")
+
+            if self.manifest.has_content(file_path, content_hash):
+                # Same bytes as last time (e.g. touched or re-copied); output is current
+                self.manifest.touch(file_path, stat)
+                logger.info(f"Unchanged, skipping: {file_path}")
+                FILES_PROCESSED.labels(status='unchanged').inc()
+                return 'unchanged'
+
             logger.info(f"Processing: {file_path}")
             
-            content = extract_data(file_path)
-            if content:
-                file_name = Path(file_path).stem
-                output_file = f"{file_name}.txt"
-                output_path = os.path.join(self.config['output_directory'], output_file)
-                save_output(output_path, content)
+            # Identical bytes seen under another name are served from the cache
+            key = self.cache.key(file_path, content_hash)
+            content = self.cache.get(file_path, key)
+            if content is None:
+                # PDFs arrive as a stream of pages, written out (and cached) as they are extracted
+                content = self.cache.store(key, extract(file_path))
+            else:
+                logger.info(f"Extraction cache hit: {file_path}")
+
+            def committed(output_path):
+                # Batched outputs are only recorded once their segment is in place
+                self.manifest.record(file_path, stat, content_hash, 'success', output_path)
+
+            if self.output.write(file_path, content, content_hash, on_commit=committed):
                 FILES_PROCESSED.labels(status='success').inc()
                 logger.info(f"Successfully processed: {file_path}")
+                return 'success'
             else:
                 logger.warning(f"No content extracted from: {file_path}")
+                self.manifest.record(file_path, stat, content_hash, 'no_content')
                 FILES_PROCESSED.labels(status='no_content').inc()
+                return 'no_content'
                 
+        except ExtractionLimitExceeded as e:
+            logger.error(f"Extraction limit exceeded: {e}")
+            return self.quarantine_file(file_path, stat, content_hash, e.reason,
+                                        f"{e.reason}: {e.detail}" if e.detail else e.reason)
         except Exception as e:
             logger.error(f"Failed to process {file_path}: {e}")
+            if stat is not None:
+                # Failed files are retried on the next scan
+                self.manifest.record(file_path, stat, content_hash, 'error')
             FILES_PROCESSED.labels(status='error').inc()
-        finally:
-            self.processing.discard(file_path)
+            return 'error'
+
+    def quarantine_file(self, file_path, stat, content_hash, kind, reason):
+        """Move a poison file out of the input directory and record why, so it is never retried"""
+        try:
+            destination = quarantine(file_path, self.quarantine_directory)
+        except OSError as e:
+            logger.error(f"Could not quarantine {file_path}: {e}")
+            destination = None
+        self.manifest.record(file_path, stat, content_hash, 'quarantined', destination, reason)
+        FILES_PROCESSED.labels(status='quarantined').inc()
+        FILES_QUARANTINED.labels(reason=kind).inc()
+        return 'quarantined'
 
 def setup_logging():
     logger.remove()
@@ -90,15 +171,16 @@ def main():
         logger.error(f"Input directory '{input_dir}' does not exist")
         sys.exit(1)
 
-    # Process existing files
+    # Process existing files that are new or changed since the last run
     handler = DocETLHandler(config)
     try:
-        existing_files = [f for f in os.listdir(input_dir) 
-                         if os.path.isfile(os.path.join(input_dir, f))]
-        
-        for file_name in existing_files:
-            file_path = os.path.join(input_dir, file_name)
-            handler.process_file(file_path)
+        queued = current = 0
+        for file_path, stat in scan_directory(input_dir):
+            if handler.manifest.is_current(file_path, stat):
+                current += 1
+            elif handler.pool.submit(file_path):
+                queued += 1
+        logger.info(f"Startup scan queued {queued} new or changed files, {current} already processed")
             
     except Exception as e:
         logger.error(f"Error processing existing files: {e}")
@@ -112,11 +194,15 @@ def main():
     try:
         while True:
             time.sleep(1)
+            handler.output.roll_if_due()
     except KeyboardInterrupt:
         logger.info("Received keyboard interrupt")
     finally:
         observer.stop()
         observer.join()
+        handler.events.stop()
+        handler.pool.shutdown()
+        handler.output.close()
         logger.info("DocETL service stopped")
 
 if __name__ == "__main__":
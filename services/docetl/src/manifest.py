@@ -0,0 +1,115 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from loguru import logger # type: ignore
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Outcomes that mean the file needs no further work until it changes
+DONE_STATUSES = ('success', 'no_content', 'quarantined')
+
+
+def file_digest(file_path):
+    """Content hash of a file, read in chunks"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_directory(directory):
+    """
+    Yield (path, stat) for the regular files in a directory
+
+    Entries are streamed from os.scandir rather than collected into a list,
+    and their stat comes from the directory read where the OS provides it.
+    Hidden files are skipped.
+    """
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            try:
+                if entry.is_file(follow_symlinks=False):
+                    yield entry.path, entry.stat(follow_symlinks=False)
+            except OSError as e:
+                logger.warning(f"Skipping {entry.path}: {e}")
+
+
+class Manifest:
+    """
+    Persistent record of processed input files
+
+    Keyed by path, each row remembers the size, mtime and content hash the
+    file had when it was processed, so a restart can tell new or changed
+    files from ones whose output already exists. Stored in SQLite (WAL)
+    next to the output so it survives pod restarts.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS files ('
+            'path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, content_hash TEXT, '
+            'status TEXT, output_path TEXT, processed_at REAL)'
+        )
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(files)')}
+        if 'reason' not in columns:
+            self._conn.execute('ALTER TABLE files ADD COLUMN reason TEXT')
+        # quarantine_reason looks files up by content for every file processed
+        self._conn.execute('CREATE INDEX IF NOT EXISTS files_content ON files (content_hash, status)')
+
+    def _get(self, file_path):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT size, mtime_ns, content_hash, status FROM files WHERE path = ?', (file_path,)
+            ).fetchone()
+
+    def is_current(self, file_path, stat):
+        """Whether the file is recorded as done with this exact size and mtime"""
+        row = self._get(file_path)
+        return (row is not None and row[3] in DONE_STATUSES
+                and row[0] == stat.st_size and row[1] == stat.st_mtime_ns)
+
+    def has_content(self, file_path, content_hash):
+        """Whether the file is recorded as done with this content hash"""
+        row = self._get(file_path)
+        return row is not None and row[3] in DONE_STATUSES and row[2] == content_hash
+
+    def quarantine_reason(self, content_hash):
+        """Why a file with this content hash was quarantined, or None if it never was"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT reason FROM files WHERE content_hash = ? AND status = 'quarantined' LIMIT 1", (content_hash,)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def record(self, file_path, stat, content_hash, status, output_path=None, reason=None):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO files '
+                '(path, size, mtime_ns, content_hash, status, output_path, processed_at, reason) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (file_path, stat.st_size, stat.st_mtime_ns, content_hash, status, output_path, time.time(), reason)
+            )
+
+    def touch(self, file_path, stat):
+        """Refresh size and mtime of a file whose content did not change"""
+        with self._lock:
+            self._conn.execute(
+                'UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?',
+                (stat.st_size, stat.st_mtime_ns, file_path)
+            )
+
+
+def manifest_path(config):
+    """Manifest location from config, defaulting to the output directory"""
+    return config.get('manifest_path') or os.path.join(config['output_directory'], '.docetl_manifest.sqlite3')
@@ -0,0 +1,247 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from datetime import datetime, timezone
+from loguru import logger # type: ignore
+from prometheus_client import Counter # type: ignore
+
+# Metrics
+OUTPUT_BYTES = Counter('output_bytes_total', 'Bytes of extracted output written', ['format'])
+SEGMENTS_ROLLED = Counter('output_segments_total', 'Segment files completed and renamed into place')
+
+DEFAULT_OUTPUT = {
+    'format': 'text',          # text: one .txt per input; jsonl: one record per page/section
+    'section_chars': 4000,     # jsonl: target size of a non-PDF section record
+    'batch_below_bytes': 0,    # jsonl: outputs smaller than this go into shared segments, 0 = off
+    'segment_bytes': 64 * 1024 * 1024,  # a segment is rolled once it reaches this size...
+    'segment_age': 60,         # ...or this many seconds after it was opened
+}
+
+FORMATS = ('text', 'jsonl')
+
+
+def output_name(file_path, extension, root=None):
+    """
+    Output path for an input, relative to the output directory
+
+    Keeps the input's extension so a.pdf and a.docx don't collide. With a
+    `root`, inputs under it keep their subdirectories, so a/report.pdf and
+    b/report.pdf don't either; an input outside it gets a hash of its
+    directory in the name instead.
+    """
+    name = os.path.basename(file_path)
+    if root is None:
+        return f"{name}.{extension}"
+    relative = os.path.relpath(os.path.abspath(file_path), os.path.abspath(root))
+    if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+        digest = hashlib.blake2b(os.path.dirname(os.path.abspath(file_path)).encode(), digest_size=4).hexdigest()
+        return f"{name}.{digest}.{extension}"
+    return f"{relative}.{extension}"
+
+
+def extractor_name(file_path, detail=None):
+    ext = os.path.splitext(file_path)[1].lower().lstrip('.') or 'none'
+    return f"{ext}/{detail}" if detail else ext
+
+
+def _chunks(content):
+    """
+    Iterate text chunks, returning what the extractor's generator returned
+
+    Returns:
+        The generator's return value (e.g. the PDF backends used), or None
+    """
+    if isinstance(content, str):
+        if content:
+            yield content
+        return None
+    return (yield from content)
+
+
+def _sections(chunks, section_chars):
+    """Regroup text chunks into sections of about section_chars, split on line ends"""
+    buffer, size = [], 0
+    for chunk in chunks:
+        for line in (chunk.splitlines(keepends=True) if len(chunk) > section_chars else [chunk]):
+            buffer.append(line)
+            size += len(line)
+            if size >= section_chars:
+                yield ''.join(buffer)
+                buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def _temp_file(directory, name):
+    """Open a hidden temporary file next to its final name, for write-then-rename"""
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f'.{name}.', suffix='.tmp')
+    return os.fdopen(fd, 'w', encoding='utf-8'), temp_path
+
+
+class OutputWriter:
+    """
+    Write extracted text to the output directory
+
+    In `text` format each input becomes `<name>.<ext>.txt`. In `jsonl`
+    format each input becomes `<name>.<ext>.jsonl` holding one record per
+    PDF page (or per ~section_chars of other formats), each tagged with
+    the source path and content hash, followed by a `document` record with
+    the extractor, record count and timing. With `source_root` set, outputs
+    go in the input's subdirectory below it (see output_name). Every file
+    is written under a temporary name and renamed into place, so readers
+    never see a partial output.
+
+    With `batch_below_bytes` set, jsonl outputs smaller than that are
+    appended to a shared segment file instead, which is renamed into place
+    once it reaches `segment_bytes` or `segment_age`. A document is only
+    committed (on_commit called) once its segment is in place, so a crash
+    before then leaves it to be reprocessed. Reprocessing a changed file
+    appends fresh records to a new segment; downstream readers should take
+    the latest `document` record per source.
+    """
+
+    def __init__(self, config):
+        """
+        Args:
+            config: Service config; reads `output_directory`, the optional
+                    `output` section and `source_root` (set by batch mode)
+        """
+        settings = {**DEFAULT_OUTPUT, **(config.get('output') or {})}
+        if settings['format'] not in FORMATS:
+            raise ValueError(f"Unknown output format {settings['format']!r}, expected one of {FORMATS}")
+        self.directory = config['output_directory']
+        self.root = config.get('source_root')
+        self.format = settings['format']
+        self.section_chars = max(1, int(settings['section_chars']))
+        self.batch_below_bytes = int(settings['batch_below_bytes']) if self.format == 'jsonl' else 0
+        self.segment_bytes = int(settings['segment_bytes'])
+        self.segment_age = float(settings['segment_age'])
+
+        self._lock = threading.Lock()
+        self._segment = None  # open segment: file, temp path, final path, opened at, commit callbacks
+        self._sequence = 0
+
+    def write(self, file_path, content, content_hash=None, on_commit=None):
+        """
+        Write one input's extracted content
+
+        Args:
+            file_path: Input path
+            content: Text, or an iterable of text chunks (PDF pages)
+            content_hash: Hash of the input, stored in jsonl records
+            on_commit: Called with the output path once the output is in
+                       place; later than return for batched documents
+
+        Returns:
+            Number of text characters written; 0 means nothing was written
+        """
+        extension = 'jsonl' if self.format == 'jsonl' else 'txt'
+        output_path = os.path.join(self.directory, output_name(file_path, extension, self.root))
+        output_dir = os.path.dirname(output_path)
+        os.makedirs(output_dir, exist_ok=True)
+        f, temp_path = _temp_file(output_dir, os.path.basename(output_path))
+        try:
+            with f:
+                if self.format == 'jsonl':
+                    written = self._write_records(f, file_path, content, content_hash)
+                else:
+                    written = 0
+                    for chunk in _chunks(content):
+                        f.write(chunk)
+                        written += len(chunk)
+            if not written:
+                os.remove(temp_path)
+                return 0
+            size = os.path.getsize(temp_path)
+            OUTPUT_BYTES.labels(format=self.format).inc(size)
+            if size < self.batch_below_bytes:
+                self._append_to_segment(temp_path, on_commit)
+                return written
+            os.replace(temp_path, output_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        logger.info(f"Saved processed file to {output_path}")
+        if on_commit is not None:
+            on_commit(output_path)
+        return written
+
+    def _write_records(self, f, file_path, content, content_hash):
+        started = time.monotonic()
+        is_pdf = file_path.lower().endswith('.pdf')
+        unit = 'page' if is_pdf else 'section'
+        records = written = 0
+
+        chunks = _chunks(content)
+        detail = None
+        def texts():
+            nonlocal detail
+            detail = yield from chunks
+
+        for text in (texts() if is_pdf else _sections(texts(), self.section_chars)):
+            if is_pdf:
+                text = text.rstrip('\f')
+            records += 1
+            written += len(text)
+            f.write(json.dumps({
+                'type': unit, 'source': file_path, 'source_hash': content_hash, unit: records, 'text': text
+            }, ensure_ascii=False) + '\n')
+
+        if written:
+            f.write(json.dumps({
+                'type': 'document',
+                'source': file_path,
+                'source_hash': content_hash,
+                'extractor': extractor_name(file_path, detail),
+                'records': records,
+                'chars': written,
+                'seconds': round(time.monotonic() - started, 3),
+                'extracted_at': datetime.now(timezone.utc).isoformat(),
+            }, ensure_ascii=False) + '\n')
+        return written
+
+    def _append_to_segment(self, temp_path, on_commit):
+        with self._lock:
+            if self._segment is None:
+                self._sequence += 1
+                name = f"segment-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{self._sequence:06d}.jsonl"
+                f, segment_temp = _temp_file(self.directory, name)
+                self._segment = [f, segment_temp, os.path.join(self.directory, name), time.monotonic(), []]
+            f = self._segment[0]
+            with open(temp_path, 'r', encoding='utf-8') as records:
+                for line in records:
+                    f.write(line)
+            os.remove(temp_path)
+            if on_commit is not None:
+                self._segment[4].append(on_commit)
+            if f.tell() >= self.segment_bytes:
+                self._roll()
+
+    def _roll(self):
+        """Close the open segment and rename it into place; caller holds the lock"""
+        f, temp_path, final_path, _, callbacks = self._segment
+        self._segment = None
+        f.close()
+        os.replace(temp_path, final_path)
+        SEGMENTS_ROLLED.inc()
+        logger.info(f"Saved segment {final_path} ({len(callbacks)} documents)")
+        for on_commit in callbacks:
+            try:
+                on_commit(final_path)
+            except Exception as e:
+                logger.error(f"Commit callback failed for {final_path}: {e}")
+
+    def roll_if_due(self):
+        """Roll the open segment once it is older than segment_age; call periodically"""
+        with self._lock:
+            if self._segment is not None and time.monotonic() - self._segment[3] >= self.segment_age:
+                self._roll()
+
+    def close(self):
+        with self._lock:
+            if self._segment is not None:
+                self._roll()
@@ -0,0 +1,239 @@
+import io
+from loguru import logger # type: ignore
+from prometheus_client import Counter # type: ignore
+from pdfminer.converter import TextConverter # type: ignore
+from pdfminer.layout import LAParams # type: ignore
+from pdfminer.pdfdocument import PDFDocument # type: ignore
+from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter # type: ignore
+from pdfminer.pdfpage import PDFPage # type: ignore
+from pdfminer.pdfparser import PDFParser # type: ignore
+from pdfminer.pdftypes import resolve1 # type: ignore
+
+try:
+    import pypdfium2 as pdfium # type: ignore
+    import pypdfium2.raw as pdfium_c # type: ignore
+except ImportError:
+    pdfium = None
+
+# Metrics
+PDF_EXTRACTIONS = Counter('pdf_extractions_total', 'PDF files extracted, by the backend(s) that produced the text', ['backend'])
+PDF_BACKEND_FALLBACKS = Counter('pdf_backend_fallbacks_total', 'Page ranges a PDF backend failed on', ['backend'])
+PDF_SCANNED_PAGES = Counter('pdf_scanned_pages_total', 'PDF pages without a text layer', ['routed'])
+
+# Backends are tried in order from the `pdf.backends` config; a backend
+# whose text is mostly unmapped glyphs is treated as failed
+MAX_UNMAPPED_RATIO = 0.1
+
+# name -> function(file_path, start, stop) yielding (text, scanned) per page
+PDF_BACKENDS = {}
+
+
+def pdf_backend(name):
+    """Register a page extractor under a backend name"""
+    def register(func):
+        PDF_BACKENDS[name] = func
+        return func
+    return register
+
+
+@pdf_backend('pdfium')
+def pdfium_pages(file_path, start, stop):
+    """
+    Extract pages with PDFium, the C++ engine behind Chrome's PDF viewer
+
+    A page is flagged as scanned when it has no text layer but does hold
+    images.
+    """
+    if pdfium is None:
+        raise ImportError('pypdfium2 is not installed')
+    document = pdfium.PdfDocument(file_path)
+    try:
+        for page_number in range(start, min(stop, len(document))):
+            page = document[page_number]
+            try:
+                textpage = page.get_textpage()
+                text = textpage.get_text_bounded()
+                textpage.close()
+                scanned = not text.strip() and any(
+                    True for _ in page.get_objects(filter=(pdfium_c.FPDF_PAGEOBJ_IMAGE,), max_depth=2)
+                )
+            finally:
+                page.close()
+            # Pages end in a newline and form feed, like pdfminer's output
+            text = text.replace('\r\n', '\n')
+            yield (text + '\n\f' if text else '\f'), scanned
+    finally:
+        document.close()
+
+
+class _ImageNotingConverter(TextConverter):
+    """TextConverter that also notes whether the current page draws any images"""
+
+    has_images = False
+
+    def begin_page(self, page, ctm):
+        self.has_images = False
+        super().begin_page(page, ctm)
+
+    def render_image(self, name, stream):
+        # TextConverter discards images; only their presence matters here
+        self.has_images = True
+        super().render_image(name, stream)
+
+
+@pdf_backend('pdfminer')
+def pdfminer_pages(file_path, start, stop):
+    """
+    Extract pages with pdfminer's layout analysis, one page at a time
+
+    Slower, but its layout analysis keeps columns and reading order that
+    the fast path may not. A page is flagged as scanned when it has no
+    text but does hold images, as with pdfium; blank pages are not.
+    """
+    with open(file_path, 'rb') as f:
+        document = PDFDocument(PDFParser(f))
+        resources = PDFResourceManager(caching=True)
+        buffer = io.StringIO()
+        device = _ImageNotingConverter(resources, buffer, laparams=LAParams())
+        interpreter = PDFPageInterpreter(resources, device)
+        try:
+            for page_number, page in enumerate(PDFPage.create_pages(document)):
+                if page_number >= stop:
+                    break
+                if page_number < start:
+                    continue
+                interpreter.process_page(page)
+                text = buffer.getvalue()
+                yield text, not text.strip() and device.has_images
+                buffer.seek(0)
+                buffer.truncate()
+        finally:
+            device.close()
+
+
+def pdf_page_count(file_path):
+    if pdfium is not None:
+        try:
+            document = pdfium.PdfDocument(file_path)
+            try:
+                return len(document)
+            finally:
+                document.close()
+        except Exception as e:
+            logger.debug(f"PDFium could not open {file_path}: {e}")
+
+    with open(file_path, 'rb') as f:
+        document = PDFDocument(PDFParser(f))
+        try:
+            return int(resolve1(document.catalog['Pages'])['Count'])
+        except Exception:
+            return sum(1 for _ in PDFPage.create_pages(document))
+
+
+def mostly_unmapped(texts):
+    """Whether extracted text is dominated by U+FFFD, i.e. fonts the backend could not map"""
+    total = sum(len(text.strip()) for text in texts)
+    return total > 0 and sum(text.count('�') for text in texts) / total > MAX_UNMAPPED_RATIO
+
+
+def ocr_page(file_path, page_number, settings):
+    """
+    Render one page and send it to the OCR service
+
+    Returns:
+        Recognized text; '' when pypdfium2 is not installed, None when the
+        OCR request fails
+    """
+    if pdfium is None:
+        return ''
+    import requests # type: ignore
+
+    document = pdfium.PdfDocument(file_path)
+    try:
+        page = document[page_number]
+        try:
+            image = page.render(scale=settings['ocr_dpi'] / 72).to_pil()
+        finally:
+            page.close()
+    finally:
+        document.close()
+
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    try:
+        response = requests.post(
+            f"{settings['ocr_url'].rstrip('/')}/ocr",
+            params={'engine': settings['ocr_engine']},
+            files={'file': (f'page-{page_number + 1}.png', buffer.getvalue(), 'image/png')},
+            timeout=settings['ocr_timeout']
+        )
+        response.raise_for_status()
+        return response.json().get('text', '')
+    except Exception as e:
+        logger.warning(f"OCR of {file_path} page {page_number + 1} failed: {e}")
+        return None
+
+
+def extract_pages(file_path, start, stop, settings):
+    """
+    Extract pages [start, stop) with the first configured backend that succeeds
+
+    A backend that raises, is not installed, or returns mostly unmapped
+    glyphs hands the range to the next one. Pages flagged as scanned are
+    rendered and sent to the OCR service when `ocr_url` is set.
+
+    Returns:
+        Dict with the backend used, the backends that failed before it,
+        the page texts, and the numbers of scanned pages, OCR'd pages and
+        pages whose OCR request failed
+    """
+    backends = [name for name in settings['backends'] if name in PDF_BACKENDS]
+    if not backends:
+        raise ValueError(f"No known PDF backend in {settings['backends']}")
+
+    failed = []
+    for i, name in enumerate(backends):
+        try:
+            pages = list(PDF_BACKENDS[name](file_path, start, stop))
+        except Exception as e:
+            if i + 1 == len(backends):
+                raise
+            logger.debug(f"{name} failed on {file_path} pages {start + 1}-{stop}: {e}")
+            failed.append(name)
+            continue
+        if i + 1 < len(backends) and mostly_unmapped([text for text, _ in pages]):
+            logger.debug(f"{name} could not map the fonts of {file_path} pages {start + 1}-{stop}")
+            failed.append(name)
+            continue
+        break
+
+    texts, scanned, ocr, ocr_failed = [], 0, 0, 0
+    for page_number, (text, is_scanned) in enumerate(pages, start):
+        if is_scanned:
+            scanned += 1
+            if settings['ocr_url']:
+                recognized = ocr_page(file_path, page_number, settings)
+                if recognized is None:
+                    ocr_failed += 1
+                elif recognized:
+                    text = recognized + '\n\f'
+                    ocr += 1
+        texts.append(text)
+    return {'backend': name, 'failed': failed, 'pages': texts, 'scanned': scanned, 'ocr': ocr,
+            'ocr_failed': ocr_failed}
+
+
+def record_extraction(backends, failed, scanned, ocr):
+    """
+    Count a finished file under the backend(s) that produced its text
+
+    Called in the parent process, since counters updated inside process
+    pool workers are never scraped.
+    """
+    for name in failed:
+        PDF_BACKEND_FALLBACKS.labels(backend=name).inc()
+    PDF_EXTRACTIONS.labels(backend='+'.join(sorted(backends)) or 'none').inc()
+    if ocr:
+        PDF_SCANNED_PAGES.labels(routed='true').inc(ocr)
+    if scanned - ocr:
+        PDF_SCANNED_PAGES.labels(routed='false').inc(scanned - ocr)
@@ -0,0 +1,600 @@
+import os
+import json
+import time
+import signal
+import threading
+import pytest # type: ignore
+import yaml # type: ignore
+from loguru import logger # type: ignore
+from workers import WorkerPool
+from manifest import Manifest, file_digest, scan_directory
+from events import EventCoalescer
+import cache
+from cache import ExtractionCache, cache_key
+from isolation import ExtractionLimitExceeded, extract_isolated, quarantine
+from main import DocETLHandler
+import batch
+from batch import BatchHandler, iter_inputs, source_root
+from output import OutputWriter, output_name
+from etl import INCOMPLETE, iter_pdf_text, iter_xlsx_csv, extract_text_from_docx
+import pdf_backends
+
+@pytest.fixture
+def config(tmp_path):
+    """Service config rooted in a temporary directory, extracting in-thread"""
+    for name in ('input', 'output'):
+        (tmp_path / name).mkdir()
+    return {
+        'input_directory': str(tmp_path / 'input'),
+        'output_directory': str(tmp_path / 'output'),
+        'workers': {'process_types': []},
+        'limits': {'timeout': 0, 'max_memory_mb': 0},
+    }
+
+def _make_pdf(path, pages):
+    """Write a minimal PDF with one line of Helvetica text per page; a None page holds only an image"""
+    objects = [
+        '<< /Type /Catalog /Pages 2 0 R >>',
+        f"<< /Type /Pages /Kids [{' '.join(f'{3 + 2 * i} 0 R' for i in range(len(pages)))}] /Count {len(pages)} >>",
+    ]
+    font = 3 + 2 * len(pages)
+    for i, text in enumerate(pages):
+        objects.append(f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 300 200] /Contents {4 + 2 * i} 0 R '
+                       f'/Resources << /Font << /F1 {font} 0 R >> /XObject << /Im1 {font + 1} 0 R >> >> >>')
+        stream = 'q 100 0 0 100 20 20 cm /Im1 Do Q' if text is None else f'BT /F1 18 Tf 20 100 Td ({text}) Tj ET'
+        objects.append(f'<< /Length {len(stream)} >>\nstream\n{stream}\nendstream')
+    objects.append('<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>')
+    objects.append('<< /Type /XObject /Subtype /Image /Width 1 /Height 1 /ColorSpace /DeviceGray '
+                   '/BitsPerComponent 8 /Length 1 >>\nstream\n0\nendstream')
+
+    data, offsets = b'%PDF-1.4\n', []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += f'{number} 0 obj\n{body}\nendobj\n'.encode()
+    xref = len(data)
+    data += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode()
+    data += ''.join(f'{offset:010d} 00000 n \n' for offset in offsets).encode()
+    data += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode()
+    path.write_bytes(data)
+    return str(path)
+
+def _drain(generator):
+    """Chunks and return value of an extractor generator"""
+    chunks = []
+    while True:
+        try:
+            chunks.append(next(generator))
+        except StopIteration as stop:
+            return chunks, stop.value
+
+def _wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+def test_worker_pool_drops_duplicates_and_separates_types(config):
+    """Test a queued path is accepted once and each file type gets its own workers"""
+    release = threading.Event()
+    seen = []
+
+    def process(file_path, extract):
+        seen.append((file_path, threading.current_thread().name))
+        release.wait(5)
+
+    config['workers']['concurrency'] = {'.pdf': 1, '.txt': 2}
+    pool = WorkerPool(config, process)
+    try:
+        assert pool.submit('/in/a.pdf')
+        assert not pool.submit('/in/a.pdf')
+        assert pool.submit('/in/b.txt')
+        assert pool.pending == 2
+
+        # A slow PDF does not hold up the txt queue
+        _wait_for(lambda: len(seen) == 2)
+        threads = dict(seen)
+        assert threads['/in/a.pdf'].startswith('docetl-pdf-')
+        assert threads['/in/b.txt'].startswith('docetl-txt-')
+
+        release.set()
+        _wait_for(lambda: pool.pending == 0)
+        # Finished paths are accepted again
+        assert pool.submit('/in/a.pdf')
+    finally:
+        release.set()
+        pool.shutdown()
+
+def test_worker_pool_extracts_in_thread_without_process_types(config, tmp_path):
+    """Test the extract callable handed to process returns the file's text"""
+    path = tmp_path / 'input' / 'note.txt'
+    path.write_text('hello')
+    results = []
+
+    pool = WorkerPool(config, lambda file_path, extract: results.append(extract(file_path)))
+    try:
+        pool.submit(str(path))
+        _wait_for(lambda: results)
+    finally:
+        pool.shutdown()
+    assert results == ['hello']
+
+def test_manifest_tracks_done_files(tmp_path):
+    """Test the manifest tells unchanged files from new, changed and failed ones"""
+    path = tmp_path / 'a.txt'
+    path.write_text('one')
+    stat = os.stat(path)
+    manifest = Manifest(str(tmp_path / 'state' / 'manifest.sqlite3'))
+    digest = file_digest(path)
+
+    assert not manifest.is_current(str(path), stat)
+    manifest.record(str(path), stat, digest, 'error')
+    assert not manifest.is_current(str(path), stat)
+    manifest.record(str(path), stat, digest, 'success', '/out/a.txt.txt')
+    assert manifest.is_current(str(path), stat)
+
+    # Touched but identical: stat differs, content does not
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    touched = os.stat(path)
+    assert not manifest.is_current(str(path), touched)
+    assert manifest.has_content(str(path), file_digest(path))
+    manifest.touch(str(path), touched)
+    assert manifest.is_current(str(path), touched)
+
+    # Survives reopening, as after a restart
+    reopened = Manifest(manifest.path)
+    assert reopened.is_current(str(path), touched)
+
+    # Lookups by content use the index rather than scanning every file
+    plan = reopened._conn.execute(
+        "EXPLAIN QUERY PLAN SELECT reason FROM files WHERE content_hash = ? AND status = 'quarantined'", (digest,)
+    ).fetchall()
+    assert any('files_content' in row[-1] for row in plan)
+
+def test_scan_directory_skips_hidden_files_and_directories(tmp_path):
+    """Test the startup scan lists regular, visible files with their stat"""
+    (tmp_path / 'a.pdf').write_bytes(b'x')
+    (tmp_path / '.a.pdf.tmp').write_bytes(b'x')
+    (tmp_path / 'sub').mkdir()
+    scanned = dict(scan_directory(str(tmp_path)))
+    assert list(scanned) == [str(tmp_path / 'a.pdf')]
+    assert scanned[str(tmp_path / 'a.pdf')].st_size == 1
+
+def test_events_coalesce_until_file_settles(tmp_path):
+    """Test a burst of events dispatches a finished file once, and temp names never"""
+    path = tmp_path / 'report.pdf'
+    path.write_bytes(b'partial')
+    dispatched = []
+    events = EventCoalescer({'events': {'quiet_period': 0.1}}, lambda p: dispatched.append(p) or True)
+    try:
+        for _ in range(5):
+            events.touch(str(path))
+        events.touch(str(tmp_path / 'report.pdf.part'))
+        events.touch(str(tmp_path / '.report.pdf.swp'))
+        _wait_for(lambda: dispatched)
+        time.sleep(0.3)
+    finally:
+        events.stop()
+    assert dispatched == [str(path)]
+
+def test_events_closed_file_skips_quiet_period(tmp_path):
+    """Test close-after-write dispatches without waiting, and refused files are retried"""
+    path = tmp_path / 'sheet.xlsx'
+    path.write_bytes(b'done')
+    attempts = []
+
+    def dispatch(p):
+        attempts.append(p)
+        return len(attempts) > 1  # refused once, as if still in flight
+
+    events = EventCoalescer({'events': {'quiet_period': 1.0}}, dispatch)
+    try:
+        started = time.monotonic()
+        events.closed(str(path))
+        _wait_for(lambda: attempts)
+        assert time.monotonic() - started < 0.5
+        _wait_for(lambda: len(attempts) == 2)
+    finally:
+        events.stop()
+
+def test_pdf_streams_pages_in_order_across_processes(tmp_path):
+    """Test page ranges fanned out over a process pool come back as ordered pages"""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    path = _make_pdf(tmp_path / 'doc.pdf', [f'Page {i}' for i in range(7)])
+    settings = {'pages_per_task': 2}
+
+    serial, backend = _drain(iter_pdf_text(path, pdf=settings))
+    assert len(serial) == 7
+    assert all(page.endswith('\f') for page in serial)
+    assert [page.split()[1] for page in serial] == [str(i) for i in range(7)]
+    assert backend == 'pdfium'
+
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn')) as executor:
+        parallel, _ = _drain(iter_pdf_text(path, pdf=settings, executor=executor, window=2))
+    assert parallel == serial
+
+def test_pdf_page_and_time_budgets(tmp_path):
+    """Test max_pages caps the pages read and an expired timeout fails the file instead of truncating it"""
+    path = _make_pdf(tmp_path / 'doc.pdf', [f'Page {i}' for i in range(5)])
+
+    pages, _ = _drain(iter_pdf_text(path, pdf={'max_pages': 2}))
+    assert len(pages) == 2
+
+    with pytest.raises(ExtractionLimitExceeded) as exceeded:
+        _drain(iter_pdf_text(path, pdf={'timeout': 1e-9}))
+    assert exceeded.value.reason == 'timeout'
+
+@pytest.fixture
+def broken_backend():
+    """A PDF backend registered for the test that always fails"""
+    @pdf_backends.pdf_backend('broken')
+    def broken_pages(file_path, start, stop):
+        raise RuntimeError('cannot parse')
+        yield
+    yield 'broken'
+    del pdf_backends.PDF_BACKENDS['broken']
+
+def test_pdf_backend_fallback(tmp_path, broken_backend):
+    """Test a failing or glyph-mangling backend hands its pages to the next one"""
+    path = _make_pdf(tmp_path / 'doc.pdf', ['Hello world'])
+    result = pdf_backends.extract_pages(path, 0, 1, {'backends': [broken_backend, 'pdfminer'], 'ocr_url': ''})
+    assert result['backend'] == 'pdfminer'
+    assert result['failed'] == [broken_backend]
+    assert 'Hello world' in result['pages'][0]
+
+    assert pdf_backends.mostly_unmapped(['\ufffd\ufffd\ufffd ok'])
+    assert not pdf_backends.mostly_unmapped(['plain text'])
+
+    # The last backend's failure is the file's
+    with pytest.raises(RuntimeError):
+        pdf_backends.extract_pages(path, 0, 1, {'backends': [broken_backend], 'ocr_url': ''})
+    with pytest.raises(ValueError):
+        pdf_backends.extract_pages(path, 0, 1, {'backends': ['nope'], 'ocr_url': ''})
+
+def test_pdf_backends_agree_on_text(tmp_path):
+    """Test the pdfium fast path and pdfminer find the same words, one form feed per page"""
+    path = _make_pdf(tmp_path / 'doc.pdf', ['First page', 'Second page'])
+    for name in ('pdfium', 'pdfminer'):
+        pages = [text for text, scanned in pdf_backends.PDF_BACKENDS[name](path, 0, 2)]
+        assert [page.split() for page in pages] == [['First', 'page'], ['Second', 'page']]
+        assert all(page.endswith('\f') for page in pages)
+
+def test_pdf_scanned_pages_routed_to_ocr(tmp_path, monkeypatch):
+    """Test image pages without a text layer are sent to OCR when ocr_url is set, and blank pages are not"""
+    path = _make_pdf(tmp_path / 'doc.pdf', ['Typed', '', None])
+    monkeypatch.setattr(pdf_backends, 'ocr_page', lambda file_path, page_number, settings: 'Recognized')
+
+    for name in ('pdfium', 'pdfminer'):
+        assert [scanned for _, scanned in pdf_backends.PDF_BACKENDS[name](path, 0, 3)] == [False, False, True]
+
+    settings = {'backends': ['pdfminer'], 'ocr_url': ''}
+    result = pdf_backends.extract_pages(path, 0, 3, settings)
+    assert (result['scanned'], result['ocr']) == (1, 0)
+
+    result = pdf_backends.extract_pages(path, 0, 3, {**settings, 'ocr_url': 'http://ocr:5001'})
+    assert (result['scanned'], result['ocr']) == (1, 1)
+    assert result['pages'][2] == 'Recognized\n\f'
+    assert result['pages'][1] != 'Recognized\n\f'
+
+def test_xlsx_streams_every_sheet_as_csv_chunks(tmp_path):
+    """Test every sheet is converted, in chunks of rows, skipping empty rows"""
+    from openpyxl import Workbook # type: ignore
+    workbook = Workbook()
+    first = workbook.active
+    first.title = 'Totals'
+    first.append(['region', 'amount'])
+    first.append(['north, east', 10])
+    first.append([None, None])
+    first.append(['south', 2.5])
+    second = workbook.create_sheet('Notes')
+    second.append(['ok'])
+    path = tmp_path / 'book.xlsx'
+    workbook.save(path)
+
+    chunks = list(iter_xlsx_csv(str(path), rows_per_chunk=2))
+    assert len(chunks) == 3
+    assert ''.join(chunks) == (
+        '# sheet: Totals\nregion,amount\n"north, east",10\nsouth,2.5\n'
+        '\n# sheet: Notes\nok\n'
+    )
+
+    single = Workbook()
+    single.active.append(['only', 1])
+    single.save(tmp_path / 'single.xlsx')
+    assert ''.join(iter_xlsx_csv(str(tmp_path / 'single.xlsx'))) == 'only,1\n'
+
+DOCX_NAMESPACES = ('xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+                   'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006"')
+
+def _make_docx(path, body, header='', footer=''):
+    """Write a DOCX holding just the parts the extractor reads"""
+    import zipfile
+    def paragraph(text):
+        return f'<w:p><w:r><w:t>{text}</w:t></w:r></w:p>'
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('word/document.xml', f'<w:document {DOCX_NAMESPACES}><w:body>{body}</w:body></w:document>')
+        if header:
+            archive.writestr('word/header1.xml', f'<w:hdr {DOCX_NAMESPACES}>{paragraph(header)}<w:p/></w:hdr>')
+        if footer:
+            archive.writestr('word/footer1.xml', f'<w:ftr {DOCX_NAMESPACES}>{paragraph(footer)}</w:ftr>')
+    return str(path)
+
+def test_docx_streams_body_tables_headers_and_footers(tmp_path):
+    """Test document order, tab-separated table rows with nested tables folded in, and header/footer placement"""
+    def cell(text):
+        return f'<w:tc><w:p><w:r><w:t>{text}</w:t></w:r></w:p></w:tc>'
+    nested = f'<w:tc><w:tbl><w:tr>{cell("x")}{cell("y")}</w:tr></w:tbl></w:tc>'
+    body = (
+        '<w:p><w:pPr><w:tabs><w:tab w:val="left"/></w:tabs></w:pPr>'
+        '<w:r><w:t>First</w:t></w:r><w:r><w:tab/><w:t>tabbed</w:t></w:r></w:p>'
+        '<w:p/>'
+        f'<w:tbl><w:tr>{cell("A")}{cell("B")}</w:tr><w:tr>{cell("C")}{nested}</w:tr></w:tbl>'
+        '<w:p><w:r><w:t>After table</w:t></w:r></w:p>'
+    )
+    path = _make_docx(tmp_path / 'doc.docx', body, header='Header', footer='Footer')
+    assert extract_text_from_docx(path) == 'Header\nFirst\ttabbed\n\nA\tB\nC\tx\ty\nAfter table\nFooter\n'
+
+def test_docx_text_box_read_once_and_set_apart(tmp_path):
+    """Test a text box is taken from mc:Choice only, separated from its anchor text"""
+    box = ('<w:txbxContent><w:p><w:r><w:t>BOX</w:t></w:r></w:p>'
+           '<w:p><w:r><w:t>TWO</w:t></w:r></w:p></w:txbxContent>')
+    body = (
+        '<w:p><w:r><w:t>Anchor</w:t></w:r><w:r><mc:AlternateContent>'
+        f'<mc:Choice Requires="wps"><w:drawing>{box}</w:drawing></mc:Choice>'
+        f'<mc:Fallback><w:pict>{box}</w:pict></mc:Fallback>'
+        '</mc:AlternateContent></w:r><w:r><w:t>after</w:t></w:r></w:p>'
+        '<w:p><w:r><w:t>Next</w:t></w:r></w:p>'
+    )
+    path = _make_docx(tmp_path / 'boxes.docx', body)
+    assert extract_text_from_docx(path) == 'Anchor BOX TWO after\nNext\n'
+
+def test_jsonl_output_records_pages_and_document(config):
+    """Test jsonl output holds one record per PDF page plus a document record"""
+    config['output'] = {'format': 'jsonl'}
+    writer = OutputWriter(config)
+    committed = []
+
+    def pages():
+        yield 'one\n\f'
+        yield 'two\n\f'
+        return 'pdfium'
+
+    assert writer.write('/in/a.pdf', pages(), 'abc', on_commit=committed.append) == 8
+    output_path = os.path.join(config['output_directory'], 'a.pdf.jsonl')
+    assert committed == [output_path]
+    with open(output_path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert [(r['type'], r.get('page'), r.get('text')) for r in records[:2]] == [('page', 1, 'one\n'), ('page', 2, 'two\n')]
+    assert records[2]['type'] == 'document'
+    assert (records[2]['extractor'], records[2]['records'], records[2]['source_hash']) == ('pdf/pdfium', 2, 'abc')
+    assert os.listdir(config['output_directory']) == ['a.pdf.jsonl']
+
+def test_output_write_is_atomic(config):
+    """Test a failed extraction leaves neither a partial output nor a temporary file"""
+    writer = OutputWriter(config)
+
+    def failing():
+        yield 'partial'
+        raise RuntimeError('extractor crashed')
+
+    with pytest.raises(RuntimeError):
+        writer.write('/in/a.docx', failing())
+    assert writer.write('/in/empty.txt', '') == 0
+    assert os.listdir(config['output_directory']) == []
+
+def test_small_jsonl_outputs_batched_into_segments(config):
+    """Test small outputs share a segment and are only committed once it is rolled into place"""
+    config['output'] = {'format': 'jsonl', 'batch_below_bytes': 10000, 'segment_age': 3600}
+    writer = OutputWriter(config)
+    committed = []
+    writer.write('/in/a.txt', 'alpha', 'h1', on_commit=committed.append)
+    writer.write('/in/b.txt', 'beta', 'h2', on_commit=committed.append)
+    assert committed == []
+    assert [name for name in os.listdir(config['output_directory']) if not name.startswith('.')] == []
+
+    writer.roll_if_due()
+    assert committed == []
+    writer.close()
+    assert len(committed) == 2 and committed[0] == committed[1]
+    with open(committed[0], encoding='utf-8') as f:
+        sources = [json.loads(line)['source'] for line in f if '"document"' in line]
+    assert sources == ['/in/a.txt', '/in/b.txt']
+
+def _pages(*pages, detail='pdfium'):
+    yield from pages
+    return detail
+
+def test_cache_hit_streams_pdf_pages_with_detail(config):
+    """Test a fully consumed extraction is served again page by page, with its return value"""
+    extraction_cache = ExtractionCache(config)
+    key = extraction_cache.key('/in/a.pdf', 'abc')
+    assert extraction_cache.get('/in/a.pdf', key) is None
+    assert _drain(extraction_cache.store(key, _pages('one\f', 'two\f'))) == (['one\f', 'two\f'], 'pdfium')
+    assert _drain(extraction_cache.get('/in/copy.pdf', key)) == (['one\f', 'two\f'], 'pdfium')
+
+    text_key = extraction_cache.key('/in/a.txt', 'abc')
+    assert list(extraction_cache.store(text_key, 'plain text')) == ['plain text']
+    assert ''.join(extraction_cache.get('/in/b.txt', text_key)) == 'plain text'
+
+def test_cache_key_covers_settings_and_version(monkeypatch):
+    """Test the key changes with the file type, PDF settings and extractor version, but not the timeout"""
+    key = cache_key('/in/a.pdf', 'abc')
+    assert cache_key('/elsewhere/b.pdf', 'abc') == key
+    assert cache_key('/in/a.txt', 'abc') != key
+    assert cache_key('/in/a.pdf', 'abc', {'backends': ['pdfminer']}) != key
+    assert cache_key('/in/a.pdf', 'abc', {'max_pages': 5}) != key
+    assert cache_key('/in/a.pdf', 'abc', {'timeout': 5}) == key
+    monkeypatch.setattr(cache, 'EXTRACTOR_VERSION', cache.EXTRACTOR_VERSION + 1)
+    assert cache_key('/in/a.pdf', 'abc') != key
+
+def test_cache_evicts_least_recently_used(config):
+    """Test entries past max_bytes are evicted oldest use first"""
+    config['cache'] = {'max_bytes': 25}
+    extraction_cache = ExtractionCache(config)
+    keys = [extraction_cache.key(f'/in/{name}.txt', name) for name in 'abc']
+    for key in keys[:2]:
+        list(extraction_cache.store(key, 'x' * 10))
+        time.sleep(0.01)
+    # Reading the first entry makes the second the least recently used
+    list(extraction_cache.get('/in/a.txt', keys[0]))
+    time.sleep(0.01)
+    list(extraction_cache.store(keys[2], 'x' * 10))
+    assert extraction_cache.get('/in/a.txt', keys[0]) is not None
+    assert extraction_cache.get('/in/b.txt', keys[1]) is None
+    assert extraction_cache.get('/in/c.txt', keys[2]) is not None
+
+def test_cache_skips_incomplete_and_partial_extractions(config):
+    """Test timed-out and partly consumed extractions are not cached, and leave no temporary files"""
+    extraction_cache = ExtractionCache(config)
+    key = extraction_cache.key('/in/a.pdf', 'abc')
+    assert _drain(extraction_cache.store(key, _pages('one\f', detail='pdfium' + INCOMPLETE)))[0] == ['one\f']
+    assert extraction_cache.get('/in/a.pdf', key) is None
+
+    stream = extraction_cache.store(key, _pages('one\f', 'two\f'))
+    next(stream)
+    stream.close()
+    assert extraction_cache.get('/in/a.pdf', key) is None
+    assert not [name for _, _, names in os.walk(extraction_cache.directory) for name in names if name.endswith('.tmp')]
+
+def test_isolated_extraction_streams_chunks(tmp_path):
+    """Test a limited child process streams the same text as in-process extraction"""
+    path = _make_docx(tmp_path / 'a.docx', '<w:p><w:r><w:t>Isolated</w:t></w:r></w:p>')
+    assert _drain(extract_isolated(path, timeout=30, max_memory_mb=1024)) == (['Isolated\n'], None)
+
+def test_isolated_extraction_enforces_limits(tmp_path):
+    """Test a stalled extraction is killed at the timeout and a runaway one stopped by the memory limit"""
+    # Opening a FIFO with no writer blocks, like a parser stuck on a malformed file
+    stalled = str(tmp_path / 'stalled.txt')
+    os.mkfifo(stalled)
+    started = time.monotonic()
+    with pytest.raises(ExtractionLimitExceeded) as exceeded:
+        list(extract_isolated(stalled, timeout=0.5))
+    assert exceeded.value.reason == 'timeout'
+    assert time.monotonic() - started < 30
+
+    large = tmp_path / 'large.txt'
+    large.write_text('x' * (64 * 1024 * 1024))
+    with pytest.raises(ExtractionLimitExceeded) as exceeded:
+        list(extract_isolated(str(large), max_memory_mb=1))
+    assert exceeded.value.reason == 'memory'
+
+def test_pdfs_are_limited_by_default(config, tmp_path):
+    """Test PDFs extract in a killable child by default, and a PDF timeout there surfaces as a limit"""
+    config['limits'] = {'timeout': 30}
+    pool = WorkerPool(config, lambda file_path, extract: None)
+    try:
+        assert '.pdf' in pool.limited_types
+        assert '.pdf' not in pool.process_types
+    finally:
+        pool.shutdown()
+
+    path = _make_pdf(tmp_path / 'doc.pdf', ['Page 0'])
+    with pytest.raises(ExtractionLimitExceeded) as exceeded:
+        list(extract_isolated(path, pdf={'timeout': 1e-9}, timeout=30))
+    assert exceeded.value.reason == 'timeout'
+    assert 'pdf.timeout' in exceeded.value.detail
+
+def test_quarantine_keeps_existing_files(tmp_path):
+    """Test quarantined files move out of the input, suffixed with a timestamp on a name collision"""
+    directory = tmp_path / 'quarantine'
+    for content in ('first', 'second'):
+        (tmp_path / 'bad.docx').write_text(content)
+        destination = quarantine(str(tmp_path / 'bad.docx'), str(directory))
+        assert not (tmp_path / 'bad.docx').exists()
+    assert destination != str(directory / 'bad.docx')
+    assert destination.startswith(str(directory / 'bad.')) and destination.endswith('.docx')
+    assert sorted(path.read_text() for path in directory.iterdir()) == ['first', 'second']
+
+def test_handler_quarantines_poison_files_and_their_copies(config):
+    """Test a file over its limits is quarantined and the same bytes under another name are never extracted"""
+    handler = DocETLHandler(config)
+    calls = []
+
+    def exceed(file_path):
+        calls.append(file_path)
+        raise ExtractionLimitExceeded(file_path, 'timeout', '5s')
+
+    try:
+        first = os.path.join(config['input_directory'], 'bad.docx')
+        copy = os.path.join(config['input_directory'], 'copy.docx')
+        for path in (first, copy):
+            with open(path, 'wb') as f:
+                f.write(b'poison')
+        assert handler.process_file(first, exceed) == 'quarantined'
+        assert handler.process_file(copy, exceed) == 'quarantined'
+        assert calls == [first]
+        assert os.listdir(config['input_directory']) == []
+        assert sorted(os.listdir(handler.quarantine_directory)) == ['bad.docx', 'copy.docx']
+        assert handler.manifest.quarantine_reason(file_digest(os.path.join(handler.quarantine_directory, 'bad.docx'))) == 'timeout: 5s'
+    finally:
+        handler.events.stop()
+        handler.pool.shutdown()
+        handler.output.close()
+
+def test_batch_inputs_from_directories_globs_and_lists(tmp_path):
+    """Test directory, glob and @list sources are expanded, skipping hidden files, and their common root found"""
+    for name in ('a/one.txt', 'a/.hidden.txt', 'a/deep/two.txt', 'b/three.pdf'):
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text(name)
+    listing = tmp_path / 'list.txt'
+    listing.write_text(f"{tmp_path / 'b' / 'three.pdf'}\n\n")
+    a, b = str(tmp_path / 'a'), str(tmp_path / 'b')
+
+    assert list(iter_inputs([a])) == [os.path.join(a, 'one.txt')]
+    assert list(iter_inputs([a], recursive=True)) == [os.path.join(a, 'one.txt'), os.path.join(a, 'deep', 'two.txt')]
+    assert list(iter_inputs([f'{b}/*.pdf', f'@{listing}'])) == [os.path.join(b, 'three.pdf')] * 2
+
+    assert source_root([a]) == a
+    assert source_root([a, f'{b}/**/*.pdf']) == str(tmp_path)
+    assert source_root([os.path.join(a, 'one.txt')]) == a
+    assert source_root([a, f'@{listing}']) == os.sep
+
+def test_output_names_keep_same_named_inputs_apart(tmp_path):
+    """Test inputs mirror their path under the source root, and inputs outside it get a directory hash"""
+    root = str(tmp_path)
+    assert output_name('/x/report.pdf', 'txt') == 'report.pdf.txt'
+    assert output_name(str(tmp_path / 'a' / 'report.pdf'), 'txt', root) == os.path.join('a', 'report.pdf.txt')
+    outside = [output_name(f'/elsewhere/{d}/report.pdf', 'txt', root) for d in 'ab']
+    assert outside[0] != outside[1]
+    assert all(name.startswith('report.pdf.') and os.sep not in name for name in outside)
+
+def test_batch_resumes_from_checkpoint(tmp_path, monkeypatch):
+    """Test a batch run mirrors the input tree, and a second run only processes files that are new"""
+    for name in ('a/report.txt', 'b/report.txt'):
+        (tmp_path / 'input' / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / 'input' / name).write_text(f'text of {name}')
+    config_path = tmp_path / 'config.yaml'
+    config_path.write_text(yaml.safe_dump({
+        'input_directory': str(tmp_path / 'input'),
+        'output_directory': str(tmp_path / 'output'),
+        'file_types': ['.txt'],
+        'workers': {'process_types': []},
+        'limits': {'timeout': 0, 'max_memory_mb': 0},
+    }))
+    processed = []
+    process_file = BatchHandler.process_file
+
+    def counting(self, file_path, *args):
+        processed.append(os.path.relpath(file_path, tmp_path / 'input'))
+        return process_file(self, file_path, *args)
+
+    monkeypatch.setattr(BatchHandler, 'process_file', counting)
+    monkeypatch.chdir(tmp_path)
+    handlers = {signum: signal.getsignal(signum) for signum in (signal.SIGINT, signal.SIGTERM)}
+    argv = [str(tmp_path / 'input'), '--recursive', '--config', str(config_path)]
+    try:
+        assert batch.main(argv) == 0
+        assert sorted(processed) == [os.path.join('a', 'report.txt'), os.path.join('b', 'report.txt')]
+        with open(tmp_path / 'output' / 'b' / 'report.txt.txt', encoding='utf-8') as f:
+            assert f.read() == 'text of b/report.txt'
+
+        processed.clear()
+        (tmp_path / 'input' / 'a' / 'new.txt').write_text('new')
+        assert batch.main(argv) == 0
+        assert processed == [os.path.join('a', 'new.txt')]
+    finally:
+        # main installs its own signal handlers and log sinks
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+        logger.remove()
@@ -0,0 +1,170 @@
+import os
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from loguru import logger # type: ignore
+from prometheus_client import Counter, Gauge # type: ignore
+from etl import extract_data, extract_text
+from isolation import extract_isolated, limits_settings
+
+# Metrics
+FILES_QUEUED = Gauge('files_queued', 'Files waiting for a worker', ['file_type'])
+FILES_IN_FLIGHT = Gauge('files_in_flight', 'Files being processed', ['file_type'])
+DUPLICATE_EVENTS = Counter('duplicate_file_events_total', 'File events dropped because the file was already queued')
+
+DEFAULT_WORKERS = {
+    'default_concurrency': 2,
+    'concurrency': {'.pdf': 2, '.docx': 4, '.txt': 4, '.xlsx': 2},
+    'process_types': ['.pdf'],
+    'processes': 0,  # process pool size, 0 = one per CPU
+}
+
+_STOP = object()
+
+
+def file_type(file_path):
+    return os.path.splitext(file_path)[1].lower() or 'none'
+
+
+class WorkerPool:
+    """
+    Bounded, per-file-type worker pool fed by queues
+
+    Every file type listed under `workers.concurrency` in the config gets
+    its own queue and that many worker threads, so a backlog of slow PDFs
+    never holds up DOCX or TXT files. Types in `workers.process_types`
+    run extraction in a shared process pool, sidestepping the GIL; PDFs
+    are split into page ranges so one large file can use every process.
+    Types under `limits` (PDFs included by default) instead get a child
+    process of their own per file (see isolation), which can be killed at
+    its time or memory budget where a busy pool process cannot; those
+    never use the shared pool. Everything else extracts in the worker
+    thread. A path is accepted once until it finishes, so repeated events
+    for a queued or running file are dropped.
+    """
+
+    def __init__(self, config, process):
+        """
+        Args:
+            config: Service config; reads the optional `workers` section
+            process: Callable (file_path, extract) doing the work for one
+                     file, where extract(file_path) returns its text
+        """
+        settings = {**DEFAULT_WORKERS, **(config.get('workers') or {})}
+        concurrency = {**DEFAULT_WORKERS['concurrency'], **(settings['concurrency'] or {})}
+        self.process = process
+        self.concurrency = {ext.lower(): int(n) for ext, n in concurrency.items()}
+        self.default_concurrency = int(settings['default_concurrency'])
+        self.process_workers = int(settings['processes']) or os.cpu_count() or 1
+        self.pdf = config.get('pdf')
+        limits = limits_settings(config)
+        self.timeout = float(limits['timeout'])
+        self.max_memory_mb = int(limits['max_memory_mb'])
+        self.limited_types = {ext.lower() for ext in limits['types']} if self.timeout or self.max_memory_mb else set()
+        self.process_types = {ext.lower() for ext in settings['process_types']} - self.limited_types
+
+        self._queues = {}
+        self._threads = {}
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._stopped = False
+
+        # spawn: forking a process that already runs threads can deadlock
+        self._processes = ProcessPoolExecutor(
+            max_workers=self.process_workers,
+            mp_context=multiprocessing.get_context('spawn')
+        ) if self.process_types else None
+
+    def _queue_for(self, ext):
+        """Queue for a file type, starting its workers on first use"""
+        key = ext if ext in self.concurrency else 'default'
+        work_queue = self._queues.get(key)
+        if work_queue is None:
+            work_queue = self._queues[key] = queue.Queue()
+            threads = self._threads[key] = []
+            for i in range(max(1, self.concurrency.get(key, self.default_concurrency))):
+                thread = threading.Thread(target=self._run, args=(work_queue,),
+                                          name=f'docetl-{key.lstrip(".")}-{i}', daemon=True)
+                thread.start()
+                threads.append(thread)
+        return work_queue
+
+    def submit(self, file_path):
+        """
+        Queue a file unless it is already queued or being processed
+
+        Returns:
+            True when the file was queued
+        """
+        ext = file_type(file_path)
+        with self._lock:
+            if self._stopped:
+                return False
+            if file_path in self._pending:
+                DUPLICATE_EVENTS.inc()
+                return False
+            self._pending.add(file_path)
+            work_queue = self._queue_for(ext)
+        work_queue.put(file_path)
+        FILES_QUEUED.labels(file_type=ext).inc()
+        return True
+
+    @property
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _extract(self, file_path):
+        ext = file_type(file_path)
+        if ext in self.limited_types:
+            # Own process per file, so it can be killed at its time or memory budget
+            return extract_isolated(file_path, self.pdf, self.timeout, self.max_memory_mb)
+        if self._processes is None or ext not in self.process_types:
+            return extract_data(file_path, pdf=self.pdf)
+        if ext == '.pdf':
+            # Page ranges fan out across the pool and stream back in order
+            return extract_data(file_path, pdf=self.pdf, executor=self._processes, window=self.process_workers)
+        return self._processes.submit(extract_text, file_path, self.pdf).result()
+
+    def _run(self, work_queue):
+        while True:
+            file_path = work_queue.get()
+            if file_path is _STOP:
+                return
+            ext = file_type(file_path)
+            FILES_QUEUED.labels(file_type=ext).dec()
+            FILES_IN_FLIGHT.labels(file_type=ext).inc()
+            try:
+                self.process(file_path, self._extract)
+            except Exception as e:
+                logger.error(f"Worker failed on {file_path}: {e}")
+            finally:
+                FILES_IN_FLIGHT.labels(file_type=ext).dec()
+                with self._lock:
+                    self._pending.discard(file_path)
+
+    def shutdown(self):
+        """
+        Stop after the files currently being processed
+
+        Files still queued are left for the startup scan of the next run.
+        """
+        with self._lock:
+            self._stopped = True
+            workers = [(self._queues[key], self._threads[key]) for key in self._queues]
+        for work_queue, threads in workers:
+            while True:
+                try:
+                    file_path = work_queue.get_nowait()
+                except queue.Empty:
+                    break
+                FILES_QUEUED.labels(file_type=file_type(file_path)).dec()
+            for _ in threads:
+                work_queue.put(_STOP)
+        for _, threads in workers:
+            for thread in threads:
+                thread.join()
+        if self._processes is not None:
+            self._processes.shutdown(wait=True, cancel_futures=True)
+        logger.info("DocETL worker pool stopped")
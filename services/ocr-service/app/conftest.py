@@ -0,0 +1,18 @@
+import os
+import shutil
+import tempfile
+
+_state_dir = None
+
+
+def pytest_configure(config):
+    """Point the result cache and job store at a scratch directory before main is imported"""
+    global _state_dir
+    _state_dir = tempfile.mkdtemp(prefix='ocr-test-')
+    os.environ['OCR_CACHE_DIR'] = os.path.join(_state_dir, 'cache')
+    os.environ['OCR_JOBS_DIR'] = os.path.join(_state_dir, 'jobs')
+
+
+def pytest_unconfigure(config):
+    if _state_dir is not None:
+        shutil.rmtree(_state_dir, ignore_errors=True)
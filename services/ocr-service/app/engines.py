@@ -0,0 +1,268 @@
+import os
+import threading
+import logging
+from typing import Dict, List, Any, Optional, Type
+from PIL import Image
+from ocr_engine import OCREngine, MIN_CONFIDENCE, decode_image
+from ingestion import ImageSource
+from layout import to_arrays, format_detections, ordered_text
+from reader_pool import READER_CONCURRENCY
+from worker_pool import get_worker_pool, OCR_BACKEND, WORKER_COUNT, MAX_QUEUE_DEPTH
+from profiling import stage
+
+logger = logging.getLogger(__name__)
+
+ENGINE_ACQUIRE_TIMEOUT = float(os.getenv('OCR_ENGINE_ACQUIRE_TIMEOUT', '60'))
+DEFAULT_ENGINE = os.getenv('OCR_DEFAULT_ENGINE', 'tesseract')
+
+
+class EngineBusy(RuntimeError):
+    """Raised when an engine's concurrency limit stays exhausted past the timeout"""
+
+
+class BaseEngine:
+    """
+    Common interface for OCR engines
+
+    Subclasses set `name`, `description` and `capabilities`, and implement
+    `_load` (called once, lazily, on first use) and `_process`. An engine
+    that bounds its own concurrency sets `_slots` to None.
+    """
+    name = ''
+    description = ''
+    capabilities: Dict[str, Any] = {}
+    default_concurrency = 1
+
+    def __init__(self, concurrency: Optional[int] = None):
+        env_value = os.getenv(f'OCR_ENGINE_CONCURRENCY_{self.name.upper()}')
+        self.concurrency = max(1, concurrency or int(env_value or self.default_concurrency))
+        self._slots: Optional[threading.BoundedSemaphore] = threading.BoundedSemaphore(self.concurrency)
+        self._load_lock = threading.Lock()
+        self.loaded = False
+
+    def ensure_loaded(self) -> None:
+        """Load models on first use"""
+        if self.loaded:
+            return
+        with self._load_lock:
+            if not self.loaded:
+                logger.info(f"Loading OCR engine: {self.name}")
+                self._load()
+                self.loaded = True
+
+    def process(self, image_bytes: ImageSource) -> List[Dict[str, Any]]:
+        """
+        OCR raw image bytes or an Upload within the engine's concurrency limit
+
+        Returns:
+            List of OCR results with text, confidence, and bounding boxes
+
+        Raises:
+            EngineBusy: When no slot frees up within the acquire timeout
+        """
+        slots = self._slots
+        if slots is not None and not slots.acquire(timeout=ENGINE_ACQUIRE_TIMEOUT):
+            raise EngineBusy(f"OCR engine '{self.name}' busy")
+        try:
+            self.ensure_loaded()
+            return self._process(image_bytes)
+        finally:
+            if slots is not None:
+                slots.release()
+
+    def full_text(self, results: List[Dict[str, Any]]) -> str:
+        with stage('postprocess'):
+            return ordered_text(results)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'description': self.description,
+            'capabilities': self.capabilities,
+            'concurrency': self.concurrency,
+            'loaded': self.loaded
+        }
+
+    def _load(self) -> None:
+        pass
+
+    def _process(self, image_bytes: ImageSource) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+
+ENGINE_REGISTRY: Dict[str, Type[BaseEngine]] = {}
+_instances: Dict[str, BaseEngine] = {}
+_instances_lock = threading.Lock()
+
+
+def register_engine(cls: Type[BaseEngine]) -> Type[BaseEngine]:
+    """Class decorator adding an engine to the registry under its name"""
+    ENGINE_REGISTRY[cls.name] = cls
+    return cls
+
+
+def get_engine(name: str) -> BaseEngine:
+    """
+    Return the shared instance of a registered engine
+
+    Raises:
+        ValueError: For unknown engine names
+    """
+    name = name.lower()
+    if name not in ENGINE_REGISTRY:
+        raise ValueError(f"Invalid engine. Use one of: {', '.join(sorted(ENGINE_REGISTRY))}")
+    engine = _instances.get(name)
+    if engine is None:
+        with _instances_lock:
+            engine = _instances.get(name)
+            if engine is None:
+                engine = _instances[name] = ENGINE_REGISTRY[name]()
+    return engine
+
+
+def engine_names() -> List[str]:
+    return sorted(ENGINE_REGISTRY)
+
+
+def engines_info() -> List[Dict[str, Any]]:
+    return [get_engine(name).info() for name in engine_names()]
+
+
+@register_engine
+class EasyOCRBackend(BaseEngine):
+    name = 'easyocr'
+    description = 'EasyOCR deep-learning detector and recognizer'
+    capabilities = {
+        'bounding_boxes': True,
+        'confidence': True,
+        'multipage': True,
+        'languages': ['en'],
+        'relative_cost': 10
+    }
+    default_concurrency = READER_CONCURRENCY
+    # OCR_BACKEND=process runs inference in the worker pool
+    uses_worker_pool = OCR_BACKEND == 'process'
+
+    def __init__(self, concurrency: Optional[int] = None):
+        super().__init__(concurrency)
+        self.ocr_engine: Optional[OCREngine] = None
+        if self.uses_worker_pool:
+            # The pool bounds in-flight images itself and raises PoolSaturated
+            # (429) when full; a reader-sized semaphore would serialize it
+            self.concurrency = max(WORKER_COUNT, MAX_QUEUE_DEPTH, 1)
+            self._slots = None
+
+    def _load(self) -> None:
+        # The reader itself loads lazily, so with the worker pool the
+        # parent only holds the preset and result cache
+        self.ocr_engine = OCREngine()
+        if self.uses_worker_pool:
+            get_worker_pool()
+
+    def _process(self, image_bytes: ImageSource) -> List[Dict[str, Any]]:
+        worker_pool = get_worker_pool()
+        if worker_pool is None:
+            return self.ocr_engine._process_image_bytes(image_bytes)
+
+        # Run in the process pool, still answering repeats from the cache
+        cache = self.ocr_engine.cache
+        key = self.ocr_engine._cache_key(image_bytes)
+        cached = cache.get(key) if key else None
+        if cached is not None:
+            return cached
+
+        image_np = decode_image(image_bytes)
+        with stage('worker_inference'):
+            results = worker_pool.process(image_np, preset=self.ocr_engine.preset_name)['detailed_results']
+        if key:
+            cache.put(key, results)
+        return results
+
+    def get_ocr_engine(self) -> OCREngine:
+        self.ensure_loaded()
+        return self.ocr_engine
+
+
+@register_engine
+class EasyOCROnnxBackend(EasyOCRBackend):
+    name = 'easyocr-onnx'
+    description = 'EasyOCR models exported to ONNX with int8 dynamic quantization, on ONNX Runtime (CPU)'
+    capabilities = {
+        'bounding_boxes': True,
+        'confidence': True,
+        'multipage': True,
+        'languages': ['en'],
+        'relative_cost': 5
+    }
+    uses_worker_pool = False
+
+    def _load(self) -> None:
+        self.ocr_engine = OCREngine(backend='onnx')
+
+    def _process(self, image_bytes: ImageSource) -> List[Dict[str, Any]]:
+        # ONNX Runtime already spreads one inference over its intra-op
+        # threads, so this backend bypasses the process pool
+        return self.ocr_engine._process_image_bytes(image_bytes)
+
+
+@register_engine
+class TesseractBackend(BaseEngine):
+    name = 'tesseract'
+    description = 'Tesseract LSTM engine via pytesseract'
+    capabilities = {
+        'bounding_boxes': True,
+        'confidence': True,
+        'multipage': False,
+        'languages': ['en'],
+        'relative_cost': 3
+    }
+    default_concurrency = os.cpu_count() or 1
+
+    def __init__(self, concurrency: Optional[int] = None):
+        super().__init__(concurrency)
+        self.language = os.getenv('OCR_TESSERACT_LANG', 'eng')
+        self._pytesseract: Any = None
+
+    def _load(self) -> None:
+        import pytesseract # type: ignore
+        pytesseract.get_tesseract_version()
+        self._pytesseract = pytesseract
+
+    def _process(self, image_bytes: ImageSource) -> List[Dict[str, Any]]:
+        image = Image.fromarray(decode_image(image_bytes))
+        with stage('recognition'):
+            data = self._pytesseract.image_to_data(image, lang=self.language,
+                                                   output_type=self._pytesseract.Output.DICT)
+
+        with stage('postprocess'):
+            return self._format(data)
+
+    def _format(self, data: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+        """Convert pytesseract word boxes into result dictionaries"""
+        detections = []
+        for text, conf, left, top, width, height in zip(
+                data['text'], data['conf'], data['left'], data['top'], data['width'], data['height']):
+            if not text.strip() or float(conf) < 0:
+                continue
+            right, bottom = left + width, top + height
+            detections.append(([[left, top], [right, top], [right, bottom], [left, bottom]], text, float(conf) / 100))
+
+        boxes, texts, confidences = to_arrays(detections)
+        return format_detections(boxes, texts, confidences, MIN_CONFIDENCE)
+
+
+@register_engine
+class StubBackend(BaseEngine):
+    name = 'stub'
+    description = 'No-op engine returning no text; for routing, smoke tests and load tests'
+    capabilities = {
+        'bounding_boxes': False,
+        'confidence': False,
+        'multipage': False,
+        'languages': [],
+        'relative_cost': 0
+    }
+    default_concurrency = 64
+
+    def _process(self, image_bytes: ImageSource) -> List[Dict[str, Any]]:
+        return []
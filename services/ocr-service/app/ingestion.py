@@ -0,0 +1,161 @@
+import io
+import os
+import base64
+import shutil
+import hashlib
+import binascii
+import tempfile
+import logging
+from typing import Union, BinaryIO
+from profiling import stage
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+CHUNK_SIZE = 256 * 1024  # bytes read per step
+MAX_UPLOAD_SIZE = int(os.getenv('OCR_MAX_FILE_SIZE', str(16 * 1024 * 1024)))  # 16MB
+SPOOL_MAX_SIZE = int(os.getenv('OCR_SPOOL_MAX_SIZE', str(1024 * 1024)))  # larger uploads spill to disk
+BASE64_CHUNK = 4 * 64 * 1024  # base64 characters decoded per step (multiple of 4)
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload exceeds the size limit while being read"""
+
+
+def new_digest():
+    """Hash object used for content addressing"""
+    return hashlib.blake2b(digest_size=20)
+
+
+def content_digest(data: Union[bytes, memoryview]) -> str:
+    digest = new_digest()
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class Upload:
+    """
+    An uploaded image held as a seekable file rather than a bytes copy
+
+    Size and content digest are computed while the upload is read, so
+    validation and cache lookups never need the whole payload in memory
+    at once. PIL and the page splitters read straight from `open()`.
+    """
+
+    def __init__(self, file: BinaryIO, size: int, digest: str):
+        self.file = file
+        self.size = size
+        self.digest = digest
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Upload':
+        # BytesIO shares the bytes object's buffer until written to
+        return cls(io.BytesIO(data), len(data), content_digest(data))
+
+    @classmethod
+    def from_stream(cls, stream: BinaryIO, max_bytes: int, detach: bool = False) -> 'Upload':
+        """
+        Ingest a stream in chunks, enforcing `max_bytes` as it goes
+
+        Seekable streams (werkzeug already spools multipart files) are
+        hashed in place and reused without copying; anything else is
+        copied into a spooled temporary file. Pass `detach=True` to always
+        copy, for uploads that must outlive the request that owns `stream`.
+        """
+        with stage('upload_read'):
+            digest = new_digest()
+            size = 0
+
+            if stream.seekable() and not detach:
+                stream.seek(0)
+                target = stream
+            else:
+                target = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"File too large. Maximum size: {max_bytes // (1024 * 1024)}MB")
+                digest.update(chunk)
+                if target is not stream:
+                    target.write(chunk)
+
+            target.seek(0)
+            return cls(target, size, digest.hexdigest())
+
+    @classmethod
+    def from_base64(cls, data: str, max_bytes: int) -> 'Upload':
+        """
+        Decode base64 text incrementally into a spooled file
+
+        Raises:
+            ValueError: For malformed base64 input
+            UploadTooLarge: When the decoded size exceeds `max_bytes`
+        """
+        with stage('upload_read'):
+            # Clean base64 data
+            if data.startswith('data:'):
+                data = data.split(',', 1)[1]
+            if (len(data) - data.count('\n') - data.count('\r')) * 3 // 4 > max_bytes + 3:
+                raise UploadTooLarge(f"File too large. Maximum size: {max_bytes // (1024 * 1024)}MB")
+
+            target = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+            digest = new_digest()
+            size = 0
+            pending = ''
+
+            for start in range(0, len(data), BASE64_CHUNK):
+                # Whitespace may split quanta, so carry incomplete groups forward
+                pending += ''.join(data[start:start + BASE64_CHUNK].split())
+                usable = len(pending) - len(pending) % 4
+                if not usable:
+                    continue
+                try:
+                    chunk = base64.b64decode(pending[:usable], validate=True)
+                except (binascii.Error, ValueError) as e:
+                    raise ValueError(f'Invalid base64 data: {str(e)}')
+                pending = pending[usable:]
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"File too large. Maximum size: {max_bytes // (1024 * 1024)}MB")
+                digest.update(chunk)
+                target.write(chunk)
+
+            if pending:
+                raise ValueError('Invalid base64 data: incorrect padding')
+
+            target.seek(0)
+            return cls(target, size, digest.hexdigest())
+
+    def open(self) -> BinaryIO:
+        """Rewind and return the underlying file for reading"""
+        self.file.seek(0)
+        return self.file
+
+    def read(self) -> bytes:
+        """Materialize the payload; only for consumers that require bytes"""
+        return self.open().read()
+
+    def save(self, path: str) -> None:
+        """Copy the payload to a file in chunks"""
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(self.open(), f, CHUNK_SIZE)
+
+
+ImageSource = Union[bytes, Upload]
+
+
+def as_upload(source: ImageSource) -> Upload:
+    """Wrap raw bytes as an Upload; pass Uploads through"""
+    return source if isinstance(source, Upload) else Upload.from_bytes(source)
+
+
+def source_size(source: ImageSource) -> int:
+    return source.size if isinstance(source, Upload) else len(source)
+
+
+def source_digest(source: ImageSource) -> str:
+    return source.digest if isinstance(source, Upload) else content_digest(source)
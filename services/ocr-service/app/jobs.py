@@ -0,0 +1,322 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import logging
+from typing import Dict, Any, Optional, Callable, Iterator, List
+import requests # type: ignore
+from ingestion import Upload, ImageSource
+from profiling import timed
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+JOBS_DIR = os.getenv('OCR_JOBS_DIR', 'jobs')
+JOB_WORKERS = int(os.getenv('OCR_JOB_WORKERS', '2'))
+MAX_QUEUED_JOBS = int(os.getenv('OCR_JOB_MAX_QUEUED', '1000'))
+JOB_RETENTION = int(os.getenv('OCR_JOB_RETENTION', str(24 * 3600)))  # seconds
+MAX_RETAINED_JOBS = int(os.getenv('OCR_JOB_MAX_RETAINED', '5000'))
+STALE_JOB_SECONDS = int(os.getenv('OCR_JOB_STALE_SECONDS', '600'))
+HEARTBEAT_INTERVAL = max(1.0, STALE_JOB_SECONDS / 4)  # seconds between refreshes of running jobs
+CALLBACK_TIMEOUT = 10  # seconds
+CALLBACK_ATTEMPTS = 3
+POLL_INTERVAL = 1.0  # seconds
+
+QUEUED, RUNNING, COMPLETED, FAILED = 'queued', 'running', 'completed', 'failed'
+
+
+class QueueFull(RuntimeError):
+    """Raised when the job queue already holds MAX_QUEUED_JOBS"""
+
+
+class JobStore:
+    def __init__(self, directory: str = JOBS_DIR):
+        """
+        SQLite job table plus uploaded payload files
+
+        The database is shared by every worker process of the service, so
+        jobs are claimed with a conditional UPDATE rather than in memory.
+        Running jobs are kept fresh by their process's heartbeat, so only
+        jobs whose process died go stale.
+        """
+        self.directory = directory
+        os.makedirs(os.path.join(directory, 'payloads'), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, 'jobs.sqlite3'), timeout=10,
+                                     check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                filename TEXT,
+                callback_url TEXT,
+                engine TEXT,
+                options TEXT,
+                pages_done INTEGER DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                created REAL,
+                updated REAL
+            )
+        ''')
+        columns = {row['name'] for row in self._conn.execute('PRAGMA table_info(jobs)')}
+        for column in ('engine', 'options'):
+            if column not in columns:
+                self._conn.execute(f'ALTER TABLE jobs ADD COLUMN {column} TEXT')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)')
+
+    def payload_path(self, job_id: str) -> str:
+        return os.path.join(self.directory, 'payloads', job_id)
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def count(self, status: str) -> int:
+        return self._execute('SELECT COUNT(*) FROM jobs WHERE status = ?', (status,)).fetchone()[0]
+
+    def create(self, data: ImageSource, filename: str, callback_url: Optional[str],
+               engine: Optional[str] = None, options: Optional[Dict[str, Any]] = None) -> str:
+        job_id = uuid.uuid4().hex
+        path = self.payload_path(job_id)
+        if isinstance(data, Upload):
+            data.save(path + '.tmp')
+        else:
+            with open(path + '.tmp', 'wb') as f:
+                f.write(data)
+        os.replace(path + '.tmp', path)
+
+        now = time.time()
+        self._execute(
+            'INSERT INTO jobs (id, status, filename, callback_url, engine, options, created, updated) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (job_id, QUEUED, filename, callback_url, engine,
+             json.dumps(options) if options is not None else None, now, now)
+        )
+        return job_id
+
+    def claim(self) -> Optional[sqlite3.Row]:
+        """Atomically move the oldest queued job to running"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT id FROM jobs WHERE status = ? ORDER BY created LIMIT 1', (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            claimed = self._conn.execute(
+                'UPDATE jobs SET status = ?, updated = ? WHERE id = ? AND status = ?',
+                (RUNNING, time.time(), row['id'], QUEUED)
+            ).rowcount
+            if not claimed:
+                return None
+            return self._conn.execute('SELECT * FROM jobs WHERE id = ?', (row['id'],)).fetchone()
+
+    def get(self, job_id: str) -> Optional[sqlite3.Row]:
+        return self._execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+
+    def progress(self, job_id: str, pages_done: int) -> None:
+        self._execute('UPDATE jobs SET pages_done = ?, updated = ? WHERE id = ?',
+                      (pages_done, time.time(), job_id))
+
+    def heartbeat(self, job_ids: List[str]) -> None:
+        """Mark running jobs as still alive"""
+        now = time.time()
+        for job_id in job_ids:
+            self._execute('UPDATE jobs SET updated = ? WHERE id = ? AND status = ?', (now, job_id, RUNNING))
+
+    def finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None,
+               error: Optional[str] = None) -> None:
+        self._execute(
+            'UPDATE jobs SET status = ?, result = ?, error = ?, updated = ? WHERE id = ?',
+            (status, json.dumps(result) if result is not None else None, error, time.time(), job_id)
+        )
+        self._remove_payload(job_id)
+
+    def requeue_stale(self) -> int:
+        """Return running jobs whose heartbeat stopped (their process died) to the queue"""
+        return self._execute(
+            'UPDATE jobs SET status = ?, pages_done = 0 WHERE status = ? AND updated < ?',
+            (QUEUED, RUNNING, time.time() - STALE_JOB_SECONDS)
+        ).rowcount
+
+    def purge(self) -> None:
+        """Drop finished jobs past the retention age or count"""
+        finished = (COMPLETED, FAILED)
+        rows = self._execute(
+            'SELECT id FROM jobs WHERE status IN (?, ?) AND updated < ?',
+            finished + (time.time() - JOB_RETENTION,)
+        ).fetchall()
+        rows += self._execute(
+            'SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY updated DESC LIMIT -1 OFFSET ?',
+            finished + (MAX_RETAINED_JOBS,)
+        ).fetchall()
+        for row in rows:
+            self._execute('DELETE FROM jobs WHERE id = ?', (row['id'],))
+
+    def _remove_payload(self, job_id: str) -> None:
+        try:
+            os.remove(self.payload_path(job_id))
+        except FileNotFoundError:
+            pass
+
+
+class JobManager:
+    def __init__(self, process: Callable[[ImageSource, str, str, Optional[Dict[str, Any]]], Iterator[Dict[str, Any]]],
+                 store: Optional[JobStore] = None, workers: int = JOB_WORKERS, engine: str = 'easyocr'):
+        """
+        Background OCR job runner
+
+        Args:
+            process: Callable yielding per-page result dicts for
+                     (data, filename, engine, options)
+            store: Job persistence; defaults to a JobStore in OCR_JOBS_DIR
+            workers: Worker threads in this process
+            engine: Engine for jobs submitted without one
+        """
+        self.process = process
+        self.engine = engine
+        self.store = store or JobStore()
+        self.workers = max(1, workers)
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._running: set = set()
+        self._running_lock = threading.Lock()
+
+    def start(self) -> None:
+        requeued = self.store.requeue_stale()
+        if requeued:
+            logger.info(f"Requeued {requeued} stale OCR jobs")
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'ocr-job-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._heartbeat, name='ocr-job-heartbeat', daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+    def submit(self, data: ImageSource, filename: str, callback_url: Optional[str] = None,
+               engine: Optional[str] = None, options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Persist an upload and queue it for OCR
+
+        Args:
+            engine: Engine to run the job on; defaults to the manager's
+            options: Recognition options from recognition_options()
+
+        Raises:
+            QueueFull: When MAX_QUEUED_JOBS jobs are already waiting
+        """
+        if self.store.count(QUEUED) >= MAX_QUEUED_JOBS:
+            raise QueueFull(f"OCR job queue full ({MAX_QUEUED_JOBS} jobs waiting)")
+        job_id = self.store.create(data, filename, callback_url, engine or self.engine, options)
+        self._wakeup.set()
+        return job_id
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Public view of a job, including its result once finished"""
+        row = self.store.get(job_id)
+        if row is None:
+            return None
+
+        job = {
+            'job_id': row['id'],
+            'status': row['status'],
+            'filename': row['filename'],
+            'engine': row['engine'] or self.engine,
+            'pages_done': row['pages_done'],
+            'created': row['created'],
+            'updated': row['updated']
+        }
+        if row['result']:
+            job['result'] = json.loads(row['result'])
+        if row['error']:
+            job['error'] = row['error']
+        return job
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            row = self.store.claim()
+            if row is None:
+                # Other processes may enqueue too, so poll as well as wait
+                self._wakeup.wait(POLL_INTERVAL)
+                self._wakeup.clear()
+                continue
+            self._execute(row)
+
+    def _heartbeat(self) -> None:
+        """
+        Refresh this process's running jobs so requeue_stale leaves them
+        alone, then requeue jobs whose own process stopped refreshing them
+        """
+        while not self._stop.wait(HEARTBEAT_INTERVAL):
+            with self._running_lock:
+                running = list(self._running)
+            try:
+                self.store.heartbeat(running)
+                requeued = self.store.requeue_stale()
+            except Exception as e:
+                logger.warning(f"OCR job heartbeat failed: {str(e)}")
+                continue
+            if requeued:
+                logger.info(f"Requeued {requeued} stale OCR jobs")
+                self._wakeup.set()
+
+    def _execute(self, row: sqlite3.Row) -> None:
+        job_id = row['id']
+        engine = row['engine'] or self.engine
+        options = json.loads(row['options']) if row['options'] else None
+        logger.info(f"Running OCR job {job_id} ({row['filename']}) on {engine}")
+        with self._running_lock:
+            self._running.add(job_id)
+        try:
+            pages = []
+            with open(self.store.payload_path(job_id), 'rb') as f, timed(engine):
+                upload = Upload.from_stream(f, os.path.getsize(f.name))
+                for page in self.process(upload, row['filename'], engine, options):
+                    pages.append(page)
+                    self.store.progress(job_id, len(pages))
+
+            result = {
+                'pages': pages,
+                'full_text': '\n\n'.join(p['full_text'] for p in pages if p.get('full_text')),
+                'total_pages': len(pages)
+            }
+            self.store.finish(job_id, COMPLETED, result=result)
+            logger.info(f"OCR job {job_id} completed: {len(pages)} pages")
+
+        except Exception as e:
+            logger.error(f"OCR job {job_id} failed: {str(e)}")
+            self.store.finish(job_id, FAILED, error=str(e))
+        finally:
+            with self._running_lock:
+                self._running.discard(job_id)
+
+        self.store.purge()
+        if row['callback_url']:
+            self._notify(row['callback_url'], self.status(job_id))
+
+    def _notify(self, url: str, job: Optional[Dict[str, Any]]) -> None:
+        """POST the finished job to its callback URL, with retries"""
+        for attempt in range(1, CALLBACK_ATTEMPTS + 1):
+            try:
+                response = requests.post(url, json=job, timeout=CALLBACK_TIMEOUT)
+                if response.status_code < 500:
+                    return
+                logger.warning(f"Callback {url} returned {response.status_code} (attempt {attempt})")
+            except Exception as e:
+                logger.warning(f"Callback {url} failed (attempt {attempt}): {str(e)}")
+            if attempt < CALLBACK_ATTEMPTS:
+                time.sleep(2 ** attempt)
+        logger.error(f"Giving up on callback {url} for job {job['job_id'] if job else ''}")
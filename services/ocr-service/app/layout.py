@@ -0,0 +1,128 @@
+import logging
+from typing import List, Dict, Any, Tuple
+import numpy as np # type: ignore
+
+logger = logging.getLogger(__name__)
+
+CORNERS = ('top_left', 'top_right', 'bottom_right', 'bottom_left')
+
+# Layout thresholds, as multiples of the median text height
+COLUMN_GAP = 1.5      # horizontal whitespace that separates columns
+PARAGRAPH_GAP = 0.9   # vertical whitespace that separates blocks/paragraphs
+LINE_TOLERANCE = 0.5  # centre-y distance for boxes on the same line
+
+
+def to_arrays(ocr_results: List[Any]) -> Tuple[np.ndarray, List[str], np.ndarray]:
+    """
+    Convert EasyOCR (bbox, text, confidence) tuples into arrays
+
+    Returns:
+        (boxes of shape N x 4 x 2, texts, confidences of shape N)
+    """
+    if not ocr_results:
+        return np.zeros((0, 4, 2)), [], np.zeros(0)
+    bboxes, texts, confidences = zip(*ocr_results)
+    return np.asarray(bboxes, dtype=float).reshape(-1, 4, 2), list(texts), np.asarray(confidences, dtype=float)
+
+
+def format_detections(boxes: np.ndarray, texts: List[str], confidences: np.ndarray,
+                      min_confidence: float) -> List[Dict[str, Any]]:
+    """
+    Threshold and round detections in bulk, then build result dictionaries
+
+    Args:
+        boxes: N x 4 x 2 corner coordinates
+        texts: Recognized strings
+        confidences: Recognition confidences
+        min_confidence: Detections below this are dropped
+
+    Returns:
+        List of OCR results with text, confidence, and bounding boxes
+    """
+    keep = np.flatnonzero(confidences >= min_confidence)
+    corners = np.round(boxes[keep], 2).tolist()
+    scores = np.round(confidences[keep], 4).tolist()
+
+    return [
+        {
+            'text': texts[index].strip(),
+            'confidence': score,
+            'bounding_box': dict(zip(CORNERS, box))
+        }
+        for index, score, box in zip(keep.tolist(), scores, corners)
+    ]
+
+
+def _bounds(results: List[Dict[str, Any]]) -> np.ndarray:
+    """Axis-aligned (x0, y0, x1, y1) for each formatted result"""
+    boxes = np.asarray([[r['bounding_box'][corner] for corner in CORNERS] for r in results], dtype=float)
+    return np.stack([boxes[:, :, 0].min(axis=1), boxes[:, :, 1].min(axis=1),
+                     boxes[:, :, 0].max(axis=1), boxes[:, :, 1].max(axis=1)], axis=1)
+
+
+def _split(starts: np.ndarray, ends: np.ndarray, min_gap: float) -> List[np.ndarray]:
+    """
+    Group intervals separated by whitespace of at least `min_gap`
+
+    Returns:
+        Index arrays of each group, in ascending coordinate order
+    """
+    order = np.argsort(starts, kind='stable')
+    reach = np.maximum.accumulate(ends[order])
+    gaps = starts[order][1:] - reach[:-1]
+    cuts = np.flatnonzero(gaps >= min_gap) + 1
+    return np.split(order, cuts)
+
+
+def _lines(bounds: np.ndarray, indices: np.ndarray, text_height: float) -> List[List[int]]:
+    """Cluster a block's boxes into lines and order each line left to right"""
+    centers = (bounds[indices, 1] + bounds[indices, 3]) / 2
+    order = indices[np.argsort(centers, kind='stable')]
+    sorted_centers = np.sort(centers, kind='stable')
+    breaks = np.flatnonzero(np.diff(sorted_centers) > LINE_TOLERANCE * text_height) + 1
+
+    return [
+        line[np.argsort(bounds[line, 0], kind='stable')].tolist()
+        for line in np.split(order, breaks)
+    ]
+
+
+def _blocks(bounds: np.ndarray, indices: np.ndarray, text_height: float) -> List[List[List[int]]]:
+    """
+    Recursive XY-cut into blocks, each a list of lines
+
+    Column cuts are tried before paragraph cuts so that a two-column body
+    is read column by column; a full-width header blocks the column cut
+    until a paragraph cut has separated it.
+    """
+    if len(indices) > 1:
+        for axis, gap in ((0, COLUMN_GAP), (1, PARAGRAPH_GAP)):
+            groups = _split(bounds[indices, axis], bounds[indices, axis + 2], gap * text_height)
+            if len(groups) > 1:
+                return [block for group in groups for block in _blocks(bounds, indices[group], text_height)]
+    return [_lines(bounds, indices, text_height)]
+
+
+def reading_order(results: List[Dict[str, Any]]) -> List[List[List[int]]]:
+    """
+    Reconstruct reading order for formatted OCR results
+
+    Returns:
+        Paragraphs, each a list of lines, each a list of indices into `results`
+    """
+    if not results:
+        return []
+    bounds = _bounds(results)
+    text_height = max(float(np.median(bounds[:, 3] - bounds[:, 1])), 1.0)
+    return _blocks(bounds, np.arange(len(results)), text_height)
+
+
+def ordered_text(results: List[Dict[str, Any]]) -> str:
+    """Full text with lines separated by newlines and paragraphs by blank lines"""
+    paragraphs = []
+    for block in reading_order(results):
+        lines = [' '.join(results[i]['text'] for i in line if results[i]['text'].strip()) for line in block]
+        lines = [line for line in lines if line]
+        if lines:
+            paragraphs.append('\n'.join(lines))
+    return '\n\n'.join(paragraphs)
@@ -1,13 +1,24 @@
 import os
+import hmac
+import json
+import time
 import tempfile
+import threading
 import traceback
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context, url_for
 from werkzeug.utils import secure_filename
 from werkzeug.middleware.proxy_fix import ProxyFix
 import logging
 from logging.handlers import RotatingFileHandler
-from prometheus_client import Counter, Histogram, generate_latest
-from ocr_engine import extract_text_easyocr, extract_text_tesseract
+from prometheus_client import Counter, Gauge, Histogram, generate_latest
+from engines import get_engine, engine_names, engines_info, EngineBusy, DEFAULT_ENGINE
+from reader_pool import get_reader_pool, start_background_warm_up, ReaderPoolTimeout
+from worker_pool import get_worker_pool, PoolSaturated, WorkerDied, WorkerTimeout
+from jobs import JobManager, QueueFull
+from ingestion import Upload, UploadTooLarge, MAX_UPLOAD_SIZE
+from ocr_engine import recognition_options
+from profiling import (start_timings, finish_timings, set_engine, stage, get_profiler,
+                       SERVER_TIMING_ALWAYS, PROFILER_ENABLED)
 
 app = Flask(__name__)
 app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_prefix=1)
@@ -15,10 +26,61 @@ app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_prefix=1)
 # Metrics
 OCR_REQUESTS = Counter('ocr_requests_total', 'Total OCR requests', ['engine', 'status'])
 OCR_PROCESSING_TIME = Histogram('ocr_processing_seconds', 'Time spent processing OCR', ['engine'])
+OCR_QUEUE_DEPTH = Gauge('ocr_worker_queue_depth', 'Images in flight in the OCR worker pool')
 
 # Configuration
-MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
+MAX_FILE_SIZE = MAX_UPLOAD_SIZE  # 16MB unless OCR_MAX_FILE_SIZE is set
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tiff', 'pdf'}
+ADMIN_TOKEN = os.getenv('OCR_ADMIN_TOKEN', '')  # empty disables /admin endpoints
+
+# Reject oversized bodies while werkzeug reads them, before they are buffered;
+# the slack covers multipart framing and base64 inflation
+app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE * 4 // 3 + 64 * 1024
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+# Registry engines backed by OCREngine, which serve the detailed-result routes
+DETAILED_ENGINES = ('easyocr', 'easyocr-onnx')
+
+def get_ocr_engine(name='easyocr'):
+    """A registry EasyOCR engine's OCREngine, for routes needing detailed results"""
+    return get_engine(name).get_ocr_engine()
+
+def _detailed_engine_name():
+    """The ?engine= of a detailed-result route, or None when it is not EasyOCR-based"""
+    name = request.args.get('engine', 'easyocr').lower()
+    return name if name in DETAILED_ENGINES else None
+
+def get_job_manager():
+    global _job_manager
+    if _job_manager is None:
+        with _job_manager_lock:
+            if _job_manager is None:
+                _job_manager = JobManager(lambda data, filename, engine, options:
+                                          get_ocr_engine(engine).process_document(data, filename, options))
+                _job_manager.start()
+    return _job_manager
+
+@app.before_request
+def begin_stage_timings():
+    if request.path.startswith('/ocr'):
+        g.stage_timings, g.stage_timings_token = start_timings()
+
+@app.after_request
+def add_server_timing(response):
+    timings = g.get('stage_timings')
+    wanted = SERVER_TIMING_ALWAYS or request.args.get('timing') == '1' or 'X-Server-Timing' in request.headers
+    # Streamed responses send headers before any stage has run
+    if timings is not None and wanted and not response.is_streamed:
+        response.headers['Server-Timing'] = timings.server_timing()
+    return response
+
+@app.teardown_request
+def end_stage_timings(error=None):
+    timings = g.pop('stage_timings', None)
+    if timings is not None:
+        finish_timings(timings, g.pop('stage_timings_token'))
 
 def setup_logging():
     if not os.path.exists('logs'):
@@ -65,9 +127,34 @@ def health():
     return jsonify({
         'status': 'healthy',
         'service': 'ocr-service',
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'reader_pool': get_reader_pool().stats()
     }), 200
 
+@app.route('/', methods=['GET'])
+def home():
+    return jsonify({
+        'service': 'ocr-service',
+        'version': '1.0.0',
+        'engines': engine_names(),
+        'endpoints': {
+            'health': 'GET /health',
+            'metrics': 'GET /metrics',
+            'engines': 'GET /engines',
+            'ocr': 'POST /ocr?engine=<name>',
+            'upload': 'POST /ocr/upload',
+            'base64': 'POST /ocr/base64',
+            'batch': 'POST /ocr/batch',
+            'document': 'POST /ocr/document',
+            'probe': 'POST /ocr/probe',
+            'jobs': 'POST /ocr/jobs, GET /ocr/jobs/<id>'
+        }
+    }), 200
+
+@app.route('/engines', methods=['GET'])
+def engines():
+    return jsonify({'default': DEFAULT_ENGINE, 'engines': engines_info()}), 200
+
 @app.route('/metrics')
 def metrics():
     return generate_latest()
@@ -79,62 +166,379 @@ def ocr():
         return jsonify({"error": "No file provided"}), 400
 
     file = request.files['file']
-    engine = request.args.get('engine', 'tesseract').lower()
+    engine_name = request.args.get('engine', DEFAULT_ENGINE).lower()
     
-    if engine not in ['tesseract', 'easyocr']:
-        OCR_REQUESTS.labels(engine=engine, status='error').inc()
-        return jsonify({"error": "Invalid engine. Use 'tesseract' or 'easyocr'"}), 400
+    if engine_name not in engine_names():
+        OCR_REQUESTS.labels(engine='unknown', status='error').inc()
+        return jsonify({"error": f"Invalid engine. Use one of: {', '.join(engine_names())}"}), 400
 
     # Validate file
     is_valid, message = validate_file(file)
     if not is_valid:
-        OCR_REQUESTS.labels(engine=engine, status='error').inc()
+        OCR_REQUESTS.labels(engine=engine_name, status='error').inc()
         return jsonify({"error": message}), 400
 
     try:
-        # Read file content
-        image_bytes = file.read()
+        # Hash and size the upload in chunks, without copying it into memory
+        upload = Upload.from_stream(file.stream, MAX_FILE_SIZE)
         
-        if not image_bytes:
-            OCR_REQUESTS.labels(engine=engine, status='error').inc()
+        if not upload.size:
+            OCR_REQUESTS.labels(engine=engine_name, status='error').inc()
             return jsonify({"error": "Failed to read file content"}), 400
 
         # Process with selected engine
-        with OCR_PROCESSING_TIME.labels(engine=engine).time():
-            if engine == 'easyocr':
-                text = extract_text_easyocr(image_bytes)
-            else:
-                text = extract_text_tesseract(image_bytes)
+        set_engine(engine_name)
+        engine = get_engine(engine_name)
+        with OCR_PROCESSING_TIME.labels(engine=engine_name).time():
+            results = engine.process(upload)
+            text = engine.full_text(results)
 
-        OCR_REQUESTS.labels(engine=engine, status='success').inc()
+        OCR_REQUESTS.labels(engine=engine_name, status='success').inc()
         
         response = {
-            "engine": engine,
+            "engine": engine_name,
             "text": text,
             "filename": secure_filename(file.filename),
             "text_length": len(text)
         }
         
-        app.logger.info(f"Successfully processed file with {engine}: {len(text)} characters extracted")
-        return jsonify(response)
+        app.logger.info(f"Successfully processed file with {engine_name}: {len(text)} characters extracted")
+        with stage('serialization'):
+            return jsonify(response)
+
+    except UploadTooLarge as e:
+        OCR_REQUESTS.labels(engine=engine_name, status='error').inc()
+        return jsonify({"error": str(e)}), 413
+
+    except PoolSaturated as e:
+        OCR_REQUESTS.labels(engine=engine_name, status='rejected').inc()
+        app.logger.warning(f"OCR worker pool saturated: {e}")
+        return jsonify({"error": "OCR service busy, retry later"}), 429, {'Retry-After': '1'}
+
+    except (EngineBusy, ReaderPoolTimeout) as e:
+        OCR_REQUESTS.labels(engine=engine_name, status='rejected').inc()
+        app.logger.warning(f"OCR engine busy: {e}")
+        return jsonify({"error": "OCR engine busy, retry later"}), 503
+
+    except WorkerDied as e:
+        OCR_REQUESTS.labels(engine=engine_name, status='error').inc()
+        app.logger.error(f"OCR worker lost: {e}")
+        return jsonify({"error": "OCR worker restarted, retry later"}), 503, {'Retry-After': '1'}
+
+    except WorkerTimeout as e:
+        OCR_REQUESTS.labels(engine=engine_name, status='error').inc()
+        app.logger.error(f"OCR worker timed out: {e}")
+        return jsonify({"error": "OCR timed out"}), 504
 
     except Exception as e:
-        OCR_REQUESTS.labels(engine=engine, status='error').inc()
+        OCR_REQUESTS.labels(engine=engine_name, status='error').inc()
         app.logger.error(f"OCR processing failed: {str(e)}\n{traceback.format_exc()}")
         return jsonify({
             "error": "OCR processing failed",
             "details": str(e) if app.debug else "Internal server error"
         }), 500
 
+def _recognition_options():
+    """
+    Recognition options from ?mode=, ?min_confidence=, ?text_threshold= and ?adaptive=
+    
+    Raises:
+        ValueError: For malformed or out-of-range values
+    """
+    def threshold(name):
+        value = request.args.get(name)
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            raise ValueError(f'{name} must be a number')
+
+    return recognition_options(
+        mode=request.args.get('mode'),
+        min_confidence=threshold('min_confidence'),
+        text_threshold=threshold('text_threshold'),
+        adaptive=request.args.get('adaptive', 'false').lower() in ('1', 'true', 'yes')
+    )
+
+def _engine_result(handler):
+    """Run an OCREngine call for the detailed-result routes, mapping errors to responses"""
+    engine_name = _detailed_engine_name()
+    if engine_name is None:
+        OCR_REQUESTS.labels(engine='unknown', status='error').inc()
+        return jsonify({"error": f"Invalid engine. Use one of: {', '.join(DETAILED_ENGINES)}"}), 400
+
+    set_engine(engine_name)
+    try:
+        with OCR_PROCESSING_TIME.labels(engine=engine_name).time():
+            result = handler(get_ocr_engine(engine_name))
+        OCR_REQUESTS.labels(engine=engine_name, status='success').inc()
+        with stage('serialization'):
+            return jsonify(result), 200
+    except UploadTooLarge as e:
+        OCR_REQUESTS.labels(engine=engine_name, status='error').inc()
+        return jsonify({"error": str(e)}), 413
+    except ValueError as e:
+        OCR_REQUESTS.labels(engine=engine_name, status='error').inc()
+        return jsonify({"error": str(e)}), 400
+    except (EngineBusy, ReaderPoolTimeout) as e:
+        OCR_REQUESTS.labels(engine=engine_name, status='rejected').inc()
+        app.logger.warning(f"OCR engine busy: {e}")
+        return jsonify({"error": "OCR engine busy, retry later"}), 503
+    except WorkerDied as e:
+        OCR_REQUESTS.labels(engine=engine_name, status='error').inc()
+        app.logger.error(f"OCR worker lost: {e}")
+        return jsonify({"error": "OCR worker restarted, retry later"}), 503, {'Retry-After': '1'}
+    except WorkerTimeout as e:
+        OCR_REQUESTS.labels(engine=engine_name, status='error').inc()
+        app.logger.error(f"OCR worker timed out: {e}")
+        return jsonify({"error": "OCR timed out"}), 504
+    except Exception as e:
+        OCR_REQUESTS.labels(engine=engine_name, status='error').inc()
+        app.logger.error(f"OCR processing failed: {str(e)}\n{traceback.format_exc()}")
+        return jsonify({
+            "error": "OCR processing failed",
+            "details": str(e) if app.debug else "Internal server error"
+        }), 500
+
+@app.route('/ocr/upload', methods=['POST'])
+def ocr_upload():
+    """OCR one uploaded image with EasyOCR, returning detailed results"""
+    if 'file' not in request.files:
+        return jsonify({"error": "No file provided"}), 400
+
+    file = request.files['file']
+    is_valid, message = validate_file(file)
+    if not is_valid:
+        return jsonify({"error": message}), 400
+
+    return _engine_result(lambda engine: engine.process_image_upload(file, _recognition_options()))
+
+@app.route('/ocr/base64', methods=['POST'])
+def ocr_base64():
+    """OCR a base64-encoded image sent as {"image": "..."}"""
+    data = request.get_json(silent=True) or {}
+    image_data = data.get('image')
+    if not image_data:
+        return jsonify({"error": "No image data provided"}), 400
+
+    return _engine_result(lambda engine: engine.process_image_base64(image_data, _recognition_options()))
+
+@app.route('/ocr/batch', methods=['POST'])
+def ocr_batch():
+    """OCR several uploaded images in one batched pass"""
+    files = request.files.getlist('files')
+    if not files:
+        return jsonify({"error": "No files provided"}), 400
+
+    batch_size = request.args.get('batch_size', type=int)
+    return _engine_result(lambda engine: {
+        'results': engine.process_batch(files, batch_size=batch_size, options=_recognition_options())
+    })
+
+@app.route('/ocr/probe', methods=['POST'])
+def ocr_probe():
+    """Report whether an uploaded image contains text, exiting at the first confident hit"""
+    if 'file' not in request.files:
+        return jsonify({"error": "No file provided"}), 400
+
+    file = request.files['file']
+    is_valid, message = validate_file(file)
+    if not is_valid:
+        return jsonify({"error": message}), 400
+
+    def probe(engine):
+        min_confidence = request.args.get('min_confidence')
+        try:
+            min_confidence = float(min_confidence) if min_confidence is not None else None
+        except ValueError:
+            raise ValueError('min_confidence must be a number')
+        upload = Upload.from_stream(file.stream, MAX_FILE_SIZE)
+        return dict(engine.probe_text(upload, min_confidence=min_confidence), filename=secure_filename(file.filename))
+
+    return _engine_result(probe)
+
+@app.route('/ocr/document', methods=['POST'])
+def ocr_document():
+    """OCR a multi-page PDF/TIFF, streaming one JSON line per page"""
+    engine_name = _detailed_engine_name()
+    if engine_name is None:
+        OCR_REQUESTS.labels(engine='unknown', status='error').inc()
+        return jsonify({"error": f"Invalid engine. Use one of: {', '.join(DETAILED_ENGINES)}"}), 400
+
+    if 'file' not in request.files:
+        OCR_REQUESTS.labels(engine=engine_name, status='error').inc()
+        return jsonify({"error": "No file provided"}), 400
+
+    file = request.files['file']
+    is_valid, message = validate_file(file)
+    if not is_valid:
+        OCR_REQUESTS.labels(engine=engine_name, status='error').inc()
+        return jsonify({"error": message}), 400
+
+    try:
+        options = _recognition_options()
+        # Pages are read after the request closes its file, so take a copy
+        data = Upload.from_stream(file.stream, MAX_FILE_SIZE, detach=True)
+    except UploadTooLarge as e:
+        OCR_REQUESTS.labels(engine=engine_name, status='error').inc()
+        return jsonify({"error": str(e)}), 413
+    except ValueError as e:
+        OCR_REQUESTS.labels(engine=engine_name, status='error').inc()
+        return jsonify({"error": str(e)}), 400
+    filename = secure_filename(file.filename)
+    engine = get_ocr_engine(engine_name)
+    set_engine(engine_name)
+
+    def generate():
+        pages = 0
+        start = time.time()
+        try:
+            for page in engine.process_document(data, filename, options):
+                pages += 1
+                with stage('serialization'):
+                    line = json.dumps(page) + '\n'
+                yield line
+            OCR_REQUESTS.labels(engine=engine_name, status='success').inc()
+            app.logger.info(f"Successfully processed {pages} pages of {filename}")
+            yield json.dumps({'done': True, 'filename': filename, 'pages': pages}) + '\n'
+        except Exception as e:
+            OCR_REQUESTS.labels(engine=engine_name, status='error').inc()
+            app.logger.error(f"Document OCR failed: {str(e)}\n{traceback.format_exc()}")
+            yield json.dumps({
+                'done': True,
+                'filename': filename,
+                'pages': pages,
+                'error': str(e) if app.debug else 'OCR processing failed'
+            }) + '\n'
+        finally:
+            OCR_PROCESSING_TIME.labels(engine=engine_name).observe(time.time() - start)
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/ocr/jobs', methods=['POST'])
+def create_ocr_job():
+    """Accept an upload for background OCR and return its job id"""
+    if 'file' not in request.files:
+        return jsonify({"error": "No file provided"}), 400
+
+    file = request.files['file']
+    is_valid, message = validate_file(file)
+    if not is_valid:
+        return jsonify({"error": message}), 400
+
+    engine_name = _detailed_engine_name()
+    if engine_name is None:
+        return jsonify({"error": f"Invalid engine. Use one of: {', '.join(DETAILED_ENGINES)}"}), 400
+
+    callback_url = request.form.get('callback_url') or request.args.get('callback_url')
+    if callback_url and not callback_url.startswith(('http://', 'https://')):
+        return jsonify({"error": "callback_url must be an http(s) URL"}), 400
+
+    try:
+        options = _recognition_options()
+        upload = Upload.from_stream(file.stream, MAX_FILE_SIZE)
+        job_id = get_job_manager().submit(upload, secure_filename(file.filename), callback_url,
+                                          engine=engine_name, options=options)
+    except UploadTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except QueueFull as e:
+        app.logger.warning(f"OCR job rejected: {e}")
+        return jsonify({"error": "OCR job queue full, retry later"}), 429, {'Retry-After': '30'}
+
+    app.logger.info(f"Queued OCR job {job_id} for {file.filename}")
+    return jsonify({
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': url_for('get_ocr_job', job_id=job_id)
+    }), 202
+
+@app.route('/ocr/jobs/<job_id>', methods=['GET'])
+def get_ocr_job(job_id):
+    job = get_job_manager().status(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
+
+def _admin_error():
+    """Error response unless the request carries the admin token"""
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Admin endpoints disabled"}), 404
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+        return jsonify({"error": "Invalid admin token"}), 403
+    return None
+
+@app.route('/admin/profiler', methods=['GET', 'POST'])
+def admin_profiler():
+    """
+    Inspect or toggle the sampling profiler
+    
+    POST {"enabled": true|false, "interval": 0.01, "reset": true} starts,
+    stops or clears it. GET returns the hottest stacks, or all of them in
+    folded flame graph format with ?format=folded.
+    """
+    error = _admin_error()
+    if error is not None:
+        return error
+
+    profiler = get_profiler()
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        try:
+            interval = float(data['interval']) if data.get('interval') else None
+        except (TypeError, ValueError):
+            return jsonify({"error": "interval must be a number of seconds"}), 400
+        if data.get('reset'):
+            profiler.reset()
+        if data.get('enabled') is True:
+            profiler.start(interval)
+        elif data.get('enabled') is False:
+            profiler.stop()
+        app.logger.info(f"Sampling profiler {'running' if profiler.running else 'stopped'}")
+
+    if request.args.get('format') == 'folded':
+        return Response(profiler.folded(), mimetype='text/plain')
+    return jsonify(profiler.snapshot(request.args.get('limit', 25, type=int))), 200
+
 @app.errorhandler(413)
 def too_large(e):
     return jsonify({"error": f"File too large. Maximum size: {MAX_FILE_SIZE // (1024*1024)}MB"}), 413
 
+@app.errorhandler(ReaderPoolTimeout)
+@app.errorhandler(EngineBusy)
+def engine_busy(e):
+    app.logger.warning(f"OCR engine busy: {e}")
+    return jsonify({"error": "OCR engine busy, retry later"}), 503
+
+@app.errorhandler(WorkerDied)
+def worker_died(e):
+    app.logger.error(f"OCR worker lost: {e}")
+    return jsonify({"error": "OCR worker restarted, retry later"}), 503, {'Retry-After': '1'}
+
+@app.errorhandler(WorkerTimeout)
+def worker_timeout(e):
+    app.logger.error(f"OCR worker timed out: {e}")
+    return jsonify({"error": "OCR timed out"}), 504
+
 @app.errorhandler(500)
 def internal_error(error):
     app.logger.error(f"Internal error: {error}")
     return jsonify({"error": "Internal server error"}), 500
 
+# Load OCR models once per worker process, off the request path
+if get_worker_pool() is not None:
+    OCR_QUEUE_DEPTH.set_function(lambda: get_worker_pool().in_flight)
+else:
+    start_background_warm_up()
+
+# Resume jobs left queued by a previous process
+get_job_manager()
+
+if PROFILER_ENABLED:
+    get_profiler().start()
+
 if __name__ == "__main__":
     setup_logging()
     app.run(host='0.0.0.0', port=5001, debug=False)
\ No newline at end of file
@@ -1,61 +1,173 @@
-import easyocr # type: ignore
 import numpy as np # type: ignore
 from PIL import Image
 import io
-import base64
+import os
 import logging
-from typing import List, Dict, Any, Optional
+from functools import partial
+from typing import List, Dict, Any, Optional, Iterator
+from reader_pool import get_reader_pool
+from ingestion import Upload, ImageSource, MAX_UPLOAD_SIZE
+from result_cache import get_result_cache, content_key
+from layout import to_arrays, format_detections, ordered_text
+from pages import iter_pages, map_pages_ordered
+from preprocessing import get_preset, compute_scale, resize, transform, run_preprocessed, DEFAULT_PRESET
+from profiling import stage, note_image
 
 logger = logging.getLogger(__name__)
 
+# Batched inference configuration
+BATCH_SIZE = int(os.getenv('OCR_BATCH_SIZE', '8'))
+SIZE_BUCKET = int(os.getenv('OCR_BATCH_SIZE_BUCKET', '128'))  # pixels
+
+# Detections below this confidence are dropped
+MIN_CONFIDENCE = 0.1
+
+# Detector settings per recognition mode. 'fast' only sends regions the
+# detector scores as likely text to the recognizer; both skip regions
+# smaller than EasyOCR's default min_size.
+RECOGNITION_MODES = {
+    'full': {'text_threshold': 0.7, 'low_text': 0.4, 'min_size': 20},
+    'fast': {'text_threshold': 0.85, 'low_text': 0.5, 'min_size': 20},
+}
+DEFAULT_MODE = os.getenv('OCR_RECOGNITION_MODE', 'full').lower()
+
+# Adaptive filtering drops detections below this fraction of the image's median confidence
+ADAPTIVE_CONFIDENCE_RATIO = float(os.getenv('OCR_ADAPTIVE_CONFIDENCE_RATIO', '0.5'))
+
+# Text presence probe
+PROBE_MIN_CONFIDENCE = float(os.getenv('OCR_PROBE_MIN_CONFIDENCE', '0.5'))
+PROBE_MAX_REGIONS = int(os.getenv('OCR_PROBE_MAX_REGIONS', '8'))  # regions recognized before giving up
+
+def recognition_options(mode: Optional[str] = None, min_confidence: Optional[float] = None,
+                        text_threshold: Optional[float] = None, adaptive: bool = False) -> Dict[str, Any]:
+    """
+    Build per-request recognition options
+    
+    Args:
+        mode: 'full' or 'fast' (defaults to OCR_RECOGNITION_MODE)
+        min_confidence: Detections below this are dropped (defaults to MIN_CONFIDENCE)
+        text_threshold: Overrides the mode's detector text score threshold
+        adaptive: Also drop detections well below the image's median confidence
+        
+    Returns:
+        Options dictionary accepted by OCREngine methods
+        
+    Raises:
+        ValueError: For unknown modes or thresholds outside [0, 1]
+    """
+    mode = (mode or DEFAULT_MODE).lower()
+    if mode not in RECOGNITION_MODES:
+        raise ValueError(f"Invalid mode. Use one of: {', '.join(RECOGNITION_MODES)}")
+    
+    detect = dict(RECOGNITION_MODES[mode])
+    if text_threshold is not None:
+        detect['text_threshold'] = text_threshold
+    min_confidence = MIN_CONFIDENCE if min_confidence is None else min_confidence
+    
+    for name, value in (('min_confidence', min_confidence), ('text_threshold', detect['text_threshold'])):
+        if not 0.0 <= value <= 1.0:
+            raise ValueError(f'{name} must be between 0 and 1')
+    
+    return {'mode': mode, 'detect': detect, 'min_confidence': min_confidence, 'adaptive': bool(adaptive)}
+
+DEFAULT_OPTIONS = recognition_options()
+
+def options_key(options: Dict[str, Any]) -> str:
+    """Part of the cache key identifying recognition options"""
+    detect = options['detect']
+    adaptive = f"/adaptive{ADAPTIVE_CONFIDENCE_RATIO}" if options['adaptive'] else ''
+    return f"{options['mode']}/{detect['text_threshold']},{detect['low_text']},{detect['min_size']}{adaptive}"
+
+def confidence_threshold(confidences: np.ndarray, options: Dict[str, Any]) -> float:
+    """Confidence cutoff for one image's detections under the options"""
+    threshold = options['min_confidence']
+    if options['adaptive'] and len(confidences):
+        threshold = max(threshold, ADAPTIVE_CONFIDENCE_RATIO * float(np.median(confidences)))
+    return threshold
+
+def decode_image(source: ImageSource) -> np.ndarray:
+    """Decode image bytes or an Upload into an RGB numpy array"""
+    with stage('decode'):
+        # PIL reads Uploads straight from their spooled file
+        image = Image.open(source.open() if isinstance(source, Upload) else io.BytesIO(source))
+        image.load()
+    
+    with stage('color_conversion'):
+        # Convert to RGB if necessary
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        
+        # Convert to numpy array
+        image_np = np.array(image)
+    
+    note_image(image_np.shape)
+    return image_np
+
+def readtext_staged(reader: Any, image_np: np.ndarray, detect: Optional[Dict[str, Any]] = None) -> List[Any]:
+    """
+    Equivalent of reader.readtext, with detection and recognition timed apart
+    
+    This is the same detect/recognize sequence readtext runs internally;
+    `detect` holds detector keyword arguments such as text_threshold.
+    """
+    with stage('detection'):
+        horizontal_list, free_list = reader.detect(image_np, **(detect or {}))
+    with stage('recognition'):
+        # detect returns one list per input image
+        return reader.recognize(image_np, horizontal_list[0], free_list[0])
+
 class OCREngine:
-    def __init__(self, languages: List[str] = ['en'], gpu: bool = False):
+    def __init__(self, languages: List[str] = ['en'], gpu: bool = False, preset: Optional[str] = None,
+                 backend: str = 'torch'):
         """
         Initialize OCR Engine with EasyOCR
         
+        Readers come from the process-wide pool, so engines sharing a
+        language set and GPU flag reuse one loaded, warmed model. The
+        reader is loaded on first use, not here.
+        
         Args:
             languages: List of language codes (e.g., ['en', 'es', 'fr'])
             gpu: Whether to use GPU acceleration
+            preset: Speed/quality preset ('quality', 'balanced', 'fast');
+                    defaults to OCR_PRESET
+            backend: 'torch' for EasyOCR's PyTorch models, or 'onnx' for
+                     the int8 ONNX Runtime export
         """
         self.languages = languages
         self.gpu = gpu
-        self.reader = None
-        
-        try:
-            logger.info(f"Initializing EasyOCR with languages: {languages}, GPU: {gpu}")
-            self.reader = easyocr.Reader(languages, gpu=gpu)
-            logger.info("EasyOCR initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize EasyOCR: {str(e)}")
-            raise
+        self.backend = backend
+        self.preset_name = (preset or DEFAULT_PRESET).lower()
+        self.preset = get_preset(self.preset_name)
+        self.pool = get_reader_pool()
+        self.cache = get_result_cache()
+
+    @property
+    def reader(self) -> Any:
+        """The shared reader for this engine's languages, loading it if needed"""
+        return self.pool.get_reader(self.languages, self.gpu, self.backend)
 
-    def process_image_upload(self, file) -> Dict[str, Any]:
+    def process_image_upload(self, file, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Process uploaded file
         
         Args:
             file: Flask file object
+            options: Recognition options from recognition_options()
             
         Returns:
             Dictionary with OCR results
         """
         try:
-            # Validate file
-            if not self._is_valid_image_file(file.filename):
-                raise ValueError(f'Invalid file type. Supported: png, jpg, jpeg, gif, bmp, tiff')
-            
-            # Read file bytes
-            image_bytes = file.read()
-            
-            if len(image_bytes) == 0:
-                raise ValueError('Empty file provided')
+            # Validate and read file bytes
+            upload = self._read_upload(file)
             
             # Process OCR
-            results = self._process_image_bytes(image_bytes)
+            results = self._process_image_bytes(upload, options)
             
             return {
                 'filename': file.filename,
-                'file_size': len(image_bytes),
+                'file_size': upload.size,
                 'full_text': self._extract_full_text(results),
                 'detailed_results': results,
                 'total_detections': len(results)
@@ -65,35 +177,29 @@ class OCREngine:
             logger.error(f"Error processing uploaded image: {str(e)}")
             raise
 
-    def process_image_base64(self, image_data: str) -> Dict[str, Any]:
+    def process_image_base64(self, image_data: str, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Process base64 encoded image
         
         Args:
             image_data: Base64 encoded image string
+            options: Recognition options from recognition_options()
             
         Returns:
             Dictionary with OCR results
         """
         try:
-            # Clean base64 data
-            if image_data.startswith('data:image'):
-                image_data = image_data.split(',')[1]
-            
-            # Decode base64
-            try:
-                image_bytes = base64.b64decode(image_data)
-            except Exception as e:
-                raise ValueError(f'Invalid base64 data: {str(e)}')
+            # Decode base64 incrementally into a spooled file
+            upload = Upload.from_base64(image_data, MAX_UPLOAD_SIZE)
             
-            if len(image_bytes) == 0:
+            if upload.size == 0:
                 raise ValueError('Empty image data')
             
             # Process OCR
-            results = self._process_image_bytes(image_bytes)
+            results = self._process_image_bytes(upload, options)
             
             return {
-                'data_size': len(image_bytes),
+                'data_size': upload.size,
                 'full_text': self._extract_full_text(results),
                 'detailed_results': results,
                 'total_detections': len(results)
@@ -103,97 +209,338 @@ class OCREngine:
             logger.error(f"Error processing base64 image: {str(e)}")
             raise
 
-    def process_batch(self, files) -> List[Dict[str, Any]]:
+    def process_document(self, data: ImageSource, filename: str,
+                         options: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Process a possibly multi-page document page by page
+        
+        PDF pages are rasterized and TIFF frames decoded lazily, pages run
+        concurrently, and results are yielded in page order as soon as
+        each page is done.
+        
+        Args:
+            data: Raw file bytes or an Upload
+            filename: Original filename, used to detect the format
+            options: Recognition options from recognition_options()
+            
+        Yields:
+            One dictionary with OCR results (or an error) per page
+        """
+        def process_page(page_number: int, image_np: np.ndarray) -> Dict[str, Any]:
+            try:
+                results = self._process_image_array(image_np, options)
+                return {
+                    'page': page_number,
+                    'success': True,
+                    'full_text': self._extract_full_text(results),
+                    'detailed_results': results,
+                    'total_detections': len(results)
+                }
+            except Exception as e:
+                logger.error(f"Error processing page {page_number} of {filename}: {str(e)}")
+                return {'page': page_number, 'success': False, 'error': str(e)}
+        
+        return map_pages_ordered(iter_pages(data, filename), process_page)
+
+    def probe_text(self, source: ImageSource, min_confidence: Optional[float] = None,
+                   max_regions: int = PROBE_MAX_REGIONS) -> Dict[str, Any]:
+        """
+        Answer "does this image contain text?" without full OCR
+        
+        A cached full result answers directly. Otherwise the detector runs
+        in fast mode and candidate regions are recognized largest first,
+        stopping at the first confident hit.
+        
+        Args:
+            source: Raw image bytes or an Upload
+            min_confidence: Recognition confidence counting as text
+                            (defaults to OCR_PROBE_MIN_CONFIDENCE)
+            max_regions: Regions to recognize before answering no
+            
+        Returns:
+            Dictionary with has_text, the first confident text and its confidence
+        """
+        min_confidence = PROBE_MIN_CONFIDENCE if min_confidence is None else min_confidence
+        
+        cache_key = self._cache_key(source)
+        cached = self.cache.get(cache_key) if cache_key is not None else None
+        if cached is not None:
+            hits = [r for r in cached if r['confidence'] >= min_confidence and r['text']]
+            best = max(hits, key=lambda r: r['confidence']) if hits else None
+            return {
+                'has_text': best is not None,
+                'text': best['text'] if best else '',
+                'confidence': best['confidence'] if best else 0.0,
+                'regions_detected': len(cached),
+                'regions_checked': 0,
+                'cached': True
+            }
+        
+        image_np = self._decode_image(source)
+        image_np = resize(image_np, compute_scale(image_np, self.preset))
+        
+        with self.pool.acquire(self.languages, self.gpu, backend=self.backend) as reader:
+            with stage('detection'):
+                horizontal_list, free_list = reader.detect(image_np, **RECOGNITION_MODES['fast'])
+            horizontal_list, free_list = horizontal_list[0], free_list[0]
+            
+            # Larger regions are more likely to hold readable text
+            candidates = [(([box], []), (box[1] - box[0]) * (box[3] - box[2])) for box in horizontal_list]
+            for polygon in free_list:
+                xs, ys = [point[0] for point in polygon], [point[1] for point in polygon]
+                candidates.append((([], [polygon]), (max(xs) - min(xs)) * (max(ys) - min(ys))))
+            candidates.sort(key=lambda candidate: candidate[1], reverse=True)
+            
+            checked = 0
+            for (boxes, polygons), _ in candidates[:max(1, max_regions)]:
+                checked += 1
+                with stage('recognition'):
+                    recognized = reader.recognize(image_np, boxes, polygons)
+                for _, text, confidence in recognized:
+                    if confidence >= min_confidence and text.strip():
+                        return {
+                            'has_text': True,
+                            'text': text.strip(),
+                            'confidence': round(float(confidence), 4),
+                            'regions_detected': len(candidates),
+                            'regions_checked': checked,
+                            'cached': False
+                        }
+        
+        return {
+            'has_text': False,
+            'text': '',
+            'confidence': 0.0,
+            'regions_detected': len(candidates),
+            'regions_checked': checked,
+            'cached': False
+        }
+
+    def process_batch(self, files, batch_size: Optional[int] = None,
+                      options: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Process multiple files
         
+        All images are decoded first, grouped into size buckets and run
+        through EasyOCR's batched reader so detector and recognizer setup
+        is shared across the upload. Errors stay isolated per file.
+        
         Args:
             files: List of Flask file objects
+            batch_size: Images per inference batch (defaults to OCR_BATCH_SIZE)
+            options: Recognition options from recognition_options()
             
         Returns:
             List of dictionaries with OCR results
         """
-        results = []
+        batch_size = batch_size or BATCH_SIZE
+        results: List[Optional[Dict[str, Any]]] = [None] * len(files)
+        decoded = []
         
         for i, file in enumerate(files):
             try:
                 if not file or file.filename == '':
-                    results.append({
+                    results[i] = {
                         'file_index': i,
                         'filename': '',
                         'success': False,
                         'error': 'Empty file'
-                    })
+                    }
                     continue
                 
-                result = self.process_image_upload(file)
-                result.update({
-                    'file_index': i,
-                    'success': True
-                })
-                results.append(result)
+                upload = self._read_upload(file)
+                cache_key = self._cache_key(upload, options)
+                cached = self.cache.get(cache_key) if cache_key is not None else None
+                if cached is not None:
+                    results[i] = self._batch_result(i, file.filename, upload.size, cached)
+                    continue
+                
+                image_np = self._decode_image(upload)
+                scale = compute_scale(image_np, self.preset)
+                decoded.append((i, file.filename, upload.size, resize(image_np, scale), cache_key, scale))
                 
             except Exception as e:
-                results.append({
-                    'file_index': i,
-                    'filename': file.filename if file else '',
-                    'success': False,
-                    'error': str(e)
-                })
-                logger.error(f"Error processing file {i}: {str(e)}")
+                results[i] = self._batch_error(i, file.filename if file else '', e)
+        
+        for group in self._group_by_size(decoded):
+            group_results = self._readtext_group([entry[3] for entry in group], batch_size, options)
+            
+            for (i, filename, file_size, _, cache_key, scale), ocr_results in zip(group, group_results):
+                if isinstance(ocr_results, Exception):
+                    results[i] = self._batch_error(i, filename, ocr_results)
+                    continue
+                
+                if scale != 1.0:
+                    ocr_results = transform(ocr_results, (0, 0), scale)
+                formatted_results = self._format_results(ocr_results, options)
+                if cache_key is not None:
+                    self.cache.put(cache_key, formatted_results)
+                results[i] = self._batch_result(i, filename, file_size, formatted_results)
         
         return results
 
-    def _process_image_bytes(self, image_bytes: bytes) -> List[Dict[str, Any]]:
+    def _batch_result(self, index: int, filename: str, file_size: int,
+                      formatted_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build the per-file success entry for batch results"""
+        return {
+            'filename': filename,
+            'file_size': file_size,
+            'full_text': self._extract_full_text(formatted_results),
+            'detailed_results': formatted_results,
+            'total_detections': len(formatted_results),
+            'file_index': index,
+            'success': True
+        }
+
+    def _batch_error(self, index: int, filename: str, error: Exception) -> Dict[str, Any]:
+        """Build the per-file error entry for batch results"""
+        logger.error(f"Error processing file {index}: {str(error)}")
+        return {
+            'file_index': index,
+            'filename': filename or '',
+            'success': False,
+            'error': str(error)
+        }
+
+    def _group_by_size(self, decoded: List[tuple]) -> List[List[tuple]]:
+        """Group decoded images whose dimensions fall in the same size bucket"""
+        groups: Dict[tuple, List[tuple]] = {}
+        for entry in decoded:
+            groups.setdefault(self._size_bucket(entry[3].shape), []).append(entry)
+        return list(groups.values())
+
+    def _size_bucket(self, shape: tuple) -> tuple:
+        """Round image height and width up to the batch size bucket"""
+        height, width = shape[:2]
+        return (-(-height // SIZE_BUCKET) * SIZE_BUCKET, -(-width // SIZE_BUCKET) * SIZE_BUCKET)
+
+    def _readtext_group(self, images: List[np.ndarray], batch_size: int,
+                        options: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """
+        Run one size group through the batched reader
+        
+        Images are padded with white to the bucket size, which keeps
+        bounding boxes in original coordinates. If the batched call fails
+        the group is retried image by image so one bad file cannot fail
+        its neighbours.
+        
+        Returns:
+            Raw EasyOCR results per image, or the exception raised for it
+        """
+        detect = (options or DEFAULT_OPTIONS)['detect']
+        bucket_height, bucket_width = self._size_bucket(images[0].shape)
+        padded = []
+        for image in images:
+            canvas = np.full((bucket_height, bucket_width, 3), 255, dtype=np.uint8)
+            canvas[:image.shape[0], :image.shape[1]] = image
+            padded.append(canvas)
+        
+        logger.info(f"Processing batch of {len(images)} images at size: {(bucket_height, bucket_width)}")
+        with self.pool.acquire(self.languages, self.gpu, backend=self.backend) as reader:
+            try:
+                with stage('batched_inference'):
+                    return reader.readtext_batched(padded, batch_size=batch_size, **detect)
+            except Exception as e:
+                logger.warning(f"Batched OCR failed, retrying images individually: {str(e)}")
+            
+            group_results: List[Any] = []
+            for image in images:
+                try:
+                    group_results.append(readtext_staged(reader, image, detect))
+                except Exception as e:
+                    group_results.append(e)
+            return group_results
+
+    def _read_upload(self, file) -> Upload:
+        """Validate an uploaded file and ingest it in size-limited chunks"""
+        if not self._is_valid_image_file(file.filename):
+            raise ValueError(f'Invalid file type. Supported: png, jpg, jpeg, gif, bmp, tiff')
+        
+        upload = Upload.from_stream(getattr(file, 'stream', file), MAX_UPLOAD_SIZE)
+        
+        if upload.size == 0:
+            raise ValueError('Empty file provided')
+        
+        return upload
+
+    def _decode_image(self, source: ImageSource) -> np.ndarray:
+        """Decode image bytes or an Upload into an RGB numpy array"""
+        return decode_image(source)
+
+    def _format_results(self, ocr_results: List[Any],
+                        options: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Convert raw EasyOCR detections into result dictionaries"""
+        with stage('postprocess'):
+            boxes, texts, confidences = to_arrays(ocr_results)
+            threshold = confidence_threshold(confidences, options or DEFAULT_OPTIONS)
+            return format_detections(boxes, texts, confidences, threshold)
+
+    def _process_image_bytes(self, image_bytes: ImageSource,
+                             options: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Internal method to process image bytes with EasyOCR
         
         Args:
-            image_bytes: Raw image bytes
+            image_bytes: Raw image bytes or an Upload
+            options: Recognition options from recognition_options()
             
         Returns:
             List of OCR results with text, confidence, and bounding boxes
         """
         try:
-            # Convert bytes to PIL Image
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            # Convert to RGB if necessary
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
+            cache_key = self._cache_key(image_bytes, options)
+            if cache_key is not None:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"OCR cache hit, {len(cached)} text regions")
+                    return cached
             
-            # Convert to numpy array
-            image_np = np.array(image)
+            formatted_results = self._process_image_array(self._decode_image(image_bytes), options)
             
-            # Perform OCR
-            logger.info(f"Processing image of size: {image_np.shape}")
-            ocr_results = self.reader.readtext(image_np)
-            
-            # Format results
-            formatted_results = []
-            for (bbox, text, confidence) in ocr_results:
-                # Filter out low confidence results
-                if confidence < 0.1:  # Adjust threshold as needed
-                    continue
-                    
-                formatted_results.append({
-                    'text': text.strip(),
-                    'confidence': round(float(confidence), 4),
-                    'bounding_box': {
-                        'top_left': [round(float(bbox[0][0]), 2), round(float(bbox[0][1]), 2)],
-                        'top_right': [round(float(bbox[1][0]), 2), round(float(bbox[1][1]), 2)],
-                        'bottom_right': [round(float(bbox[2][0]), 2), round(float(bbox[2][1]), 2)],
-                        'bottom_left': [round(float(bbox[3][0]), 2), round(float(bbox[3][1]), 2)]
-                    }
-                })
-            
-            logger.info(f"Found {len(formatted_results)} text regions")
+            if cache_key is not None:
+                self.cache.put(cache_key, formatted_results)
             return formatted_results
             
         except Exception as e:
             logger.error(f"Error in OCR processing: {str(e)}")
             raise
 
+    def _cache_key(self, image_bytes: ImageSource, options: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Cache key for these bytes under this engine's settings and the request options"""
+        if self.cache is None:
+            return None
+        options = options or DEFAULT_OPTIONS
+        return content_key(image_bytes, f'{self.engine_name}/{self.preset_name}/{options_key(options)}',
+                           self.languages, options['min_confidence'])
+
+    def _readtext(self, image_np: np.ndarray, options: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """Run the pooled reader on one array"""
+        with self.pool.acquire(self.languages, self.gpu, backend=self.backend) as reader:
+            return readtext_staged(reader, image_np, (options or DEFAULT_OPTIONS)['detect'])
+
+    def _process_image_array(self, image_np: np.ndarray,
+                             options: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Run EasyOCR on an already decoded RGB image array
+        
+        Args:
+            image_np: RGB image as a numpy array
+            options: Recognition options from recognition_options()
+            
+        Returns:
+            List of OCR results with text, confidence, and bounding boxes
+        """
+        # Perform OCR; tiles take reader slots independently, so only as many
+        # run at once as the reader has slots
+        logger.info(f"Processing image of size: {image_np.shape}")
+        ocr_results = run_preprocessed(image_np, self.preset, partial(self._readtext, options=options),
+                                       max_workers=self.pool.concurrency)
+        
+        formatted_results = self._format_results(ocr_results, options)
+        
+        logger.info(f"Found {len(formatted_results)} text regions")
+        return formatted_results
+
     def _is_valid_image_file(self, filename: str) -> bool:
         """Check if file has valid image extension"""
         if not filename:
@@ -203,15 +550,17 @@ class OCREngine:
         return filename.lower().split('.')[-1] in allowed_extensions
 
     def _extract_full_text(self, results: List[Dict[str, Any]]) -> str:
-        """Extract full text from OCR results"""
+        """Extract full text from OCR results in reading order"""
         if not results:
             return ""
         
-        # Sort by vertical position (top to bottom)
-        sorted_results = sorted(results, key=lambda x: x['bounding_box']['top_left'][1])
-        
-        # Join text with spaces
-        return ' '.join([r['text'] for r in sorted_results if r['text'].strip()])
+        # Lines joined with newlines, paragraphs separated by blank lines
+        with stage('postprocess'):
+            return ordered_text(results)
+
+    @property
+    def engine_name(self) -> str:
+        return 'easyocr' if self.backend == 'torch' else f'easyocr-{self.backend}'
 
     def get_supported_languages(self) -> List[str]:
         """Get list of supported languages"""
@@ -222,6 +571,8 @@ class OCREngine:
         return {
             'languages': self.languages,
             'gpu_enabled': self.gpu,
+            'preset': self.preset_name,
+            'backend': self.backend,
             'engine': 'EasyOCR',
             'version': '1.7.2'
         }
\ No newline at end of file
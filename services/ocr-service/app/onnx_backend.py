@@ -0,0 +1,148 @@
+import os
+import logging
+import threading
+from typing import Dict, List, Any
+import easyocr # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+ONNX_DIR = os.getenv('OCR_ONNX_DIR', os.path.join('models', 'onnx'))
+ONNX_QUANTIZE = os.getenv('OCR_ONNX_QUANTIZE', 'true').lower() == 'true'  # int8 dynamic quantization
+INTRA_OP_THREADS = int(os.getenv('OCR_ONNX_INTRA_THREADS', str(os.cpu_count() or 1)))
+INTER_OP_THREADS = int(os.getenv('OCR_ONNX_INTER_THREADS', '1'))
+ONNX_OPSET = 17
+
+# Shapes used to trace the networks; the exported graphs keep them dynamic
+DETECTOR_TRACE_SHAPE = (1, 3, 640, 640)
+RECOGNIZER_TRACE_WIDTH = 256
+
+_export_lock = threading.Lock()
+
+
+class OnnxModule:
+    """
+    Stand-in for an EasyOCR torch module backed by an ONNX Runtime session
+
+    EasyOCR only calls eval() and the module itself on its detector and
+    recognizer, so swapping these in keeps its pre- and post-processing
+    (resizing, CRAFT box grouping, CTC decoding) unchanged.
+    """
+
+    def __init__(self, session: Any):
+        self.session = session
+        # Unused inputs, like the recognizer's text argument, are pruned on export
+        self.input_names = [node.name for node in session.get_inputs()]
+
+    def eval(self) -> 'OnnxModule':
+        return self
+
+    def to(self, *args: Any, **kwargs: Any) -> 'OnnxModule':
+        return self
+
+    def __call__(self, *inputs: Any) -> Any:
+        import torch # type: ignore
+        feeds = {name: value.detach().cpu().numpy() for name, value in zip(self.input_names, inputs)}
+        outputs = [torch.from_numpy(output) for output in self.session.run(None, feeds)]
+        return tuple(outputs) if len(outputs) > 1 else outputs[0]
+
+
+def session_options() -> Any:
+    """ONNX Runtime options tuned for CPU serving"""
+    import onnxruntime as ort # type: ignore
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.intra_op_num_threads = max(1, INTRA_OP_THREADS)
+    options.inter_op_num_threads = max(1, INTER_OP_THREADS)
+    return options
+
+
+def create_session(path: str) -> Any:
+    import onnxruntime as ort # type: ignore
+    return ort.InferenceSession(path, sess_options=session_options(), providers=['CPUExecutionProvider'])
+
+
+def model_dir(languages: List[str]) -> str:
+    """Directory holding the exported models for a language set"""
+    precision = 'int8' if ONNX_QUANTIZE else 'fp32'
+    return os.path.join(ONNX_DIR, f"{'_'.join(sorted(set(languages)))}-easyocr{easyocr.__version__}-{precision}")
+
+
+def _export_detector(reader: Any, path: str) -> None:
+    import torch # type: ignore
+    torch.onnx.export(
+        reader.detector, torch.randn(*DETECTOR_TRACE_SHAPE), path,
+        input_names=['image'], output_names=['score', 'feature'],
+        dynamic_axes={
+            'image': {0: 'batch', 2: 'height', 3: 'width'},
+            'score': {0: 'batch', 1: 'score_height', 2: 'score_width'},
+            'feature': {0: 'batch', 2: 'feature_height', 3: 'feature_width'}
+        },
+        opset_version=ONNX_OPSET
+    )
+
+
+def _export_recognizer(reader: Any, path: str) -> None:
+    import torch # type: ignore
+    image = torch.randn(1, 1, reader.imgH, RECOGNIZER_TRACE_WIDTH)
+    text = torch.zeros((1, 1), dtype=torch.long)
+    torch.onnx.export(
+        reader.recognizer, (image, text), path,
+        input_names=['image', 'text'], output_names=['logits'],
+        dynamic_axes={'image': {0: 'batch', 3: 'width'}, 'logits': {0: 'batch', 1: 'steps'}},
+        opset_version=ONNX_OPSET
+    )
+
+
+def export_models(reader: Any, directory: str) -> Dict[str, str]:
+    """
+    Export a float32 reader's detector and recognizer to ONNX, once
+
+    Models are quantized to int8 with dynamic quantization when
+    OCR_ONNX_QUANTIZE is set, and written atomically so concurrent
+    workers never load a partial file.
+
+    Returns:
+        Paths of the 'detector' and 'recognizer' models
+    """
+    paths = {name: os.path.join(directory, f'{name}.onnx') for name in ('detector', 'recognizer')}
+    with _export_lock:
+        if all(os.path.exists(path) for path in paths.values()):
+            return paths
+
+        os.makedirs(directory, exist_ok=True)
+        exporters = {'detector': _export_detector, 'recognizer': _export_recognizer}
+        for name, path in paths.items():
+            if os.path.exists(path):
+                continue
+            logger.info(f"Exporting EasyOCR {name} to ONNX: {path}")
+            float_path = f'{path}.fp32.tmp'
+            exporters[name](reader, float_path)
+
+            if ONNX_QUANTIZE:
+                from onnxruntime.quantization import quantize_dynamic, QuantType # type: ignore
+                quantized_path = f'{path}.int8.tmp'
+                quantize_dynamic(float_path, quantized_path, weight_type=QuantType.QInt8)
+                os.remove(float_path)
+                os.replace(quantized_path, path)
+            else:
+                os.replace(float_path, path)
+    return paths
+
+
+def build_onnx_reader(languages: List[str]) -> Any:
+    """
+    Build an EasyOCR reader whose networks run under ONNX Runtime
+
+    The reader is loaded without EasyOCR's own torch quantization, since
+    dynamically quantized torch modules cannot be exported; quantization
+    happens on the ONNX graphs instead.
+    """
+    reader = easyocr.Reader(languages, gpu=False, quantize=False)
+    paths = export_models(reader, model_dir(languages))
+    reader.detector = OnnxModule(create_session(paths['detector']))
+    reader.recognizer = OnnxModule(create_session(paths['recognizer']))
+    logger.info(f"ONNX Runtime reader ready for {languages} "
+                f"({INTRA_OP_THREADS} intra-op / {INTER_OP_THREADS} inter-op threads)")
+    return reader
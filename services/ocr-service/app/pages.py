@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+import logging
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Tuple, Callable, Dict, Any
+import numpy as np # type: ignore
+from PIL import Image, ImageSequence
+from ingestion import Upload, ImageSource, as_upload
+from profiling import stage, note_image
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+PDF_DPI = int(os.getenv('OCR_PDF_DPI', '200'))
+PAGE_WORKERS = int(os.getenv('OCR_PAGE_WORKERS', '2'))
+MAX_PAGES = int(os.getenv('OCR_MAX_PAGES', '500'))
+
+MULTIPAGE_EXTENSIONS = {'pdf', 'tif', 'tiff'}
+
+
+def file_extension(filename: str) -> str:
+    return filename.rsplit('.', 1)[1].lower() if filename and '.' in filename else ''
+
+
+def is_multipage(filename: str) -> bool:
+    """Whether a file type may hold more than one page"""
+    return file_extension(filename) in MULTIPAGE_EXTENSIONS
+
+
+def _to_rgb_array(image: Image.Image) -> np.ndarray:
+    with stage('color_conversion'):
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image_np = np.array(image)
+    note_image(image_np.shape)
+    return image_np
+
+
+def iter_tiff_pages(upload: Upload) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield TIFF frames one at a time"""
+    with Image.open(upload.open()) as image:
+        for index, frame in enumerate(ImageSequence.Iterator(image)):
+            if index >= MAX_PAGES:
+                logger.warning(f"TIFF truncated at {MAX_PAGES} pages")
+                break
+            yield index + 1, _to_rgb_array(frame)
+
+
+def iter_pdf_pages(upload: Upload, dpi: int = PDF_DPI) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Rasterize PDF pages one at a time with poppler
+
+    The PDF is written to a temporary file once and each page is rendered
+    on demand, so only the pages currently being processed are in memory.
+    """
+    from pdf2image import convert_from_path, pdfinfo_from_path # type: ignore
+
+    with tempfile.NamedTemporaryFile(suffix='.pdf') as handle:
+        shutil.copyfileobj(upload.open(), handle)
+        handle.flush()
+
+        page_count = int(pdfinfo_from_path(handle.name)['Pages'])
+        if page_count > MAX_PAGES:
+            logger.warning(f"PDF truncated from {page_count} to {MAX_PAGES} pages")
+            page_count = MAX_PAGES
+
+        for page_number in range(1, page_count + 1):
+            with stage('decode'):
+                images = convert_from_path(handle.name, dpi=dpi, first_page=page_number, last_page=page_number)
+            yield page_number, _to_rgb_array(images[0])
+
+
+def iter_pages(data: ImageSource, filename: str) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Yield (page_number, RGB array) pairs for any supported file
+
+    Single-page formats yield exactly one page.
+    """
+    upload = as_upload(data)
+    extension = file_extension(filename)
+    if extension == 'pdf':
+        return iter_pdf_pages(upload)
+    if extension in ('tif', 'tiff'):
+        return iter_tiff_pages(upload)
+
+    def single() -> Iterator[Tuple[int, np.ndarray]]:
+        with Image.open(upload.open()) as image:
+            yield 1, _to_rgb_array(image)
+    return single()
+
+
+def map_pages_ordered(pages: Iterator[Tuple[int, np.ndarray]],
+                      process: Callable[[int, np.ndarray], Dict[str, Any]],
+                      workers: int = PAGE_WORKERS) -> Iterator[Dict[str, Any]]:
+    """
+    Process pages concurrently and yield results in page order
+
+    At most `workers` pages are rendered and in flight at once, so the
+    first page's result is available as soon as it finishes and memory
+    stays bounded regardless of page count. Each page runs in a copy of
+    the caller's context, so per-request stage timings cover it.
+    """
+    workers = max(1, workers)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ocr-page') as executor:
+        window: deque = deque()
+        for page_number, image_np in pages:
+            window.append(executor.submit(contextvars.copy_context().run, process, page_number, image_np))
+            if len(window) >= workers:
+                yield window.popleft().result()
+        while window:
+            yield window.popleft().result()
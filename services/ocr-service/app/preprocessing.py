@@ -0,0 +1,192 @@
+import os
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Callable, Tuple
+import numpy as np # type: ignore
+from PIL import Image
+from profiling import stage
+
+logger = logging.getLogger(__name__)
+
+# Quality/speed presets
+#   target_text_height: dominant line height (px) to downsample to; None keeps full resolution
+#   min_scale: lower bound on the downsampling factor
+#   tile_size: pages larger than this (px, after scaling) are tiled; None disables tiling
+#   tile_overlap: overlap between neighbouring tiles (px)
+#   tile_workers: tiles processed in parallel; each tile holds a reader slot, so
+#                 this is capped at the reader pool's OCR_READER_CONCURRENCY
+PRESETS: Dict[str, Dict[str, Any]] = {
+    'quality': {'target_text_height': None, 'min_scale': 1.0, 'tile_size': None, 'tile_overlap': 0, 'tile_workers': 1},
+    'balanced': {'target_text_height': 32, 'min_scale': 0.5, 'tile_size': 2048, 'tile_overlap': 128, 'tile_workers': 2},
+    'fast': {'target_text_height': 20, 'min_scale': 0.25, 'tile_size': 1280, 'tile_overlap': 96, 'tile_workers': 4},
+}
+DEFAULT_PRESET = os.getenv('OCR_PRESET', 'quality')
+
+# Two detections overlapping more than this fraction of the smaller box are duplicates
+DUPLICATE_OVERLAP = 0.6
+
+Detection = Tuple[Any, str, float]
+
+
+def get_preset(name: Optional[str]) -> Dict[str, Any]:
+    """Look up a preset by name, raising ValueError for unknown names"""
+    name = (name or DEFAULT_PRESET).lower()
+    if name not in PRESETS:
+        raise ValueError(f"Unknown preset '{name}'. Use one of: {', '.join(PRESETS)}")
+    return PRESETS[name]
+
+
+def estimate_text_height(image_np: np.ndarray) -> Optional[float]:
+    """
+    Estimate the dominant text line height from the horizontal ink profile
+
+    Rows containing dark pixels form runs, one per text line; the median
+    run length approximates line height.
+
+    Returns:
+        Line height in pixels, or None when no text-like rows are found
+    """
+    gray = image_np.mean(axis=2) if image_np.ndim == 3 else image_np
+    # Sample every other column; the profile only needs row totals
+    dark = gray[:, ::2] < 128
+    inked = dark.mean(axis=1) > 0.002
+
+    # Run lengths of consecutive inked rows
+    padded = np.concatenate(([False], inked, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    runs = edges[1::2] - edges[::2]
+    runs = runs[runs >= 4]
+    if runs.size == 0:
+        return None
+    return float(np.median(runs))
+
+
+def compute_scale(image_np: np.ndarray, preset: Dict[str, Any]) -> float:
+    """Downsampling factor for an image under a preset (never upscales)"""
+    target = preset['target_text_height']
+    if not target:
+        return 1.0
+
+    # Text height estimation is accounted to the resize stage it feeds
+    with stage('resize'):
+        text_height = estimate_text_height(image_np)
+    if not text_height:
+        return 1.0
+    return float(min(1.0, max(preset['min_scale'], target / text_height)))
+
+
+def resize(image_np: np.ndarray, scale: float) -> np.ndarray:
+    """Resize an RGB array by a scale factor"""
+    if scale >= 1.0:
+        return image_np
+    height, width = image_np.shape[:2]
+    size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+    with stage('resize'):
+        return np.array(Image.fromarray(image_np).resize(size, Image.BILINEAR))
+
+
+def tile_origins(length: int, tile_size: int, overlap: int) -> List[int]:
+    """Start offsets covering `length` with overlapping tiles"""
+    if length <= tile_size:
+        return [0]
+    step = tile_size - overlap
+    origins = list(range(0, length - tile_size, step))
+    origins.append(length - tile_size)
+    return origins
+
+
+def _box_bounds(bbox: Any) -> Tuple[float, float, float, float]:
+    points = np.asarray(bbox, dtype=float)
+    return points[:, 0].min(), points[:, 1].min(), points[:, 0].max(), points[:, 1].max()
+
+
+def deduplicate(detections: List[Detection]) -> List[Detection]:
+    """
+    Drop detections duplicated across tile overlaps
+
+    When two boxes overlap by more than DUPLICATE_OVERLAP of the smaller
+    one, the larger box is kept, since the smaller is usually a word cut
+    by a tile edge.
+    """
+    if len(detections) < 2:
+        return detections
+
+    bounds = np.array([_box_bounds(bbox) for bbox, _, _ in detections])
+    areas = (bounds[:, 2] - bounds[:, 0]) * (bounds[:, 3] - bounds[:, 1])
+    order = np.argsort(-areas, kind='stable')
+
+    kept: List[int] = []
+    for index in order:
+        if kept:
+            others = bounds[kept]
+            width = np.minimum(others[:, 2], bounds[index, 2]) - np.maximum(others[:, 0], bounds[index, 0])
+            height = np.minimum(others[:, 3], bounds[index, 3]) - np.maximum(others[:, 1], bounds[index, 1])
+            overlap = np.clip(width, 0, None) * np.clip(height, 0, None)
+            smaller = np.minimum(areas[kept], areas[index])
+            if np.any(overlap > DUPLICATE_OVERLAP * np.maximum(smaller, 1e-6)):
+                continue
+        kept.append(int(index))
+
+    return [detections[i] for i in sorted(kept)]
+
+
+def transform(detections: List[Detection], offset: Tuple[int, int], scale: float) -> List[Detection]:
+    """Shift tile-local boxes by the tile origin and undo scaling"""
+    x_offset, y_offset = offset
+    mapped = []
+    for bbox, text, confidence in detections:
+        points = (np.asarray(bbox, dtype=float) + (x_offset, y_offset)) / scale
+        mapped.append((points.tolist(), text, confidence))
+    return mapped
+
+
+def run_preprocessed(image_np: np.ndarray, preset: Dict[str, Any],
+                     readtext: Callable[[np.ndarray], List[Detection]],
+                     max_workers: Optional[int] = None) -> List[Detection]:
+    """
+    Run OCR on a scaled and optionally tiled copy of an image
+
+    Args:
+        image_np: Full-resolution RGB array
+        preset: Preset dictionary from PRESETS
+        readtext: Callable returning EasyOCR-style detections for an array
+        max_workers: Cap on the preset's tile_workers, e.g. the reader slots
+                     readtext competes for; extra threads would only wait
+
+    Returns:
+        Detections with bounding boxes in original image coordinates
+    """
+    scale = compute_scale(image_np, preset)
+    scaled = resize(image_np, scale)
+    height, width = scaled.shape[:2]
+    tile_size = preset['tile_size']
+
+    if not tile_size or max(height, width) <= tile_size:
+        if scale == 1.0:
+            return readtext(scaled)
+        logger.info(f"Downscaled image by {scale:.2f} to {scaled.shape}")
+        return transform(readtext(scaled), (0, 0), scale)
+
+    overlap = preset['tile_overlap']
+    tiles = [
+        (x, y) for y in tile_origins(height, tile_size, overlap)
+        for x in tile_origins(width, tile_size, overlap)
+    ]
+    logger.info(f"Processing {len(tiles)} tiles of image {scaled.shape} at scale {scale:.2f}")
+
+    def run_tile(origin: Tuple[int, int]) -> List[Detection]:
+        x, y = origin
+        tile = np.ascontiguousarray(scaled[y:y + tile_size, x:x + tile_size])
+        return transform(readtext(tile), origin, scale)
+
+    workers = max(1, min(preset['tile_workers'], max_workers or preset['tile_workers'], len(tiles)))
+    if workers == 1:
+        tile_results = [run_tile(origin) for origin in tiles]
+    else:
+        # Each tile runs in a copy of the caller's context so stage timings follow it
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, run_tile, origin) for origin in tiles]
+            tile_results = [future.result() for future in futures]
+
+    return deduplicate([detection for result in tile_results for detection in result])
@@ -0,0 +1,285 @@
+import os
+import sys
+import time
+import threading
+import contextvars
+import logging
+from collections import Counter as StackCounter
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+from prometheus_client import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Metrics
+OCR_STAGE_TIME = Histogram(
+    'ocr_stage_seconds', 'Time spent per OCR pipeline stage, summed per request',
+    ['engine', 'stage', 'size_bucket'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+# Configuration
+SERVER_TIMING_ALWAYS = os.getenv('OCR_SERVER_TIMING', 'false').lower() == 'true'
+PROFILER_ENABLED = os.getenv('OCR_PROFILER_ENABLED', 'false').lower() == 'true'  # start at boot
+PROFILER_INTERVAL = float(os.getenv('OCR_PROFILER_INTERVAL', '0.01'))  # seconds between samples
+PROFILER_MAX_DEPTH = int(os.getenv('OCR_PROFILER_MAX_DEPTH', '64'))
+PROFILER_MAX_STACKS = int(os.getenv('OCR_PROFILER_MAX_STACKS', '10000'))
+
+# Pipeline stages, in the order they run
+STAGES = (
+    'upload_read',        # chunked ingestion, hashing and size checks
+    'decode',             # PIL decode or PDF rasterization
+    'color_conversion',   # mode conversion to RGB and numpy copy
+    'resize',             # preset rescaling
+    'detection',          # EasyOCR text detector
+    'recognition',        # EasyOCR recognizer, or Tesseract end to end
+    'batched_inference',  # detector and recognizer fused by readtext_batched
+    'worker_inference',   # round trip to the OCR process pool
+    'postprocess',        # thresholding, formatting and reading order
+    'serialization',      # JSON response encoding
+)
+
+# Megapixel upper bounds of the size_bucket label
+SIZE_BUCKETS = ((1.0, 'small'), (4.0, 'medium'), (16.0, 'large'))
+
+
+def size_bucket(pixels: int) -> str:
+    """Bucket an image area by megapixels for metric labels"""
+    megapixels = pixels / 1_000_000
+    for limit, name in SIZE_BUCKETS:
+        if megapixels < limit:
+            return name
+    return 'xlarge'
+
+
+class StageTimings:
+    """Per-request stage durations, shared by the threads serving one request"""
+
+    def __init__(self, engine: str = 'unknown'):
+        self.engine = engine
+        self.pixels = 0
+        self.stages: Dict[str, float] = {}
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, stage_name: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[stage_name] = self.stages.get(stage_name, 0.0) + seconds
+
+    def note_image(self, shape: Tuple[int, ...]) -> None:
+        """Remember the largest image seen, which picks the size bucket"""
+        with self._lock:
+            self.pixels = max(self.pixels, shape[0] * shape[1])
+
+    @property
+    def size_bucket(self) -> str:
+        return size_bucket(self.pixels) if self.pixels else 'unknown'
+
+    def observe(self) -> None:
+        """Export the accumulated stage durations to the stage histogram"""
+        bucket = self.size_bucket
+        with self._lock:
+            stages = list(self.stages.items())
+        for stage_name, seconds in stages:
+            OCR_STAGE_TIME.labels(engine=self.engine, stage=stage_name, size_bucket=bucket).observe(seconds)
+
+    def server_timing(self) -> str:
+        """Render the stages as a Server-Timing header value (milliseconds)"""
+        with self._lock:
+            stages = [(name, self.stages[name]) for name in STAGES if name in self.stages]
+        entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in stages]
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        return ', '.join(entries)
+
+
+_current: contextvars.ContextVar[Optional[StageTimings]] = contextvars.ContextVar('ocr_stage_timings', default=None)
+
+
+def current_timings() -> Optional[StageTimings]:
+    return _current.get()
+
+
+def start_timings(engine: str = 'unknown') -> Tuple[StageTimings, contextvars.Token]:
+    """Begin collecting stages for the current request or job"""
+    timings = StageTimings(engine)
+    return timings, _current.set(timings)
+
+
+def finish_timings(timings: StageTimings, token: contextvars.Token) -> None:
+    """Export collected stages and detach them from the current context"""
+    try:
+        _current.reset(token)
+    except ValueError:
+        # Finished from a different context, e.g. after a streamed response
+        _current.set(None)
+    timings.observe()
+
+
+@contextmanager
+def timed(engine: str) -> Iterator[StageTimings]:
+    """Collect stages for a block of work outside a request, such as a job"""
+    timings, token = start_timings(engine)
+    try:
+        yield timings
+    finally:
+        finish_timings(timings, token)
+
+
+def set_engine(engine: str) -> None:
+    timings = _current.get()
+    if timings is not None:
+        timings.engine = engine
+
+
+def note_image(shape: Tuple[int, ...]) -> None:
+    timings = _current.get()
+    if timings is not None:
+        timings.note_image(shape)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Time a pipeline stage
+
+    Inside a request or job the duration is added to its StageTimings;
+    anywhere else it is observed directly with unknown labels.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        timings = _current.get()
+        if timings is not None:
+            timings.add(name, elapsed)
+        else:
+            OCR_STAGE_TIME.labels(engine='unknown', stage=name, size_bucket='unknown').observe(elapsed)
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = PROFILER_INTERVAL, max_depth: int = PROFILER_MAX_DEPTH,
+                 max_stacks: int = PROFILER_MAX_STACKS):
+        """
+        Low-overhead statistical profiler over all threads
+
+        A daemon thread snapshots every thread's stack via
+        sys._current_frames() each `interval` seconds and counts
+        collapsed stacks, the "folded" format flame graph tools read.
+
+        Args:
+            interval: Seconds between samples
+            max_depth: Innermost frames kept per stack
+            max_stacks: Distinct stacks kept; further new stacks are dropped
+        """
+        self.interval = interval
+        self.max_depth = max_depth
+        self.max_stacks = max_stacks
+        self.samples = 0
+        self.dropped = 0
+        self.started: Optional[float] = None
+        self._stacks: StackCounter = StackCounter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: Optional[float] = None) -> None:
+        with self._lock:
+            if interval:
+                self.interval = max(0.001, interval)
+            if self.running:
+                return
+            self._stop.clear()
+            self.started = time.time()
+            self._thread = threading.Thread(target=self._run, name='ocr-profiler', daemon=True)
+            self._thread.start()
+        logger.info(f"Sampling profiler started, interval {self.interval}s")
+
+    def stop(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+            logger.info(f"Sampling profiler stopped after {self.samples} samples")
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+            self.dropped = 0
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self._sample(own_id)
+
+    def _sample(self, own_id: int) -> None:
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            names: List[str] = []
+            while frame is not None and len(names) < self.max_depth:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            stacks.append(';'.join(reversed(names)))
+
+        with self._lock:
+            self.samples += 1
+            for stack in stacks:
+                if stack in self._stacks or len(self._stacks) < self.max_stacks:
+                    self._stacks[stack] += 1
+                else:
+                    self.dropped += 1
+
+    def folded(self) -> str:
+        """All stacks as 'frame;frame;frame count' lines"""
+        with self._lock:
+            return '\n'.join(f"{stack} {count}" for stack, count in self._stacks.most_common())
+
+    def snapshot(self, limit: int = 25) -> Dict[str, Any]:
+        """Summary with the hottest stacks and innermost functions"""
+        with self._lock:
+            stacks = self._stacks.most_common()
+            samples, dropped = self.samples, self.dropped
+
+        total = sum(count for _, count in stacks) or 1
+        leaves: StackCounter = StackCounter()
+        for stack, count in stacks:
+            leaves[stack.rsplit(';', 1)[-1]] += count
+
+        return {
+            'running': self.running,
+            'interval': self.interval,
+            'started': self.started,
+            'samples': samples,
+            'dropped_stacks': dropped,
+            'top_functions': [
+                {'function': name, 'count': count, 'fraction': round(count / total, 4)}
+                for name, count in leaves.most_common(limit)
+            ],
+            'top_stacks': [
+                {'stack': stack, 'count': count, 'fraction': round(count / total, 4)}
+                for stack, count in stacks[:limit]
+            ]
+        }
+
+
+_profiler: Optional[SamplingProfiler] = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler() -> SamplingProfiler:
+    """Return the process-wide sampling profiler (stopped until started)"""
+    global _profiler
+    if _profiler is None:
+        with _profiler_lock:
+            if _profiler is None:
+                _profiler = SamplingProfiler()
+    return _profiler
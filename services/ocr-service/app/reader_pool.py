@@ -0,0 +1,218 @@
+import os
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Dict, List, Tuple, Iterator, Optional, Any
+import easyocr # type: ignore
+import numpy as np # type: ignore
+from PIL import Image, ImageDraw
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+# Threads running inference on one reader at a time; also caps a tiled
+# preset's tile_workers, since every tile takes a slot
+READER_CONCURRENCY = int(os.getenv('OCR_READER_CONCURRENCY', '1'))
+READER_ACQUIRE_TIMEOUT = float(os.getenv('OCR_READER_ACQUIRE_TIMEOUT', '60'))
+WARMUP_LANGUAGES = os.getenv('OCR_WARMUP_LANGUAGES', 'en')
+WARMUP_GPU = os.getenv('OCR_WARMUP_GPU', 'false').lower() == 'true'
+
+ReaderKey = Tuple[Tuple[str, ...], bool, str]
+
+# Inference backends a reader can run on
+BACKENDS = ('torch', 'onnx')
+
+
+class ReaderPoolTimeout(RuntimeError):
+    """Raised when no reader slot becomes free within the acquire timeout"""
+
+
+def make_key(languages: List[str], gpu: bool, backend: str = 'torch') -> ReaderKey:
+    """Build the pool key for a language set, GPU flag and inference backend"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Invalid backend. Use one of: {', '.join(BACKENDS)}")
+    # ONNX Runtime readers run on CPU only
+    return (tuple(sorted(set(languages))), bool(gpu) and backend == 'torch', backend)
+
+
+def parse_language_sets(spec: str) -> List[List[str]]:
+    """
+    Parse a language set spec such as "en;en,fr" into [['en'], ['en', 'fr']]
+    """
+    sets = []
+    for group in spec.split(';'):
+        languages = [lang.strip() for lang in group.split(',') if lang.strip()]
+        if languages:
+            sets.append(languages)
+    return sets
+
+
+def _synthetic_image() -> np.ndarray:
+    """Render a small text image used to exercise detector and recognizer"""
+    image = Image.new('RGB', (320, 64), color='white')
+    draw = ImageDraw.Draw(image)
+    draw.text((10, 20), 'Warm up OCR 0123', fill='black')
+    return np.array(image)
+
+
+class _PooledReader:
+    """A loaded reader plus the semaphore bounding its concurrent use"""
+
+    def __init__(self, reader: Any, concurrency: int):
+        self.reader = reader
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.warmed = False
+
+
+class ReaderPool:
+    def __init__(self, concurrency: int = READER_CONCURRENCY,
+                 acquire_timeout: float = READER_ACQUIRE_TIMEOUT):
+        """
+        Process-wide pool of EasyOCR readers
+
+        Each distinct language set / GPU / backend combination is loaded once per
+        process and shared by all request threads, with at most
+        `concurrency` threads running inference on it at a time.
+
+        Args:
+            concurrency: Maximum concurrent users of each reader
+            acquire_timeout: Seconds to wait for a free slot before failing
+        """
+        self.concurrency = max(1, concurrency)
+        self.acquire_timeout = acquire_timeout
+        self._entries: Dict[ReaderKey, _PooledReader] = {}
+        self._loading: Dict[ReaderKey, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, key: ReaderKey) -> _PooledReader:
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+
+        # One loader per key; other threads wait instead of loading a duplicate
+        with self._lock:
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        with load_lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry
+
+            languages, gpu, backend = key
+            try:
+                logger.info(f"Loading EasyOCR reader with languages: {list(languages)}, GPU: {gpu}, backend: {backend}")
+                if backend == 'onnx':
+                    from onnx_backend import build_onnx_reader
+                    reader = build_onnx_reader(list(languages))
+                else:
+                    reader = easyocr.Reader(list(languages), gpu=gpu)
+            except Exception as e:
+                logger.error(f"Failed to load EasyOCR reader: {str(e)}")
+                raise
+
+            entry = _PooledReader(reader, self.concurrency)
+            self._warm_up(entry)
+            with self._lock:
+                self._entries[key] = entry
+            return entry
+
+    def _warm_up(self, entry: _PooledReader) -> None:
+        """Run one inference so lazy allocations happen before real traffic"""
+        try:
+            entry.reader.readtext(_synthetic_image())
+            entry.warmed = True
+            logger.info("EasyOCR reader warmed up")
+        except Exception as e:
+            # A failed warm-up only costs latency on the first request
+            logger.warning(f"EasyOCR warm-up failed: {str(e)}")
+
+    def get_reader(self, languages: List[str], gpu: bool = False, backend: str = 'torch') -> Any:
+        """Return the shared reader for a language set, loading it if needed"""
+        return self._entry(make_key(languages, gpu, backend)).reader
+
+    @contextmanager
+    def acquire(self, languages: List[str], gpu: bool = False,
+                timeout: Optional[float] = None, backend: str = 'torch') -> Iterator[Any]:
+        """
+        Check out the shared reader for exclusive-slot use
+
+        Args:
+            languages: Language codes the reader must support
+            gpu: Whether the reader uses GPU acceleration
+            timeout: Seconds to wait for a free slot (defaults to pool setting)
+            backend: 'torch' or 'onnx'
+
+        Yields:
+            An easyocr.Reader instance
+        """
+        entry = self._entry(make_key(languages, gpu, backend))
+        wait = self.acquire_timeout if timeout is None else timeout
+
+        if not entry.slots.acquire(timeout=wait):
+            raise ReaderPoolTimeout(f"No OCR reader available after {wait}s")
+        try:
+            yield entry.reader
+        finally:
+            entry.slots.release()
+
+    def warm_up(self, language_sets: List[List[str]], gpu: bool = False) -> None:
+        """Load and warm readers for each language set"""
+        for languages in language_sets:
+            try:
+                self._entry(make_key(languages, gpu))
+            except Exception as e:
+                logger.error(f"Warm-up failed for languages {languages}: {str(e)}")
+
+    def is_ready(self, languages: List[str], gpu: bool = False, backend: str = 'torch') -> bool:
+        """Whether a reader for this key is loaded and warmed"""
+        entry = self._entries.get(make_key(languages, gpu, backend))
+        return entry is not None and entry.warmed
+
+    def stats(self) -> Dict[str, Any]:
+        """Describe loaded readers for health/debug endpoints"""
+        return {
+            'concurrency': self.concurrency,
+            'readers': [
+                {'languages': list(languages), 'gpu': gpu, 'backend': backend, 'warmed': entry.warmed}
+                for (languages, gpu, backend), entry in self._entries.items()
+            ]
+        }
+
+
+_pool: Optional[ReaderPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_reader_pool() -> ReaderPool:
+    """Return the process-wide reader pool"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ReaderPool()
+    return _pool
+
+
+def start_background_warm_up(spec: str = WARMUP_LANGUAGES, gpu: bool = WARMUP_GPU) -> Optional[threading.Thread]:
+    """
+    Warm the configured language sets without blocking app startup
+
+    Args:
+        spec: Language sets, e.g. "en" or "en;en,fr"
+        gpu: Whether to warm GPU readers
+
+    Returns:
+        The warm-up thread, or None when nothing is configured
+    """
+    language_sets = parse_language_sets(spec)
+    if not language_sets:
+        return None
+
+    thread = threading.Thread(
+        target=get_reader_pool().warm_up,
+        args=(language_sets, gpu),
+        name='ocr-reader-warmup',
+        daemon=True
+    )
+    thread.start()
+    return thread
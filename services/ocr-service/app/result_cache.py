@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import logging
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+from prometheus_client import Counter
+from ingestion import ImageSource, source_digest
+
+logger = logging.getLogger(__name__)
+
+# Metrics
+OCR_CACHE_REQUESTS = Counter('ocr_cache_requests_total', 'OCR result cache lookups', ['tier', 'result'])
+
+# Configuration
+CACHE_ENABLED = os.getenv('OCR_CACHE_ENABLED', 'true').lower() == 'true'
+CACHE_MEMORY_BYTES = int(os.getenv('OCR_CACHE_MEMORY_BYTES', str(64 * 1024 * 1024)))  # 64MB
+CACHE_DIR = os.getenv('OCR_CACHE_DIR', 'cache')  # empty disables the disk tier
+CACHE_TTL = int(os.getenv('OCR_CACHE_TTL', str(7 * 24 * 3600)))  # seconds
+CACHE_PURGE_INTERVAL = 3600  # seconds between expired-row sweeps
+
+
+def content_key(source: ImageSource, engine: str, languages: List[str], min_confidence: float) -> str:
+    """
+    Build a cache key from image content and the settings that affect output
+
+    Args:
+        source: Raw uploaded bytes or an Upload (whose digest is reused)
+        engine: Engine name
+        languages: Language codes
+        min_confidence: Confidence threshold applied to results
+
+    Returns:
+        Key of the form `<content digest>:<engine>:<languages>:<min_confidence>`
+    """
+    return f"{source_digest(source)}:{engine}:{','.join(sorted(languages))}:{min_confidence}"
+
+
+class MemoryTier:
+    def __init__(self, max_bytes: int):
+        """LRU of serialized results bounded by total payload size"""
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+            return payload
+
+    def put(self, key: str, payload: bytes) -> None:
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = payload
+            self.size += len(payload)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+class DiskTier:
+    def __init__(self, directory: str, ttl: int):
+        """SQLite-backed result store with TTL eviction, shared across processes"""
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, 'ocr_cache.sqlite3')
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, payload BLOB, created REAL)'
+        )
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT payload FROM results WHERE key = ? AND created >= ?',
+                (key, time.time() - self.ttl)
+            ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def put(self, key: str, payload: bytes) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO results (key, payload, created) VALUES (?, ?, ?)',
+                (key, payload, now)
+            )
+            if now - self._last_purge > CACHE_PURGE_INTERVAL:
+                self._conn.execute('DELETE FROM results WHERE created < ?', (now - self.ttl,))
+                self._last_purge = now
+
+
+class ResultCache:
+    def __init__(self, memory_bytes: int = CACHE_MEMORY_BYTES, directory: Optional[str] = CACHE_DIR,
+                 ttl: int = CACHE_TTL):
+        """
+        Two-tier OCR result cache
+
+        Args:
+            memory_bytes: Byte budget of the in-process LRU
+            directory: Directory for the SQLite tier, or None/'' to disable it
+            ttl: Seconds a disk entry stays valid
+        """
+        self.memory = MemoryTier(memory_bytes)
+        self.disk = None
+        if directory:
+            try:
+                self.disk = DiskTier(directory, ttl)
+            except Exception as e:
+                logger.warning(f"OCR disk cache disabled: {str(e)}")
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Return cached results, promoting disk hits into memory"""
+        payload = self.memory.get(key)
+        if payload is not None:
+            OCR_CACHE_REQUESTS.labels(tier='memory', result='hit').inc()
+            return json.loads(payload)
+        OCR_CACHE_REQUESTS.labels(tier='memory', result='miss').inc()
+
+        if self.disk is None:
+            return None
+
+        try:
+            payload = self.disk.get(key)
+        except Exception as e:
+            logger.warning(f"OCR disk cache read failed: {str(e)}")
+            payload = None
+
+        if payload is None:
+            OCR_CACHE_REQUESTS.labels(tier='disk', result='miss').inc()
+            return None
+
+        OCR_CACHE_REQUESTS.labels(tier='disk', result='hit').inc()
+        self.memory.put(key, payload)
+        return json.loads(payload)
+
+    def put(self, key: str, results: List[Dict[str, Any]]) -> None:
+        """Store results in both tiers"""
+        payload = json.dumps(results, separators=(',', ':')).encode('utf-8')
+        self.memory.put(key, payload)
+        if self.disk is not None:
+            try:
+                self.disk.put(key, payload)
+            except Exception as e:
+                logger.warning(f"OCR disk cache write failed: {str(e)}")
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Return the process-wide result cache, or None when disabled"""
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache()
+    return _cache
@@ -65,4 +65,345 @@ def test_engine_info(ocr_engine):
     assert 'gpu_enabled' in info
     assert 'engine' in info
 
+def test_engines_share_pooled_reader():
+    """Test engines with the same languages reuse one loaded reader"""
+    first = OCREngine(languages=['en'])
+    second = OCREngine(languages=['en'])
+    assert first.reader is second.reader
+
+def test_parse_language_sets():
+    """Test warm-up language set parsing"""
+    from reader_pool import parse_language_sets
+    assert parse_language_sets('en;en, fr') == [['en'], ['en', 'fr']]
+    assert parse_language_sets('') == []
+
+def _png_upload(filename, size=(200, 60), text=None):
+    from PIL import Image, ImageDraw, ImageFont
+    from werkzeug.datastructures import FileStorage
+    buffer = io.BytesIO()
+    image = Image.new('RGB', size, color='white')
+    if text:
+        ImageDraw.Draw(image).text((4, 2), text, fill='black', font=ImageFont.load_default(size=size[1] - 8))
+    image.save(buffer, format='PNG')
+    buffer.seek(0)
+    return FileStorage(stream=buffer, filename=filename)
+
+def test_process_batch_isolates_errors(ocr_engine):
+    """Test batched processing keeps order and per-file errors"""
+    from werkzeug.datastructures import FileStorage
+    files = [
+        _png_upload('a.png'),
+        FileStorage(stream=io.BytesIO(b'not an image'), filename='b.png'),
+        _png_upload('c.png', size=(900, 700))
+    ]
+    results = ocr_engine.process_batch(files, batch_size=2)
+    assert [r['file_index'] for r in results] == [0, 1, 2]
+    assert results[0]['success'] and results[2]['success']
+    assert results[1]['success'] == False
+    assert 'full_text' in results[0]
+
+def test_result_cache_tiers(tmp_path):
+    """Test memory LRU eviction and disk tier fallback"""
+    from result_cache import ResultCache, content_key
+    cache = ResultCache(memory_bytes=200, directory=str(tmp_path))
+    first = content_key(b'image-one', 'easyocr', ['en'], 0.1)
+    second = content_key(b'image-two', 'easyocr', ['en'], 0.1)
+    assert first != content_key(b'image-one', 'easyocr', ['en', 'fr'], 0.1)
+    
+    cache.put(first, [{'text': 'a' * 100}])
+    cache.put(second, [{'text': 'b' * 100}])
+    assert cache.memory.get(first) is None
+    assert cache.get(first) == [{'text': 'a' * 100}]
+    assert cache.get(content_key(b'other', 'easyocr', ['en'], 0.1)) is None
+
+def test_tiling_maps_boxes_and_deduplicates():
+    """Test tiled OCR returns boxes in original coordinates without overlap duplicates"""
+    import numpy as np
+    from preprocessing import run_preprocessed, tile_origins
+    assert tile_origins(1000, 400, 50) == [0, 350, 600]
+    
+    page = np.full((300, 1000, 3), 255, dtype=np.uint8)
+    page[100:120, 380:420] = 0
+    
+    def fake_readtext(tile):
+        # Report the dark region of each tile as one word, in tile coordinates
+        ys, xs = np.nonzero(tile[:, :, 0] < 128)
+        if xs.size == 0:
+            return []
+        x0, x1, y0, y1 = xs.min(), xs.max() + 1, ys.min(), ys.max() + 1
+        return [([[x0, y0], [x1, y0], [x1, y1], [x0, y1]], 'word', 0.9)]
+    
+    preset = {'target_text_height': None, 'min_scale': 1.0, 'tile_size': 400, 'tile_overlap': 50, 'tile_workers': 2}
+    detections = run_preprocessed(page, preset, fake_readtext)
+    assert len(detections) == 1
+    assert detections[0][0][0] == [380.0, 100.0]
+
+    # With one reader slot the tiles run in the caller's thread, not a pool waiting on it
+    import threading
+    threads = set()
+    def tracking_readtext(tile):
+        threads.add(threading.current_thread())
+        return fake_readtext(tile)
+    assert run_preprocessed(page, preset, tracking_readtext, max_workers=1) == detections
+    assert threads == {threading.current_thread()}
+
+def test_document_streams_tiff_pages(client):
+    """Test multi-page TIFF OCR streams one JSON line per page"""
+    from PIL import Image
+    frames = [Image.new('RGB', (200, 80), color='white') for _ in range(3)]
+    buffer = io.BytesIO()
+    frames[0].save(buffer, format='TIFF', save_all=True, append_images=frames[1:])
+    buffer.seek(0)
+    
+    response = client.post('/ocr/document', data={'file': (buffer, 'scan.tiff')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [line['page'] for line in lines[:-1]] == [1, 2, 3]
+    assert lines[-1] == {'done': True, 'filename': 'scan.tiff', 'pages': 3}
+
+def test_reading_order_two_columns():
+    """Test a header and two columns are read header first, then column by column"""
+    from layout import ordered_text
+    
+    def word(text, x, y, width=60, height=20):
+        return {'text': text, 'confidence': 0.9, 'bounding_box': {
+            'top_left': [x, y], 'top_right': [x + width, y],
+            'bottom_right': [x + width, y + height], 'bottom_left': [x, y + height]
+        }}
+    
+    results = [
+        word('right1', 400, 100), word('left1', 50, 100), word('title', 50, 20, width=450),
+        word('right2', 400, 130), word('left2', 50, 131), word('more', 115, 99)
+    ]
+    assert ordered_text(results) == 'title\n\nleft1 more\nleft2\n\nright1\nright2'
+
+def test_format_results_thresholds_and_rounds(ocr_engine):
+    """Test vectorized formatting keeps the result shape"""
+    raw = [
+        ([[0.123, 1], [10, 1], [10, 5.556], [0, 5]], ' kept ', 0.912345),
+        ([[0, 0], [1, 0], [1, 1], [0, 1]], 'dropped', 0.05)
+    ]
+    assert ocr_engine._format_results(raw) == [{
+        'text': 'kept',
+        'confidence': 0.9123,
+        'bounding_box': {
+            'top_left': [0.12, 1.0], 'top_right': [10.0, 1.0],
+            'bottom_right': [10.0, 5.56], 'bottom_left': [0.0, 5.0]
+        }
+    }]
+
+def test_ocr_job_lifecycle(client):
+    """Test an OCR job is accepted, processed and reported"""
+    import time
+    upload = _png_upload('invoice.png')
+    response = client.post('/ocr/jobs', data={'file': (upload.stream, 'invoice.png')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 202
+    job_id = json.loads(response.data)['job_id']
+    
+    for _ in range(100):
+        job = json.loads(client.get(f'/ocr/jobs/{job_id}').data)
+        if job['status'] in ('completed', 'failed'):
+            break
+        time.sleep(0.1)
+    assert job['status'] == 'completed'
+    assert job['engine'] == 'easyocr'
+    assert job['pages_done'] == 1
+    assert job['result']['total_pages'] == 1
+    
+    response = client.post('/ocr/jobs?mode=turbo', data={'file': (_png_upload('a.png').stream, 'a.png')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+
+def test_heartbeat_keeps_running_jobs_claimed(tmp_path):
+    """Test only jobs whose heartbeat stopped are requeued"""
+    import time
+    from jobs import JobStore, STALE_JOB_SECONDS
+    store = JobStore(str(tmp_path))
+    alive = store.create(b'a', 'a.png', None, engine='easyocr-onnx', options={'mode': 'fast'})
+    dead = store.create(b'b', 'b.png', None)
+    assert store.claim()['id'] == alive
+    assert store.claim()['id'] == dead
+    old = time.time() - STALE_JOB_SECONDS - 1
+    store._execute('UPDATE jobs SET updated = ?', (old,))
+    
+    store.heartbeat([alive])
+    assert store.requeue_stale() == 1
+    assert store.get(alive)['status'] == 'running'
+    assert store.get(dead)['status'] == 'queued'
+    assert store.get(alive)['engine'] == 'easyocr-onnx'
+    assert json.loads(store.get(alive)['options']) == {'mode': 'fast'}
+
+def test_stale_jobs_requeued_while_running(tmp_path, monkeypatch):
+    """Test a job abandoned by a dead process is requeued and run without a restart"""
+    import time
+    import jobs
+    from jobs import JobStore, JobManager
+    monkeypatch.setattr(jobs, 'STALE_JOB_SECONDS', 0.3)
+    monkeypatch.setattr(jobs, 'HEARTBEAT_INTERVAL', 0.05)
+    store = JobStore(str(tmp_path))
+    job_id = store.create(b'a', 'a.png', None)
+    # Claimed by a process that then died, so nothing refreshes it
+    store._execute('UPDATE jobs SET status = ?, updated = ? WHERE id = ?', (jobs.RUNNING, time.time(), job_id))
+
+    manager = JobManager(lambda data, filename, engine, options: iter([{'full_text': 'done'}]), store=store, workers=1)
+    manager.start()
+    try:
+        deadline = time.monotonic() + 10
+        while manager.status(job_id)['status'] != jobs.COMPLETED and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert manager.status(job_id)['result']['full_text'] == 'done'
+    finally:
+        manager.stop()
+
+def test_ocr_job_not_found(client):
+    """Test unknown job ids return 404"""
+    assert client.get('/ocr/jobs/missing').status_code == 404
+
+def test_engines_endpoint_lists_registry(client):
+    """Test registered engines are listed with capability metadata"""
+    data = json.loads(client.get('/engines').data)
+    names = [engine['name'] for engine in data['engines']]
+    assert {'easyocr', 'tesseract', 'stub'} <= set(names)
+    assert all('capabilities' in engine for engine in data['engines'])
+
+def test_ocr_routes_through_registry(client):
+    """Test /ocr dispatches to the requested engine"""
+    upload = _png_upload('note.png')
+    response = client.post('/ocr?engine=stub', data={'file': (upload.stream, 'note.png')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['engine'] == 'stub'
+    assert data['text'] == ''
+
+def test_ocr_invalid_engine(client):
+    """Test unknown engines are rejected"""
+    upload = _png_upload('note.png')
+    response = client.post('/ocr?engine=nope', data={'file': (upload.stream, 'note.png')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+
+def test_upload_ingestion_streams_and_limits():
+    """Test chunked ingestion hashes in place and enforces the size limit"""
+    import base64
+    from ingestion import Upload, UploadTooLarge, content_digest
+    payload = b'x' * 1000
+    
+    upload = Upload.from_stream(io.BytesIO(payload), max_bytes=1000)
+    assert upload.size == 1000
+    assert upload.digest == content_digest(payload)
+    assert upload.read() == payload
+    with pytest.raises(UploadTooLarge):
+        Upload.from_stream(io.BytesIO(payload), max_bytes=999)
+    
+    encoded = base64.b64encode(payload).decode()
+    wrapped = 'data:image/png;base64,' + '\n'.join(encoded[i:i + 76] for i in range(0, len(encoded), 76))
+    decoded = Upload.from_base64(wrapped, max_bytes=1000)
+    assert decoded.read() == payload
+    assert decoded.digest == upload.digest
+    with pytest.raises(ValueError):
+        Upload.from_base64('not base64!', max_bytes=1000)
+
+def test_server_timing_reports_stages(client):
+    """Test per-request stage timings are exposed when asked for"""
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new('RGB', (40, 20), 'white').save(buffer, format='PNG')
+    
+    response = client.post('/ocr?engine=easyocr&timing=1',
+                           data={'file': (io.BytesIO(buffer.getvalue()), 'page.png')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    stages = [entry.split(';')[0] for entry in response.headers['Server-Timing'].split(', ')]
+    for name in ('upload_read', 'decode', 'color_conversion', 'detection', 'recognition', 'serialization', 'total'):
+        assert name in stages
+    
+    response = client.post('/ocr?engine=stub', data={'file': (io.BytesIO(buffer.getvalue()), 'page.png')},
+                           content_type='multipart/form-data')
+    assert 'Server-Timing' not in response.headers
+
+def test_sampling_profiler_collects_stacks():
+    """Test the profiler samples other threads into folded stacks"""
+    import time
+    import threading
+    from profiling import SamplingProfiler
+    
+    done = threading.Event()
+    worker = threading.Thread(target=done.wait)
+    worker.start()
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start()
+    time.sleep(0.05)
+    profiler.stop()
+    done.set()
+    worker.join()
+    
+    snapshot = profiler.snapshot()
+    assert not snapshot['running']
+    assert snapshot['samples'] > 0
+    assert any('wait' in entry['function'] for entry in snapshot['top_functions'])
+    assert profiler.folded()
+
+def test_probe_exits_on_first_confident_region(client):
+    """Test the text presence probe and per-request option validation"""
+    response = client.post('/ocr/probe', data={'file': _png_upload('probe.png', size=(90, 30), text='OCR')}, content_type='multipart/form-data')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['has_text'] is True
+    assert data['regions_checked'] == 1
+    
+    response = client.post('/ocr/upload?mode=turbo', data={'file': _png_upload('mode.png')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+
+def test_adaptive_confidence_threshold():
+    """Test adaptive filtering raises the cutoff relative to the median"""
+    import numpy as np
+    from ocr_engine import recognition_options, confidence_threshold
+    confidences = np.array([0.9, 0.8, 0.85, 0.3])
+    assert confidence_threshold(confidences, recognition_options(min_confidence=0.2)) == 0.2
+    adaptive = confidence_threshold(confidences, recognition_options(min_confidence=0.2, adaptive=True))
+    assert 0.3 < adaptive < 0.8
+    with pytest.raises(ValueError):
+        recognition_options(min_confidence=1.5)
+
+def test_onnx_engine_registered(client):
+    """Test the ONNX backend is selectable through the registry"""
+    data = json.loads(client.get('/engines').data)
+    assert 'easyocr-onnx' in [engine['name'] for engine in data['engines']]
+    
+    response = client.post('/ocr/upload?engine=tesseract', data={'file': _png_upload('page.png')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+
+def test_onnx_backend_matches_torch_backend(tmp_path, monkeypatch):
+    """Test int8 ONNX Runtime inference stays in parity with the PyTorch path"""
+    pytest.importorskip('torch')
+    pytest.importorskip('onnxruntime')
+    import numpy as np
+    from PIL import Image, ImageDraw, ImageFont
+    import onnx_backend
+    monkeypatch.setattr(onnx_backend, 'ONNX_DIR', str(tmp_path))
+    
+    words = 'Invoice 20931 total amount due upon receipt'.split()
+    image = Image.new('RGB', (1400, 120), 'white')
+    ImageDraw.Draw(image).text((20, 30), ' '.join(words), fill='black', font=ImageFont.load_default(size=48))
+    image_np = np.array(image)
+    
+    results = {}
+    for backend in ('torch', 'onnx'):
+        engine = OCREngine(backend=backend)
+        engine.cache = None
+        results[backend] = engine._process_image_array(image_np)
+    
+    torch_words = set(' '.join(r['text'] for r in results['torch']).lower().split())
+    onnx_words = set(' '.join(r['text'] for r in results['onnx']).lower().split())
+    assert len(torch_words & onnx_words) >= 0.9 * len(torch_words)
+    assert len(results['onnx']) == len(results['torch'])
+    confidence_gap = np.mean([abs(a['confidence'] - b['confidence'])
+                              for a, b in zip(results['torch'], results['onnx'])])
+    assert confidence_gap < 0.1
+
 # Run tests with: python -m pytest test_ocr.py -v
\ No newline at end of file
@@ -0,0 +1,286 @@
+import os
+import queue
+import itertools
+import threading
+import logging
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Dict, List, Any, Optional
+import numpy as np # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+OCR_BACKEND = os.getenv('OCR_BACKEND', 'inline').lower()  # 'inline' or 'process'
+WORKER_COUNT = int(os.getenv('OCR_WORKERS', str(os.cpu_count() or 1)))
+MAX_QUEUE_DEPTH = int(os.getenv('OCR_MAX_QUEUE_DEPTH', str(WORKER_COUNT * 2)))
+WORKER_TIMEOUT = float(os.getenv('OCR_WORKER_TIMEOUT', '120'))
+
+
+# Seconds between checks for worker processes that died
+LIVENESS_INTERVAL = 1.0
+
+# Result message kinds
+DONE, FAILED = 'done', 'failed'
+
+# Value of a worker's slot in the shared task table while it holds no task
+IDLE = -1
+
+
+class PoolSaturated(RuntimeError):
+    """Raised when the worker pool already holds its maximum queue depth"""
+
+
+class WorkerDied(RuntimeError):
+    """Raised for an image whose worker process exited while running it"""
+
+
+class WorkerTimeout(TimeoutError):
+    """Raised when an image's result does not arrive within the timeout"""
+
+
+def _worker_main(index: int, current, languages: List[str], gpu: bool, tasks, results) -> None:
+    """
+    OCR worker process loop
+
+    Each task names a shared memory block holding a decoded RGB image,
+    with the request's recognition options and preprocessing preset.
+    The worker records the task id in its slot of `current` as soon as it
+    dequeues it, maps the block without copying, runs OCR and returns
+    formatted results; the parent owns and unlinks the block.
+    """
+    from ocr_engine import OCREngine
+    from reader_pool import get_reader_pool
+
+    # One engine per preset; they share the process's loaded reader
+    engines: Dict[Optional[str], Any] = {None: OCREngine(languages=languages, gpu=gpu)}
+    # Engines load their reader lazily; load and warm it before taking
+    # work so the first image doesn't pay for the model
+    get_reader_pool().warm_up([languages], gpu)
+    logger.info(f"OCR worker {os.getpid()} ready")
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+
+        task_id, shm_name, shape, dtype, options, preset = task
+        # A direct shared-memory write, visible to the parent even if this
+        # process dies before its queued messages are flushed
+        current[index] = task_id
+        try:
+            engine = engines.get(preset)
+            if engine is None:
+                engine = engines[preset] = OCREngine(languages=languages, gpu=gpu, preset=preset)
+            shm = shared_memory.SharedMemory(name=shm_name)
+            try:
+                image_np = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+                detailed_results = engine._process_image_array(image_np, options)
+                del image_np
+            finally:
+                shm.close()
+            results.put((task_id, DONE, {
+                'full_text': engine._extract_full_text(detailed_results),
+                'detailed_results': detailed_results,
+                'total_detections': len(detailed_results)
+            }))
+        except Exception as e:
+            results.put((task_id, FAILED, str(e)))
+
+
+class OCRWorkerPool:
+    def __init__(self, workers: int = WORKER_COUNT, max_queue_depth: int = MAX_QUEUE_DEPTH,
+                 languages: List[str] = ['en'], gpu: bool = False):
+        """
+        Pool of OCR worker processes fed through shared memory
+
+        Args:
+            workers: Number of worker processes
+            max_queue_depth: Maximum in-flight images (running plus queued)
+            languages: Language codes each worker loads
+            gpu: Whether workers use GPU acceleration
+        """
+        self.workers = max(1, workers)
+        self.max_queue_depth = max(self.workers, max_queue_depth)
+        self.languages = languages
+        self.gpu = gpu
+
+        # Spawn keeps torch and Flask state out of the children
+        self._ctx = mp.get_context('spawn')
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        # Per worker, the id of the task it last dequeued
+        self._current = self._ctx.Array('q', self.workers, lock=False)
+        self._processes = [self._start_worker(i) for i in range(self.workers)]
+
+        self._ids = itertools.count()
+        # task id -> (future, shared memory block)
+        self._pending: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self._collector = threading.Thread(target=self._collect, name='ocr-result-collector', daemon=True)
+        self._collector.start()
+        logger.info(f"Started {self.workers} OCR worker processes (max queue depth {self.max_queue_depth})")
+
+    def _start_worker(self, index: int):
+        self._current[index] = IDLE
+        process = self._ctx.Process(target=_worker_main,
+                                    args=(index, self._current, self.languages, self.gpu, self._tasks, self._results),
+                                    name=f'ocr-worker-{index}', daemon=True)
+        process.start()
+        return process
+
+    @property
+    def in_flight(self) -> int:
+        """Images submitted and not yet finished"""
+        return len(self._pending)
+
+    def submit(self, image_np: np.ndarray, options: Optional[Dict[str, Any]] = None,
+               preset: Optional[str] = None) -> Future:
+        """
+        Queue a decoded image for OCR
+
+        Args:
+            image_np: RGB image array
+            options: Recognition options from recognition_options()
+            preset: Preprocessing preset name; defaults to OCR_PRESET
+
+        Returns:
+            Future resolving to the OCR result dictionary
+
+        Raises:
+            PoolSaturated: When the queue depth limit is reached
+        """
+        image_np = np.ascontiguousarray(image_np)
+        future: Future = Future()
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("OCR worker pool is shut down")
+            if len(self._pending) >= self.max_queue_depth:
+                raise PoolSaturated(f"OCR queue full ({self.max_queue_depth} images in flight)")
+
+            task_id = next(self._ids)
+            shm = shared_memory.SharedMemory(create=True, size=max(1, image_np.nbytes))
+            self._pending[task_id] = (future, shm)
+
+        np.ndarray(image_np.shape, dtype=image_np.dtype, buffer=shm.buf)[...] = image_np
+        self._tasks.put((task_id, shm.name, image_np.shape, image_np.dtype.str, options, preset))
+        return future
+
+    def process(self, image_np: np.ndarray, options: Optional[Dict[str, Any]] = None,
+                preset: Optional[str] = None, timeout: float = WORKER_TIMEOUT) -> Dict[str, Any]:
+        """
+        Submit an image and wait for its result
+
+        Raises:
+            PoolSaturated: When the queue depth limit is reached
+            WorkerDied: When the worker running the image exited
+            WorkerTimeout: When no result arrives within `timeout` seconds
+        """
+        future = self.submit(image_np, options, preset)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            self._abandon(future)
+            raise WorkerTimeout(f"No OCR result within {timeout:g}s")
+
+    def _abandon(self, future: Future) -> None:
+        """Free the queue slot and memory of an image nobody waits for; a late result is ignored"""
+        with self._lock:
+            task_id = next((task_id for task_id, entry in self._pending.items() if entry[0] is future), None)
+            entry = self._pending.pop(task_id, None)
+        if entry is not None:
+            # A worker still mapping the block keeps it until it closes it
+            entry[1].close()
+            entry[1].unlink()
+
+    def _collect(self) -> None:
+        while True:
+            try:
+                message = self._results.get(timeout=LIVENESS_INTERVAL)
+            except queue.Empty:
+                # Only once the results are drained, so a dead worker's
+                # last messages have already been applied
+                self._replace_dead_workers()
+                continue
+            if message is None:
+                break
+
+            task_id, kind, payload = message
+            with self._lock:
+                entry = self._pending.pop(task_id, None)
+            if entry is None:
+                continue
+
+            future, shm = entry
+            shm.close()
+            shm.unlink()
+            if kind == DONE:
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(payload))
+
+    def _replace_dead_workers(self) -> None:
+        """Fail the images of workers that exited, free their memory and start replacements"""
+        with self._lock:
+            if self._closed:
+                return
+            dead = [(i, process) for i, process in enumerate(self._processes) if not process.is_alive()]
+            lost = []
+            for index, process in dead:
+                # The last task the worker dequeued; still pending means its result never came
+                entry = self._pending.pop(self._current[index], None)
+                if entry is not None:
+                    lost.append((process.pid, entry))
+                self._processes[index] = self._start_worker(index)
+
+        for index, process in dead:
+            logger.error(f"OCR worker {process.pid} exited with code {process.exitcode}; "
+                         f"restarted as {self._processes[index].pid}")
+        for pid, (future, shm) in lost:
+            shm.close()
+            shm.unlink()
+            future.set_exception(WorkerDied(f"OCR worker {pid} exited while processing the image"))
+
+    def shutdown(self) -> None:
+        """Stop workers and fail anything still pending"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+        self._results.put(None)
+        self._collector.join(timeout=5)
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future, shm in pending.values():
+            shm.close()
+            shm.unlink()
+            future.set_exception(RuntimeError("OCR worker pool shut down"))
+
+
+_pool: Optional[OCRWorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool() -> Optional[OCRWorkerPool]:
+    """Return the process pool when OCR_BACKEND=process, else None"""
+    global _pool
+    if OCR_BACKEND != 'process':
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = OCRWorkerPool()
+    return _pool
@@ -0,0 +1,194 @@
+import io
+import os
+import json
+import random
+import logging
+from typing import List, Dict, Any, Optional
+import numpy as np # type: ignore
+from PIL import Image, ImageDraw, ImageFont
+
+logger = logging.getLogger(__name__)
+
+# Small per-language vocabularies; enough variety for detection/recognition load
+WORDS = {
+    'en': ['invoice', 'total', 'amount', 'payment', 'customer', 'address', 'account', 'number',
+           'date', 'due', 'balance', 'service', 'contract', 'signature', 'reference', 'order'],
+    'fr': ['facture', 'montant', 'paiement', 'client', 'adresse', 'compte', 'numero', 'date',
+           'solde', 'service', 'contrat', 'signature', 'commande', 'total', 'reference', 'echeance'],
+    'es': ['factura', 'importe', 'pago', 'cliente', 'direccion', 'cuenta', 'numero', 'fecha',
+           'saldo', 'servicio', 'contrato', 'firma', 'pedido', 'total', 'referencia', 'vencimiento'],
+    'de': ['rechnung', 'betrag', 'zahlung', 'kunde', 'adresse', 'konto', 'nummer', 'datum',
+           'saldo', 'dienst', 'vertrag', 'unterschrift', 'auftrag', 'summe', 'referenz', 'frist'],
+}
+
+PAGE_INCHES = (8.27, 11.69)  # A4
+BASE_FONT_POINTS = 11
+
+
+def _font(size: int) -> ImageFont.ImageFont:
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1 has a single fixed-size bitmap font
+        return ImageFont.load_default()
+
+
+def render_page(rng: random.Random, language: str, dpi: int, noise: float,
+                columns: int = 1) -> Dict[str, Any]:
+    """
+    Render one synthetic text page
+
+    Args:
+        rng: Seeded random generator
+        language: Key into WORDS
+        dpi: Rendering resolution
+        noise: Std-dev of additive Gaussian noise as a fraction of 255
+        columns: Text columns on the page
+
+    Returns:
+        {'image': PIL image, 'text': ground-truth text}
+    """
+    width, height = int(PAGE_INCHES[0] * dpi), int(PAGE_INCHES[1] * dpi)
+    font_px = max(8, int(BASE_FONT_POINTS * dpi / 72))
+    line_px = int(font_px * 1.6)
+    margin = int(0.75 * dpi)
+    gutter = int(0.4 * dpi)
+    column_width = (width - 2 * margin - (columns - 1) * gutter) // columns
+
+    image = Image.new('L', (width, height), color=255)
+    draw = ImageDraw.Draw(image)
+    font = _font(font_px)
+    words = WORDS[language]
+    lines = []
+
+    for column in range(columns):
+        x0 = margin + column * (column_width + gutter)
+        y = margin
+        while y + line_px < height - margin:
+            line = []
+            x = x0
+            while True:
+                word = rng.choice(words) if rng.random() > 0.15 else str(rng.randint(1, 99999))
+                word_px = int(draw.textlength(word + ' ', font=font))
+                if x + word_px > x0 + column_width:
+                    break
+                line.append(word)
+                x += word_px
+            draw.text((x0, y), ' '.join(line), fill=0, font=font)
+            lines.append(' '.join(line))
+            y += line_px
+
+    if noise > 0:
+        np_rng = np.random.default_rng(rng.randint(0, 2 ** 31))
+        pixels = np.asarray(image, dtype=np.float32)
+        pixels += np_rng.normal(0, noise * 255, pixels.shape)
+        image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+    return {'image': image.convert('RGB'), 'text': '\n'.join(lines)}
+
+
+def generate_corpus(output_dir: str, seed: int = 0, dpis: List[int] = [150, 300],
+                    page_counts: List[int] = [1], languages: List[str] = ['en'],
+                    noise_levels: List[float] = [0.0], columns: List[int] = [1],
+                    repeat: int = 1) -> List[Dict[str, Any]]:
+    """
+    Write a reproducible corpus covering every combination of parameters
+
+    Single-page documents are written as PNG, multi-page ones as TIFF.
+    A manifest.json alongside records the generation parameters, each
+    document's parameters and its ground truth. Documents of a previous
+    corpus in the directory are removed first.
+
+    Returns:
+        The manifest entries
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    for document in load_corpus(output_dir) or []:
+        try:
+            os.remove(os.path.join(output_dir, document['file']))
+        except FileNotFoundError:
+            pass
+
+    parameters = corpus_parameters(seed, dpis, page_counts, languages, noise_levels, columns, repeat)
+    rng = random.Random(seed)
+    manifest = []
+
+    for _ in range(repeat):
+        for language in languages:
+            for dpi in dpis:
+                for pages in page_counts:
+                    for noise in noise_levels:
+                        for column_count in columns:
+                            rendered = [render_page(rng, language, dpi, noise, column_count) for _ in range(pages)]
+                            index = len(manifest)
+                            extension = 'png' if pages == 1 else 'tiff'
+                            filename = f'doc_{index:04d}_{language}_{dpi}dpi_{pages}p_n{noise:g}_c{column_count}.{extension}'
+                            path = os.path.join(output_dir, filename)
+
+                            images = [page['image'] for page in rendered]
+                            if pages == 1:
+                                images[0].save(path, format='PNG', dpi=(dpi, dpi))
+                            else:
+                                images[0].save(path, format='TIFF', save_all=True, append_images=images[1:],
+                                               compression='tiff_lzw', dpi=(dpi, dpi))
+
+                            manifest.append({
+                                'file': filename,
+                                'language': language,
+                                'dpi': dpi,
+                                'pages': pages,
+                                'noise': noise,
+                                'columns': column_count,
+                                'bytes': os.path.getsize(path),
+                                'text': [page['text'] for page in rendered]
+                            })
+
+    with open(os.path.join(output_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump({'seed': seed, 'parameters': parameters, 'documents': manifest}, f, indent=2)
+
+    logger.info(f"Generated {len(manifest)} documents in {output_dir}")
+    return manifest
+
+
+def corpus_parameters(seed: int, dpis: List[int], page_counts: List[int], languages: List[str],
+                      noise_levels: List[float], columns: List[int], repeat: int) -> Dict[str, Any]:
+    """Generation parameters as recorded in the manifest"""
+    return {
+        'seed': seed,
+        'dpis': list(dpis),
+        'page_counts': list(page_counts),
+        'languages': list(languages),
+        'noise_levels': [float(v) for v in noise_levels],
+        'columns': list(columns),
+        'repeat': repeat
+    }
+
+
+def load_corpus(corpus_dir: str, parameters: Optional[Dict[str, Any]] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    Read a corpus manifest
+
+    Returns:
+        The manifest entries, or None if the directory has no manifest or,
+        when `parameters` is given, it was generated with different ones
+    """
+    path = os.path.join(corpus_dir, 'manifest.json')
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if parameters is not None and manifest.get('parameters') != parameters:
+        return None
+    return manifest['documents']
+
+
+def iter_document_pages(path: str) -> List[bytes]:
+    """Split a corpus document into per-page PNG bytes"""
+    pages = []
+    with Image.open(path) as image:
+        for frame in range(getattr(image, 'n_frames', 1)):
+            image.seek(frame)
+            buffer = io.BytesIO()
+            image.convert('RGB').save(buffer, format='PNG')
+            pages.append(buffer.getvalue())
+    return pages
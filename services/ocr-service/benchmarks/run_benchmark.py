@@ -0,0 +1,257 @@
+"""
+OCR throughput/latency benchmark
+
+Examples:
+    # Generate the default corpus and benchmark OCREngine in-process
+    python benchmarks/run_benchmark.py --target engine --concurrency 4 --output report.json
+
+    # Benchmark a running service and compare against a previous report
+    python benchmarks/run_benchmark.py --target http --url http://localhost:5001 \\
+        --engine easyocr --compare baseline.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import platform
+import resource
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Optional
+import numpy as np # type: ignore
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, '..', 'app'))
+
+from corpus import generate_corpus, load_corpus, corpus_parameters, iter_document_pages  # noqa: E402
+
+logger = logging.getLogger('ocr-benchmark')
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / 1024 / 1024 if platform.system() == 'Darwin' else peak / 1024
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'mean': 0.0, 'max': 0.0}
+    values = np.asarray(samples)
+    return {
+        'p50': round(float(np.percentile(values, 50)), 4),
+        'p95': round(float(np.percentile(values, 95)), 4),
+        'p99': round(float(np.percentile(values, 99)), 4),
+        'mean': round(float(values.mean()), 4),
+        'max': round(float(values.max()), 4)
+    }
+
+
+def word_recall(expected: str, actual: str) -> float:
+    """Fraction of ground-truth words found in the OCR output"""
+    expected_words = expected.lower().split()
+    if not expected_words:
+        return 1.0
+    actual_words = set(actual.lower().split())
+    return sum(1 for word in expected_words if word in actual_words) / len(expected_words)
+
+
+def engine_runner(args: argparse.Namespace) -> Callable[[bytes], Dict[str, Any]]:
+    """Run pages through OCREngine in-process, collecting the pipeline's stage timings"""
+    from ocr_engine import OCREngine, decode_image
+    from profiling import timed
+
+    engine = OCREngine(languages=args.languages.split(','), preset=args.preset)
+    # Benchmarks must measure inference, not cache hits
+    engine.cache = None
+
+    def run(page: bytes) -> Dict[str, Any]:
+        with timed(engine.engine_name) as timings:
+            results = engine._process_image_array(decode_image(page))
+            text = engine._extract_full_text(results)
+        return {'text': text, 'stages': dict(timings.stages)}
+
+    return run
+
+
+def server_timing_stages(header: str) -> Dict[str, float]:
+    """Stage seconds from a Server-Timing header such as 'decode;dur=1.20, total;dur=9.80'"""
+    stages = {}
+    for entry in header.split(','):
+        name, _, duration = entry.strip().partition(';dur=')
+        if name and duration and name != 'total':
+            stages[name] = float(duration) / 1000
+    return stages
+
+
+def http_runner(args: argparse.Namespace) -> Callable[[bytes], Dict[str, Any]]:
+    """POST pages to the service's /ocr endpoint, asking for its stage timings"""
+    import requests # type: ignore
+
+    session = requests.Session()
+    url = f"{args.url.rstrip('/')}/ocr"
+
+    def run(page: bytes) -> Dict[str, Any]:
+        start = time.perf_counter()
+        response = session.post(url, params={'engine': args.engine, 'timing': '1'},
+                                files={'file': ('page.png', page, 'image/png')}, timeout=args.timeout)
+        elapsed = time.perf_counter() - start
+        response.raise_for_status()
+        stages = server_timing_stages(response.headers.get('Server-Timing', ''))
+        stages['request'] = elapsed
+        return {'text': response.json().get('text', ''), 'stages': stages}
+
+    return run
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    parameters = corpus_parameters(
+        seed=args.seed,
+        dpis=[int(v) for v in args.dpi.split(',')],
+        page_counts=[int(v) for v in args.pages.split(',')],
+        languages=args.languages.split(','),
+        noise_levels=[float(v) for v in args.noise.split(',')],
+        columns=[int(v) for v in args.columns.split(',')],
+        repeat=args.repeat
+    )
+    # A corpus generated with other options would skew a comparison
+    documents = None if args.regenerate else load_corpus(args.corpus_dir, parameters)
+    if documents is None:
+        documents = generate_corpus(args.corpus_dir, **parameters)
+
+    pages = []
+    for document in documents:
+        for index, page in enumerate(iter_document_pages(os.path.join(args.corpus_dir, document['file']))):
+            pages.append({'document': document, 'bytes': page, 'expected': document['text'][index]})
+
+    runner = engine_runner(args) if args.target == 'engine' else http_runner(args)
+
+    # Warm-up keeps model loading out of the measured window
+    for page in pages[:args.warmup]:
+        runner(page['bytes'])
+
+    latencies: List[float] = []
+    stage_samples: Dict[str, List[float]] = {}
+    recalls: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def task(page: Dict[str, Any]) -> None:
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            result = runner(page['bytes'])
+        except Exception as e:
+            logger.error(f"{page['document']['file']}: {str(e)}")
+            with lock:
+                errors += 1
+            return
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            recalls.append(word_recall(page['expected'], result['text']))
+            for stage, seconds in result['stages'].items():
+                stage_samples.setdefault(stage, []).append(seconds)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(task, pages))
+    wall_time = time.perf_counter() - started
+
+    return {
+        'config': {
+            'target': args.target,
+            'engine': args.engine if args.target == 'http' else 'easyocr',
+            'preset': args.preset,
+            'concurrency': args.concurrency,
+            'documents': len(documents),
+            'pages': len(pages),
+            'seed': args.seed,
+            'cpu_count': os.cpu_count(),
+            'python': platform.python_version()
+        },
+        'results': {
+            'wall_time_seconds': round(wall_time, 3),
+            'images_per_second': round(len(latencies) / wall_time, 3) if wall_time else 0.0,
+            'errors': errors,
+            'latency_seconds': percentiles(latencies),
+            'stage_seconds': {stage: percentiles(samples) for stage, samples in stage_samples.items()},
+            'peak_rss_mb': round(peak_rss_mb(), 1),
+            'mean_word_recall': round(float(np.mean(recalls)), 4) if recalls else 0.0
+        }
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    List regressions of `report` against `baseline` beyond `tolerance`
+
+    Throughput and recall must not drop, and p95 latency and peak RSS must
+    not grow, by more than the tolerance fraction.
+    """
+    current, previous = report['results'], baseline['results']
+    checks = [
+        ('images_per_second', current['images_per_second'], previous['images_per_second'], True),
+        ('latency p95', current['latency_seconds']['p95'], previous['latency_seconds']['p95'], False),
+        ('peak_rss_mb', current['peak_rss_mb'], previous['peak_rss_mb'], False),
+        ('mean_word_recall', current['mean_word_recall'], previous['mean_word_recall'], True),
+    ]
+    regressions = []
+    for name, new, old, higher_is_better in checks:
+        if not old:
+            continue
+        change = (new - old) / old
+        if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+            regressions.append(f"{name}: {old} -> {new} ({change:+.1%})")
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='OCR throughput and latency benchmark')
+    parser.add_argument('--target', choices=['engine', 'http'], default='engine')
+    parser.add_argument('--url', default='http://localhost:5001')
+    parser.add_argument('--engine', default='easyocr', help='Engine for --target http')
+    parser.add_argument('--preset', default=None, help='Preprocessing preset for --target engine')
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--warmup', type=int, default=1, help='Pages run before measuring')
+    parser.add_argument('--timeout', type=float, default=300)
+    parser.add_argument('--corpus-dir', default=os.path.join(BENCHMARK_DIR, 'corpus'))
+    parser.add_argument('--regenerate', action='store_true', help='Rebuild the corpus even if present')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--dpi', default='150,300')
+    parser.add_argument('--pages', default='1,3')
+    parser.add_argument('--languages', default='en')
+    parser.add_argument('--noise', default='0,0.05')
+    parser.add_argument('--columns', default='1,2')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--output', help='Write the JSON report here')
+    parser.add_argument('--compare', help='Baseline report to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='Allowed regression fraction')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
+    args = parse_args(argv)
+    report = run_benchmark(args)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    print(output)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            logger.error(f"Regression: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())